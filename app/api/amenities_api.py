@@ -1,14 +1,14 @@
 from flask import Blueprint, jsonify, request
 from models.amenity import Amenity
 from persistence.datamanager import DataManager
-from config import Config, db
-from sqlalchemy.orm import sessionmaker
+from persistence.serializer import (FieldsError, collection_response,
+                                    requested_fields)
+from persistence.versions import conditional
+from persistence.unit_of_work import finish
+from config import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from api.login_api import admin_only
 
-Session = sessionmaker(bind=Config.engine)
-session = Session()
-
 amenities_api = Blueprint("amenities_api", __name__)
 
 
@@ -38,34 +38,91 @@ def add_amenity():
         return jsonify({"Error": "Amenity already exists."}), 409
 
     DataManager.save(new_amenity, db.session)
-    db.session.refresh(new_amenity)
+    finish(db.session)
     return jsonify({"Success": "Amenity added",
                    "Amenity": DataManager.read(new_amenity)}), 201
 
 
+@amenities_api.route("/amenities/bulk", methods=["POST"])
+@jwt_required()
+def add_amenities_bulk():
+    """
+    Function used to create a batch of amenities in one transaction.
+    Invalid or duplicated amenities are reported and skipped,
+    the others are saved.
+    :Returns: jsonify + added amenities + errors per index + error/success code.
+    """
+    current_user = get_jwt_identity()
+    amenities_data = request.get_json()
+    if not isinstance(amenities_data, list) or not amenities_data:
+        return jsonify({"Error": "Expected a list of amenities."}), 400
+
+    names = [amenity_data.get("name") if isinstance(amenity_data, dict)
+             else None for amenity_data in amenities_data]
+    existing_names = {name for (name,) in db.session.query(Amenity.name)
+                      .filter(Amenity.name.in_([n for n in names if n]))}
+
+    errors = {}
+    new_amenities = []
+    indexes = []
+    for index, name in enumerate(names):
+        if not name:
+            errors[index] = "Missing required field."
+            continue
+        if name in existing_names:
+            errors[index] = "Amenity already exists."
+            continue
+        existing_names.add(name)
+        new_amenity = Amenity()
+        new_amenity.name = name
+        new_amenities.append(new_amenity)
+        indexes.append(index)
+
+    failures = DataManager.save_many(new_amenities, db.session)
+    finish(db.session)
+    for position, error in failures.items():
+        errors[indexes[position]] = error
+
+    saved = [amenity for position, amenity in enumerate(new_amenities)
+             if position not in failures]
+    added = [DataManager.read(amenity) for amenity in saved]
+    status = 201 if added else 400
+    return jsonify({"Success": f"{len(added)} amenities added",
+                    "Amenities": added,
+                    "Errors": [{"index": index, "Error": errors[index]}
+                               for index in sorted(errors)]}), status
+
+
 @amenities_api.route("/amenities", methods=["GET"])
+@conditional(Amenity)
 def read_all_amenities():
     """
     Function used to retrieve and read all amenities from the database.
     :Returns: jsonify + message + error/success code.
     """
-    all_amenities = Amenity.query.all()
+    all_amenities = collection_response(Amenity.query, Amenity, 201)
     if not all_amenities:
         return jsonify({"Error": "Amenity not found."}), 404
-    return jsonify([DataManager.read(amenity) for amenity in all_amenities]), 201
+    return all_amenities
 
 
 @amenities_api.route("/amenities/<string:id>", methods=['GET'])
+@conditional(Amenity)
 def read_one_amenity(id):
     """
     function used to retrieve and read a specific amenity from the database.
     :param id: UUID - Unique ID of the amenity.
+    Optional fields: names of the fields to send, separated by commas.
     :Returns: jsonify + message + error/status code.
     """
-    one_amenity = Amenity.query.filter_by(id=id)
+    try:
+        fields = requested_fields(Amenity)
+    except FieldsError as e:
+        return jsonify({"Error": str(e)}), 400
+    one_amenity = DataManager.read_by_id(Amenity, id, db.session, fields)
     if not one_amenity:
         return jsonify({"Error": "Amenity not found."}), 404
-    return jsonify([DataManager.read(amenity) for amenity in one_amenity])
+    return jsonify([one_amenity])
 
 
 @amenities_api.route("/amenities/<string:id>", methods=['PUT'])
@@ -82,7 +139,7 @@ def update_amenity(id):
     if not is_admin:
         return jsonify({"Error": "Admin only !"}), 401
 
-    amenity = Amenity.query.get(id)
+    amenity = DataManager.get(Amenity, id, db.session)
     if not amenity:
         return jsonify({'Error': 'Amenity not found'}), 404
 
@@ -91,7 +148,7 @@ def update_amenity(id):
         return jsonify({'Error': 'No update provided'}), 409
 
     DataManager.update(amenity, updates, db.session)
-    db.session.refresh(amenity)
+    finish(db.session)
     return jsonify({"Success": "Amenity updated.",
                     "Amenity": DataManager.read(amenity)}), 201
 
@@ -110,8 +167,9 @@ def delete_amenity(id):
     if not is_admin:
         return jsonify({"Error": "Admin only !"}), 401
 
-    amenity = Amenity.query.get(id)
+    amenity = DataManager.get(Amenity, id, db.session)
     if not amenity:
         return jsonify({'Error': 'Amenity not found'}), 404
     DataManager.delete(amenity, db.session)
+    finish(db.session)
     return jsonify({'Success': 'Amenity deleted'}), 201
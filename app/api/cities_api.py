@@ -2,14 +2,14 @@ from flask import Blueprint, jsonify, request
 from models.country import Country
 from models.city import City
 from persistence.datamanager import DataManager
-from config import Config, db
-from sqlalchemy.orm import sessionmaker
+from persistence.expand import ExpandError, expand_options, expand_paths
+from persistence.serializer import collection_response
+from persistence.versions import conditional
+from persistence.unit_of_work import finish
+from config import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from api.login_api import admin_only
 
-Session = sessionmaker(bind=Config.engine)
-session = Session()
-
 cities_api = Blueprint("cities_api", __name__)
 
 
@@ -38,21 +38,28 @@ def create_cities():
     if is_city_uniq:
         return jsonify({"Error": "City already exists in this country."}), 409
 
-    DataManager.create(new_city, db.session)
-    db.session.refresh(new_city)
+    DataManager.save(new_city, db.session)
+    finish(db.session)
     return jsonify({"Success": "City added."}), 201
 
 
 @cities_api.route("/cities", methods=["GET"])
+@conditional(City)
 def read_all_cities():
     """
     Function used to read all cities from te database.
+    Optional expand=country,places adds those to each city.
     :Returns: jsonify + message + error/success code.
     """
-    all_cities = City.query.all()
+    try:
+        expand = expand_paths(City)
+    except ExpandError as e:
+        return jsonify({"Error": str(e)}), 400
+    query = City.query.options(*expand_options(City, expand))
+    all_cities = collection_response(query, City, 201, expand=expand)
     if not all_cities:
         return jsonify({"Error": "City not found."}), 404
-    return jsonify([DataManager.read(city) for city in all_cities]), 201
+    return all_cities
 
 
 @cities_api.route("/cities/<country_code>", methods=["GET"])
@@ -91,7 +98,7 @@ def update_city(id):
         return jsonify({'Error': 'No update provided'}), 409
 
     DataManager.update(city, updates, db.session)
-    db.session.refresh(city)
+    finish(db.session)
     return jsonify({"Success": "City updated.", "City": DataManager.read(city)}), 201
 
 
@@ -112,4 +119,5 @@ def delete_city(id):
     if not city:
         return jsonify({'Error': 'City not found'}), 404
     DataManager.delete(city, db.session)
+    finish(db.session)
     return jsonify({'Success': 'City deleted'}), 201
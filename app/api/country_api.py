@@ -1,16 +1,16 @@
 from flask import Blueprint, jsonify, request
 from models.country import Country
 from models.city import City
+from persistence.countries import country_index, encoded_response
 from persistence.datamanager import DataManager
-from config import Config, db
-from sqlalchemy.orm import sessionmaker
-import pycountry
+from persistence.pagination import PaginationError, page_args, paginate
+from persistence.serializer import json_response, serializer_for
+from persistence.unit_of_work import finish
+from persistence.versions import conditional
+from config import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from api.login_api import admin_only
 
-Session = sessionmaker(bind=Config.engine)
-session = Session()
-
 country_api = Blueprint("country_api", __name__)
 
 
@@ -30,11 +30,7 @@ def country():
     country_name = country_data.get("name")
     country_code = country_data.get("code")
 
-    pycountry_country = None
-    for country in pycountry.countries:
-        if country.alpha_2 == country_code:
-            pycountry_country = country
-            break
+    pycountry_country = country_index().by_alpha_2.get(country_code)
     if not pycountry_country or pycountry_country.name != country_name:
         return jsonify({"Error": "Country must exist in pycountry."}), 409
 
@@ -45,6 +41,7 @@ def country():
     new_country = Country(name=country_name, code=country_code)
     try:
         DataManager.save(new_country, db.session)
+        finish(db.session)
         return jsonify({"Success": "Country added.", "country": DataManager.read(new_country)}), 201
     except Exception as e:
         db.session.rollback()
@@ -55,45 +52,57 @@ def country():
 @jwt_required()
 def read_countries_from_pycountry():
     """
-    Function that retrieves and reads countries from Pycountry.
-    :Returns: jsonify + message + error/success code.
+    Function that retrieves and reads countries from Pycountry,
+    encoded once per worker and cached by the clients.
+    :Returns: JSON + message + error/success code.
     """
-    countries = [{"name": country.name, "code": country.alpha_2}
-                 for country in pycountry.countries]
-    return jsonify(countries), 200
+    return encoded_response(country_index().list_body)
 
 
 @country_api.route("/countries/<country_code>", methods=["GET"])
 @jwt_required()
 def get_country(country_code):
     """
-    Function used to retrieve details of a specific country from pycountry.
-    :param country_code: alpha code of a specific country.
-    :Returns: jsonify + message + error/success code.
+    Function used to retrieve details of a specific country from pycountry,
+    encoded once per worker and cached by the clients.
+    :param country_code: alpha_2 or alpha_3 code of a specific country.
+    :Returns: JSON + message + error/success code.
     """
-    country = pycountry.countries.get(alpha_2=country_code.upper())
+    index = country_index()
+    country = index.get(country_code)
     if not country:
         return jsonify({"Error": "Country not found."}), 404
-
-    country_details = {"name": country.name, "code": country.alpha_2}
-    return jsonify({"Country": country_details}), 201
+    return encoded_response(index.detail_bodies[country.code], 201)
 
 
 @country_api.route("/countries/<country_code>/cities", methods=["GET"])
 @jwt_required()
+@conditional(City)
 def get_country_cities(country_code):
     """
     Function used to retrieve all cities belonging to a specific country*
+    One page of them with its next_cursor when the client sends limit
+    or cursor.
     :param country_code: alpha code of a specific country.
     :Returns: jsonify + message + error/success code.
     """
-    country = pycountry.countries.get(alpha_2=country_code.upper())
+    country = country_index().by_alpha_2.get(country_code.upper())
     if not country:
         return jsonify({"Error": "Country not found"}), 404
 
-    cities = City.query.filter_by(country_code=country.alpha_2).all()
-    if not cities:
+    query = City.query.filter_by(country_code=country.code)
+    columns = (City.created_at, City.id)
+    try:
+        page = page_args()
+        if page is None:
+            cities = query.order_by(*columns).all()
+        else:
+            cities, next_cursor = paginate(query, columns, *page)
+    except PaginationError as e:
+        return jsonify({"Error": str(e)}), 400
+    if not cities and not (page and page[1]):
         return jsonify({"error": "No cities found for this country."}), 404
-
-    return jsonify({'Cities':
-                    [DataManager.read(city) for city in cities]}), 200
+    body = {'Cities': serializer_for(City).serialize_many(cities)}
+    if page is not None:
+        body['next_cursor'] = next_cursor
+    return json_response(body)
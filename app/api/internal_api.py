@@ -0,0 +1,90 @@
+from flask import Blueprint, jsonify
+from config import db
+from persistence.cache import entity_cache
+from persistence.engine import pool_status
+from persistence.principals import principal_cache
+from persistence.revocation import revocation_list
+from persistence.routing import replica_engines
+from persistence.throttle import login_throttle
+from flask_jwt_extended import jwt_required
+from api.login_api import admin_only
+
+internal_api = Blueprint("internal_api", __name__)
+
+
+@internal_api.route("/internal/pool", methods=["GET"])
+@jwt_required()
+def read_pool_status():
+    """
+    Function used to read the state of the connection pools of this worker:
+    the primary one, and the one of each read replica.
+    Admin only
+    :Returns: jsonify + pool status + error/success code.
+    """
+    is_admin = admin_only()
+    if not is_admin:
+        return jsonify({"Error": "Admin only !"}), 401
+    status = pool_status(db.engine)
+    replicas = [pool_status(engine) for engine in replica_engines()]
+    if replicas:
+        status["replicas"] = replicas
+    return jsonify(status), 200
+
+
+@internal_api.route("/internal/cache", methods=["GET"])
+@jwt_required()
+def read_cache_stats():
+    """
+    Function used to read the counters of the entity cache of this worker.
+    Admin only
+    :Returns: jsonify + counters by table + error/success code.
+    """
+    is_admin = admin_only()
+    if not is_admin:
+        return jsonify({"Error": "Admin only !"}), 401
+    return jsonify(entity_cache.stats()), 200
+
+
+@internal_api.route("/internal/principals", methods=["GET"])
+@jwt_required()
+def read_principal_stats():
+    """
+    Function used to read the counters of the cache of the users
+    of the tokens of this worker, hit_rate included.
+    Admin only
+    :Returns: jsonify + counters + error/success code.
+    """
+    is_admin = admin_only()
+    if not is_admin:
+        return jsonify({"Error": "Admin only !"}), 401
+    return jsonify(principal_cache.stats()), 200
+
+
+@internal_api.route("/internal/throttle", methods=["GET"])
+@jwt_required()
+def read_throttle_stats():
+    """
+    Function used to read the limits of the logins and the attempts
+    rejected by all the workers, by email and by IP.
+    Admin only
+    :Returns: jsonify + counters + error/success code.
+    """
+    is_admin = admin_only()
+    if not is_admin:
+        return jsonify({"Error": "Admin only !"}), 401
+    return jsonify(login_throttle.stats()), 200
+
+
+@internal_api.route("/internal/revocation", methods=["GET"])
+@jwt_required()
+def read_revocation_stats():
+    """
+    Function used to read the size of the filter of the revoked tokens
+    of this worker, and how many checks needed a query.
+    Admin only
+    :Returns: jsonify + counters + error/success code.
+    """
+    is_admin = admin_only()
+    if not is_admin:
+        return jsonify({"Error": "Admin only !"}), 401
+    return jsonify(revocation_list.stats()), 200
@@ -0,0 +1,19 @@
+from flask import Blueprint, Response, current_app, jsonify
+from persistence.jwt_keys import JWKS_MAX_AGE
+
+keys_api = Blueprint("keys_api", __name__)
+
+
+@keys_api.route("/.well-known/jwks.json", methods=["GET"])
+def read_jwks():
+    """
+    Function used to publish the public keys verifying the tokens,
+    as a JWKS document rendered once at startup.
+    :Returns: JWKS document + error/success code.
+    """
+    ring = current_app.extensions.get("jwt_keys")
+    if ring is None:
+        return jsonify({"Error": "Tokens are not signed with public keys."}), 404
+    response = Response(ring.jwks, mimetype="application/json")
+    response.headers["Cache-Control"] = f"public, max-age={JWKS_MAX_AGE}"
+    return response, 200
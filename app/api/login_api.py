@@ -1,7 +1,12 @@
 from flask import Blueprint, jsonify, request
 from models.users import User
-from flask_jwt_extended import create_access_token
-from flask_jwt_extended import get_jwt
+from config import db
+from persistence.principals import current_principal, principal_cache
+from persistence.revocation import revocation_list
+from persistence.throttle import login_throttle, throttled_response
+from persistence.unit_of_work import finish
+from flask_jwt_extended import create_access_token, create_refresh_token
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 login_api = Blueprint("login_api", __name__)
 
 
@@ -10,30 +15,81 @@ def login():
     """
     Function used to handle logins by comparing user entries (email/password)
     and calling the check_password method from the User class.
+    A password hashed with an outdated bcrypt cost is hashed again.
     :Returns: jsonify + message + error code on failure
-    :Returns: jsonify + access token + success code on success
+    :Returns: jsonify + access and refresh tokens + success code on success
+    :Returns: jsonify + message + 503 when the bcrypt pool is full
+    :Returns: jsonify + message + 429 when the email or the IP sent
+    too many attempts
     """
     # Require data for login
     email = request.json.get('email', None)
     password = request.json.get('password', None)
+    # Throttle before any query or bcrypt check
+    wait = login_throttle.check(email, request.remote_addr)
+    if wait:
+        return throttled_response(wait)
     # Query database for response
     user = User.query.filter_by(email=email).first()
     # Manage access token
     if user and User.check_password(user.password_hash, password):
+        if User.needs_rehash(user.password_hash):
+            user.password_hash = User.set_password(password)
+            finish(db.session)
         # Add role information to the token
         additional_claims = {"is_admin": user.is_admin}
         # Create user access token
         access_token = create_access_token(
             identity=user.id, additional_claims=additional_claims)
-        return jsonify(access_token=access_token), 200
+        # Refresh token, to get access tokens without the password
+        refresh_token = create_refresh_token(identity=user.id)
+        return jsonify(access_token=access_token,
+                       refresh_token=refresh_token), 200
     return jsonify({"Error": "Wrong access input"}), 401
 
 
+@login_api.route('/token/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """
+    Function used to create a new access token from a refresh token,
+    with the current role of the user.
+    :Returns: jsonify + access token + success code on success
+    :Returns: jsonify + message + error code on failure
+    """
+    principal = principal_cache.get(get_jwt_identity(), db.session)
+    if principal is None:
+        return jsonify({"Error": "User not found"}), 401
+    access_token = create_access_token(
+        identity=principal.id,
+        additional_claims={"is_admin": principal.is_admin})
+    return jsonify(access_token=access_token), 200
+
+
+@login_api.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """
+    Function used to revoke the token sent, access or refresh token:
+    call it with each of them to revoke both.
+    :Returns: jsonify + message + success code
+    """
+    claims = get_jwt()
+    revocation_list.revoke(db.session, claims)
+    finish(db.session)
+    token_type = claims['type'].capitalize()
+    return jsonify({"Success": f"{token_type} token revoked."}), 200
+
+
 def admin_only():
     """
-    Function used to handle admin claims.
+    Function used to handle admin claims, read from the cached user of
+    the token when the app has the user loader.
     :Returns: boolean
     """
+    principal = current_principal()
+    if principal is not None:
+        return principal.is_admin
     claims = get_jwt()
     if claims.get("is_admin") is False:
         return False
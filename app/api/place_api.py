@@ -1,28 +1,39 @@
 from flask import Blueprint, jsonify, request
 from models.place import Place
 from persistence.datamanager import DataManager
-from config import Config, db
-from sqlalchemy.orm import sessionmaker
+from persistence.expand import (ExpandError, expand_options, expand_paths,
+                                get_expanded)
+from persistence.facets import (FILTER_MODELS, FilterError, facet_counts,
+                               place_filters)
+from persistence.nearby import nearby_places, nearby_response_data
+from persistence.pagination import (MAX_PAGE_SIZE, PaginationError,
+                                    default_page_size, page_args)
+from persistence.ratings import RATING_FIELDS
+from persistence.search import SearchError, search_places
+from persistence.serializer import (FieldsError, collection_response,
+                                    expand_tree, json_response,
+                                    projection_for, requested_fields,
+                                    serialize_expanded)
+from persistence.versions import conditional
+from persistence.unit_of_work import finish
+from config import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-Session = sessionmaker(bind=Config.engine)
-session = Session()
-
 place_api = Blueprint("place_api", __name__)
 
+# Fields computed from other rows, never set by the clients
+DERIVED_FIELDS = (*RATING_FIELDS, 'amenity_mask', 'geohash')
+# Largest radius of a nearby search, and the default one
+MAX_RADIUS_KM = 1000.0
+DEFAULT_RADIUS_KM = 10.0
 
-@place_api.route("/places", methods=["POST"])
-@jwt_required()
-def create_place():
+
+def new_place_from_data(place_data):
     """
-    Function used to create a new place, send it to the database datamanager.
-    :Returns: jsonify + message + error/success code.
+    Function used to validate the data of a place and build it.
+    :param place_data: dict - data of the place sent by the client.
+    :Returns: (new place, None) on success, (None, error message) on failure.
     """
-    current_user = get_jwt_identity()
-    place_data = request.get_json()
-    if not place_data:
-        return jsonify({"Error": "Problem during place creation"})
-
     name = place_data.get("name")
     description = place_data.get("description")
     address = place_data.get("address")
@@ -39,17 +50,17 @@ def create_place():
     if not all([name, description, address, latitude, longitude,
                 num_rooms, num_bathrooms, price_per_night, max_guests,
                 city_id, host_id]):
-        return jsonify({"Error": "Missing required field."}), 400
-
-    if not (isinstance(arg, str)
-            for arg in (name, description, address)):
-        raise TypeError({"Error": "TypeError"})
-    if not (isinstance(arg, int)
-            for arg in (num_bathrooms, num_rooms, max_guests)):
-        raise TypeError({"Error": "TypeError"})
-    if not (isinstance(arg, (float, int))
-            for arg in (latitude, longitude, price_per_night)):
-        raise TypeError({"Error": "TypeError"})
+        return None, "Missing required field."
+
+    if not all(isinstance(arg, str)
+               for arg in (name, description, address)):
+        return None, "TypeError"
+    if not all(isinstance(arg, int)
+               for arg in (num_bathrooms, num_rooms, max_guests)):
+        return None, "TypeError"
+    if not all(isinstance(arg, (float, int))
+               for arg in (latitude, longitude, price_per_night)):
+        return None, "TypeError"
 
     new_place = Place()
     new_place.name = name
@@ -64,38 +75,198 @@ def create_place():
     new_place.price_per_night = price_per_night
     new_place.max_guests = max_guests
     new_place.amenity_ids = amenity_ids
+    return new_place, None
+
+
+@place_api.route("/places", methods=["POST"])
+@jwt_required()
+def create_place():
+    """
+    Function used to create a new place, send it to the database datamanager.
+    :Returns: jsonify + message + error/success code.
+    """
+    current_user = get_jwt_identity()
+    place_data = request.get_json()
+    if not place_data:
+        return jsonify({"Error": "Problem during place creation"})
+
+    new_place, error = new_place_from_data(place_data)
+    if error:
+        return jsonify({"Error": error}), 400
 
     if not new_place:
         return jsonify({"Error": "setting up new place"}), 500
 
     DataManager.save(new_place, db.session)
-    db.session.refresh(new_place)
+    finish(db.session)
     return jsonify({"Success": "Place added"}, DataManager.read(new_place)), 201
 
 
+@place_api.route("/places/bulk", methods=["POST"])
+@jwt_required()
+def create_places_bulk():
+    """
+    Function used to create a batch of places in one transaction.
+    Invalid places are reported and skipped, the others are saved.
+    :Returns: jsonify + added places + errors per index + error/success code.
+    """
+    current_user = get_jwt_identity()
+    places_data = request.get_json()
+    if not isinstance(places_data, list) or not places_data:
+        return jsonify({"Error": "Expected a list of places."}), 400
+
+    errors = {}
+    new_places = []
+    indexes = []
+    for index, place_data in enumerate(places_data):
+        if not isinstance(place_data, dict):
+            errors[index] = "Problem during place creation"
+            continue
+        new_place, error = new_place_from_data(place_data)
+        if error:
+            errors[index] = error
+            continue
+        new_places.append(new_place)
+        indexes.append(index)
+
+    failures = DataManager.save_many(new_places, db.session)
+    finish(db.session)
+    for position, error in failures.items():
+        errors[indexes[position]] = error
+
+    saved = [place for position, place in enumerate(new_places)
+             if position not in failures]
+    added = [DataManager.read(place) for place in saved]
+    status = 201 if added else 400
+    return jsonify({"Success": f"{len(added)} places added",
+                    "Places": added,
+                    "Errors": [{"index": index, "Error": errors[index]}
+                               for index in sorted(errors)]}), status
+
+
 @place_api.route("/places", methods=["GET"])
+@conditional(Place, filters=FILTER_MODELS)
 def read_all_places():
     """
     Function used to retrieve and read all places, from the database.
+    Optional filters: country, city_id, min_price, max_price, guests,
+    rooms, amenities and any_amenities (ids separated by commas),
+    min_rating (1 to 5).
+    sort=rating lists the best rated places first, facets=1 adds the
+    counts per city, amenity and price bucket to the page.
+    expand=city,city.country,amenities,reviews,host adds those
+    relationships to each place, fields=id,name,... sends only those.
     :Returns: jsonify + message + error/success code.
     """
-    all_places = Place.query.all()
+    try:
+        criteria = place_filters(request.args, db.session)
+        expand = expand_paths(Place)
+    except (FilterError, ExpandError) as e:
+        return jsonify({"Error": str(e)}), 400
+    query = Place.query.filter(*criteria).options(
+        *expand_options(Place, expand))
+
+    sort = request.args.get("sort")
+    if sort not in (None, "rating"):
+        return jsonify({"Error": "sort must be rating."}), 400
+    columns = (Place.rating_avg, Place.id) if sort == "rating" else None
+
+    extra = None
+    if request.args.get("facets") in ("1", "true"):
+        extra = {"facets": facet_counts(db.session, criteria)}
+    all_places = collection_response(query, Place, columns=columns,
+                                     descending=columns is not None,
+                                     extra=extra, expand=expand)
     if not all_places:
         return jsonify({"Error": "Place not found."}), 404
-    return jsonify([DataManager.read(place) for place in all_places])
+    return all_places
+
+
+@place_api.route("/places/nearby", methods=["GET"])
+@conditional(Place)
+def read_nearby_places():
+    """
+    Function used to retrieve the places around a point, the nearest first.
+    Parameters: lat, lon, radius_km (default 10, at most 1000), limit,
+    expand and fields.
+    :Returns: jsonify + places with their distance_km + error/success code.
+    """
+    try:
+        expand = expand_paths(Place)
+        fields = requested_fields(Place, expand)
+    except (ExpandError, FieldsError) as e:
+        return jsonify({"Error": str(e)}), 400
+    try:
+        latitude = float(request.args["lat"])
+        longitude = float(request.args["lon"])
+        radius_km = float(request.args.get("radius_km", DEFAULT_RADIUS_KM))
+        limit = int(request.args.get("limit", default_page_size()))
+    except (KeyError, ValueError):
+        return jsonify({"Error": "lat and lon are required, radius_km "
+                                 "and limit must be numbers."}), 400
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return jsonify({"Error": "lat or lon out of range."}), 400
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        return jsonify({"Error": "radius_km must be included between 0 "
+                                 f"and {MAX_RADIUS_KM:g}."}), 400
+    if limit < 1:
+        return jsonify({"Error": "limit must be a positive integer."}), 400
+
+    results = nearby_places(db.session, latitude, longitude, radius_km,
+                            min(limit, MAX_PAGE_SIZE),
+                            expand_options(Place, expand), fields)
+    return json_response(nearby_response_data(results, expand, fields))
+
+
+@place_api.route("/places/search", methods=["GET"])
+@conditional(Place)
+def search_all_places():
+    """
+    Function used to search places by words of their name, address
+    and description, the best matches first.
+    Parameters: q, expand, fields, and limit and cursor for the next pages.
+    :Returns: jsonify + {"items", "next_cursor"} + error/success code.
+    """
+    try:
+        expand = expand_paths(Place)
+        fields = requested_fields(Place, expand)
+        limit, cursor = page_args() or (default_page_size(), None)
+        places, next_cursor = search_places(
+            db.session, request.args.get("q"), limit, cursor,
+            expand_options(Place, expand), fields)
+    except (ExpandError, FieldsError, PaginationError, SearchError) as e:
+        return jsonify({"Error": str(e)}), 400
+    if fields:
+        items = projection_for(Place, fields).serialize_many(places)
+    else:
+        tree = expand_tree(expand)
+        items = [serialize_expanded(place, tree) for place in places]
+    return json_response({"items": items, "next_cursor": next_cursor})
 
 
 @place_api.route("/places/<string:id>", methods=['GET'])
+@conditional(Place)
 def read_one_place(id):
     """
     Function used to retrieve and read a specific place, from the database.
     :param id: UUID - ID of a specific place
+    Optional expand and fields, as for the list of places.
     :Returns: jsonify + message + error/success code.
     """
-    one_place = Place.query.filter_by(id=id)
+    try:
+        expand = expand_paths(Place)
+        fields = requested_fields(Place, expand)
+    except (ExpandError, FieldsError) as e:
+        return jsonify({"Error": str(e)}), 400
+    if not expand:
+        one_place = DataManager.read_by_id(Place, id, db.session, fields)
+    else:
+        one_place = get_expanded(Place, id, db.session, expand)
+        if one_place:
+            one_place = serialize_expanded(one_place, expand_tree(expand))
     if not one_place:
         return jsonify({"Error": "Place not found."}), 404
-    return jsonify([DataManager.read(place) for place in one_place])
+    return jsonify([one_place])
 
 
 @place_api.route("/places/<string:id>", methods=['PUT'])
@@ -108,7 +279,7 @@ def update_place(id):
     :Returns: jsonify + message + error/success code.
     """
     current_user = get_jwt_identity()
-    place = Place.query.get(id)
+    place = DataManager.get(Place, id, db.session)
     if not place:
         return jsonify({'Error': 'Place not found'}), 404
 
@@ -116,8 +287,11 @@ def update_place(id):
     if not updates:
         return jsonify({'Error': 'No update provided'}), 409
 
+    # Those fields only change with the reviews and the amenities
+    updates = {key: value for key, value in updates.items()
+               if key not in DERIVED_FIELDS}
     DataManager.update(place, updates, db.session)
-    db.session.refresh(place)
+    finish(db.session)
     return jsonify({"Success": "Place updated.",
                     "Place": DataManager.read(place)}), 201
 
@@ -132,8 +306,9 @@ def delete_place(id):
     :Returns: jsonify + message + error/success code.
     """
     current_user = get_jwt_identity()
-    place = Place.query.get(id)
+    place = DataManager.get(Place, id, db.session)
     if not place:
         return jsonify({'Error': 'Place not found'}), 404
     DataManager.delete(place, db.session)
+    finish(db.session)
     return jsonify({'Success': 'Place deleted'}), 201
@@ -2,17 +2,43 @@ from flask import Blueprint, jsonify, request
 from models.review import Review
 from models.place import Place
 from models.users import User
+from models.base_model import NIL_UUID, as_uuid
 from persistence.datamanager import DataManager
-from config import Config, db
-from sqlalchemy.orm import sessionmaker
+from persistence.expand import (ExpandError, expand_options, expand_paths,
+                                get_expanded)
+from persistence.principals import principal_cache
+from persistence.serializer import (FieldsError, collection_response,
+                                    expand_tree, projected_entity,
+                                    requested_fields, serialize_expanded)
+from persistence.unit_of_work import finish
+from config import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-Session = sessionmaker(bind=Config.engine)
-session = Session()
-
 review_api = Blueprint("review_api", __name__)
 
 
+def review_data_error(review_data):
+    """
+    Function used to validate the data of a review.
+    :param review_data: dict - data of the review sent by the client.
+    :Returns: None if valid, (error message, error code) otherwise.
+    """
+    rating = review_data.get("rating")
+    if not isinstance(rating, int):
+        return "rating must be an integer.", 400
+    if not 1 <= rating <= 5:
+        return "rating must be included between 1 and 5.", 400
+
+    comment = review_data.get("comment")
+    if not isinstance(comment, str):
+        return "comment must be a string.", 400
+
+    user_id = review_data.get("user_id")
+    if not all([rating, comment, user_id]):
+        return "Missing recquired field.", 409
+    return None
+
+
 @review_api.route("/places/<string:id>/reviews", methods=["POST"])
 @jwt_required()
 def create_review(id):
@@ -27,24 +53,17 @@ def create_review(id):
     if not review_data:
         return jsonify({"Error": "Problem during review creation"}), 400
 
-    rating = review_data.get("rating")
-    if not isinstance(rating, int):
-        return jsonify({"Error": "rating must be an integer."}), 400
-    if not 1 <= rating <= 5:
-        return jsonify({"Error":
-                        "rating must be included between 1 and 5."}), 400
+    error = review_data_error(review_data)
+    if error:
+        message, code = error
+        return jsonify({"Error": message}), code
 
+    rating = review_data.get("rating")
     comment = review_data.get("comment")
-    if not isinstance(comment, str):
-        return jsonify({"Error": "comment must be a string."}), 400
-
     user_id = review_data.get("user_id")
-    if not all(rating, comment, user_id, place_id):
-        return jsonify({"Error": "Missing recquired field."}), 409
 
-    is_host = \
-        db.session.query(Place.id).filter_by(host_id=Place.host_id).first()
-    if is_host == user_id:
+    reviewer = principal_cache.get(user_id, db.session)
+    if reviewer and reviewer.place_id == place_id:
         return jsonify({"Error": "You cannot review your own place."}), 400
 
     existing_review = db.session.query(Review)\
@@ -62,25 +81,105 @@ def create_review(id):
         return jsonify({"Error": "creating a new review."}), 400
 
     DataManager.save(new_review, db.session)
-    db.session.refresh(new_review)
+    finish(db.session)
     return jsonify({"Success": "Review added",
                     "review": DataManager.read(new_review)}), 201
 
 
+@review_api.route("/places/<string:id>/reviews/bulk", methods=["POST"])
+@jwt_required()
+def create_reviews_bulk(id):
+    """
+    Function used to create a batch of reviews of a place
+    in one transaction.
+    Invalid reviews, reviews of the host and second reviews of a user
+    are reported and skipped, the others are saved.
+    :param id: UUID - id of the place.
+    :Returns: jsonify + added reviews + errors per index + error/success code.
+    """
+    current_user = get_jwt_identity()
+    place = DataManager.get(Place, id, db.session)
+    if not place:
+        return jsonify({"Error": "Place not found."}), 404
+
+    reviews_data = request.get_json()
+    if not isinstance(reviews_data, list) or not reviews_data:
+        return jsonify({"Error": "Expected a list of reviews."}), 400
+
+    user_ids = [review_data.get("user_id") for review_data in reviews_data
+                if isinstance(review_data, dict)]
+    # Compared as UUIDs: the same id may be sent in another case or form
+    reviewers = {as_uuid(user_id) for (user_id,)
+                 in db.session.query(Review.user_id)
+                 .filter(Review.place_id == place.id,
+                         Review.user_id.in_([u for u in user_ids if u]))}
+
+    errors = {}
+    new_reviews = []
+    indexes = []
+    for index, review_data in enumerate(reviews_data):
+        if not isinstance(review_data, dict):
+            errors[index] = "Problem during review creation"
+            continue
+        error = review_data_error(review_data)
+        if error:
+            errors[index] = error[0]
+            continue
+        user_id = review_data.get("user_id")
+        reviewer = as_uuid(user_id)
+        if reviewer == as_uuid(place.host_id):
+            errors[index] = "You cannot review your own place."
+            continue
+        if reviewer in reviewers:
+            errors[index] = "You cannot review a place twice."
+            continue
+        if reviewer != NIL_UUID:
+            reviewers.add(reviewer)
+
+        new_review = Review()
+        new_review.rating = review_data.get("rating")
+        new_review.comment = review_data.get("comment")
+        new_review.user_id = user_id
+        new_review.place_id = place.id
+        new_reviews.append(new_review)
+        indexes.append(index)
+
+    failures = DataManager.save_many(new_reviews, db.session)
+    finish(db.session)
+    for position, error in failures.items():
+        errors[indexes[position]] = error
+
+    saved = [review for position, review in enumerate(new_reviews)
+             if position not in failures]
+    added = [DataManager.read(review) for review in saved]
+    status = 201 if added else 400
+    return jsonify({"Success": f"{len(added)} reviews added",
+                    "Reviews": added,
+                    "Errors": [{"index": index, "Error": errors[index]}
+                               for index in sorted(errors)]}), status
+
+
 @review_api.route("/users/<string:id>/reviews", methods=['GET'])
 @jwt_required()
 def user_review(id):
     """
     Function used to retrieve reviews posted by a user from the database.
-    :param id: UUID - id of the place.
+    Optional expand=place,place.city,user adds those to each review,
+    fields=id,rating,... sends only those.
+    :param id: UUID - id of the user.
     :Returns: jsonify + message + error/success code.
     """
     current_user = get_jwt_identity()
-    those_reviews = db.session.query(Review.id).filter_by(id=id)
+    try:
+        expand = expand_paths(Review)
+    except ExpandError as e:
+        return jsonify({"Error": str(e)}), 400
+    query = Review.query.filter_by(user_id=id).options(
+        *expand_options(Review, expand))
+    those_reviews = collection_response(query, Review, 201, expand=expand)
     if not those_reviews:
         return jsonify({"Error": "Review not found."}), 404
-    return jsonify({"Reviews": DataManager.read(review)
-                    for review in those_reviews}), 201
+    return those_reviews
 
 
 @review_api.route("/reviews/<string:id>", methods=['GET'])
@@ -88,13 +187,24 @@ def user_review(id):
 def read_one_review(id):
     """
     Function used to retrieve and read a specific review, from the database.
+    Optional expand and fields, as for the reviews of a user.
     :param id: UUID - id of the review.
     :Returns: jsonify + message + error/success code.
     """
-    one_review = Review.query.filter_by(id=id)
+    try:
+        expand = expand_paths(Review)
+        fields = requested_fields(Review, expand)
+    except (ExpandError, FieldsError) as e:
+        return jsonify({"Error": str(e)}), 400
+    if fields:
+        one_review = projected_entity(Review, id, db.session, fields)
+    else:
+        one_review = get_expanded(Review, id, db.session, expand)
+        if one_review:
+            one_review = serialize_expanded(one_review, expand_tree(expand))
     if not one_review:
         return jsonify({"Error": "Review not found."}), 404
-    return jsonify([DataManager.read(review) for review in one_review]), 201
+    return jsonify([one_review]), 201
 
 
 @review_api.route("/reviews/<string:id>", methods=['PUT'])
@@ -114,8 +224,13 @@ def update_review(id):
     if not updates:
         return jsonify({'Error': 'No update provided'}), 409
 
+    rating = updates.get("rating", review.rating)
+    if not isinstance(rating, int) or not 1 <= rating <= 5:
+        return jsonify({"Error": "rating must be an integer "
+                                 "included between 1 and 5."}), 400
+
     DataManager.update(review, updates, db.session)
-    db.session.refresh(review)
+    finish(db.session)
     return jsonify({"Success": "Review updated.",
                     "Place": DataManager.read(review)}), 201
 
@@ -133,4 +248,5 @@ def delete_review(id):
     if not review:
         return jsonify({'Error': 'Review not found'}), 404
     DataManager.delete(review, db.session)
+    finish(db.session)
     return jsonify({'Success': 'Review deleted'}), 201
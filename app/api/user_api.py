@@ -1,14 +1,12 @@
 from flask import Blueprint, jsonify, request
 from models.users import User
 from persistence.datamanager import DataManager
-from validate_email_address import validate_email
-from config import Config, db
-from sqlalchemy.orm import sessionmaker
+from persistence.serializer import (FieldsError, collection_response,
+                                    json_response, requested_fields)
+from persistence.unit_of_work import finish
+from config import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from api.login_api import admin_only
-Session = sessionmaker(bind=Config.engine)
-session = Session()
-
 user_api = Blueprint("user_api", __name__)
 
 
@@ -33,6 +31,8 @@ def add_user():
     if not all(c.isascii() for c in last_name) or not first_name.isalpha():
         return jsonify({"Error": "Last name must contain only ascii characters."}), 400
 
+    # Compiles its address grammar on import, only needed here
+    from validate_email_address import validate_email
     is_email_valid = validate_email(email)
     if not is_email_valid:
         return jsonify({"Error": "Email not valid"}), 400
@@ -54,7 +54,7 @@ def add_user():
         return jsonify({"Error": "setting up new user"}), 500
     else:
         DataManager.save(new_user, db.session)
-        db.session.refresh(new_user)
+        finish(db.session)
     return jsonify({"Success": "User added", 'User': DataManager.read(new_user)}), 201
 
 
@@ -70,8 +70,10 @@ def read_all_users():
     is_admin = admin_only()
     if not is_admin:
         return jsonify({"Error": "Admin only !"}), 401
-    all_users = User.query.all()
-    return jsonify([DataManager.read(user) for user in all_users]), 201
+    all_users = collection_response(User.query, User, 201)
+    if not all_users:
+        return json_response([], 201)
+    return all_users
 
 
 @user_api.route("/users/<string:id>", methods=["GET"])
@@ -79,12 +81,19 @@ def read_all_users():
 def get_one_user(id):
     """
     Function used to retrieve a specific user from the database.
+    Optional fields: names of the fields to send, separated by commas.
     :param id: UUID - ID of this specific user.
     :Returns: jsonify + message + error/success code.
     """
     current_user = get_jwt_identity()
-    one_user = User.query.filter_by(id=id)
-    return jsonify([DataManager.read(user) for user in one_user]), 201
+    try:
+        fields = requested_fields(User)
+    except FieldsError as e:
+        return jsonify({"Error": str(e)}), 400
+    one_user = DataManager.read_by_id(User, id, db.session, fields)
+    if not one_user:
+        return jsonify({'Error': 'User not found'}), 404
+    return jsonify([one_user]), 201
 
 
 @user_api.route("/users/<string:id>", methods=["PUT"])
@@ -96,7 +105,7 @@ def update_user(id):
     :Returns: jsonify + message + error/success code.
     """
     current_user = get_jwt_identity()
-    user = User.query.get(id)
+    user = DataManager.get(User, id, db.session)
     if not user:
         return jsonify({'Error': 'User not found'}), 404
 
@@ -132,7 +141,7 @@ def update_user(id):
         return jsonify({"Error": "Password not hashed"}), 500
 
     DataManager.update(user, updates, db.session)
-    db.session.refresh(user)
+    finish(db.session)
     return jsonify({"Success": "User updated.", "User": DataManager.read(user)}), 201
 
 
@@ -145,8 +154,9 @@ def delete_user(id):
     :Returns: jsonify + message + error/success code.
     """
     current_user = get_jwt_identity()
-    user = User.query.get(id)
+    user = DataManager.get(User, id, db.session)
     if not user:
         return jsonify({'Error': 'User not found'}), 404
     DataManager.delete(user, db.session)
+    finish(db.session)
     return jsonify({'Success': 'User deleted'}), 201
@@ -1,10 +1,19 @@
+import click
 import os
 from flask import Flask, jsonify
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
-from flask_swagger_ui import get_swaggerui_blueprint
 from flask_cors import CORS
 from config import *
+from commands import init_commands
+from persistence.cache import init_entity_cache
+from persistence.jwt_keys import init_jwt_keys
+from persistence.passwords import init_password_hasher
+from persistence.principals import init_principals
+from persistence.revocation import init_revocation
+from persistence.query_count import init_query_count
+from persistence.routing import init_replicas
+from persistence.throttle import init_login_throttle
+from persistence.unit_of_work import init_unit_of_work
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,16 +21,38 @@ host = os.environ.get('HOST')
 port = int(os.environ.get('PORT', 5000))
 
 
+def init_migrate(app):
+    """
+    Registers Flask-Migrate for the flask db commands. alembic is half of
+    the import time of the app, so only the apps loaded by the flask CLI
+    import it, not the workers.
+    """
+    if click.get_current_context(silent=True) is None:
+        return
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
     db.init_app(app)
-    migrate = Migrate(app, db)
+    init_migrate(app)
+    init_replicas(app)
+    init_unit_of_work(app)
+    init_entity_cache(app)
+    init_query_count(app)
+    init_password_hasher(app)
+    init_login_throttle(app)
+    init_commands(app)
 
     # Setup the Flask-JWT-Extended extension
     app.config["JWT_SECRET_KEY"] = os.environ.get('JWT_SECRET_KEY')
     jwt = JWTManager(app)
+    init_jwt_keys(app, jwt)
+    init_principals(app, jwt)
+    init_revocation(app, jwt)
 
     @jwt.unauthorized_loader
     def unauthorized_response(callback): return jsonify(
@@ -29,6 +60,7 @@ def create_app():
 
     # Add swagger documentation
     CORS(app, resources={r"/*": {"origins": "http://localhost"}})
+    from flask_swagger_ui import get_swaggerui_blueprint
     SWAGGER_URL = '/api/docs'
     API_URL = '/static/swagger.json'
 
@@ -56,6 +88,10 @@ def create_app():
     app.register_blueprint(user_api)
     from api.login_api import login_api
     app.register_blueprint(login_api)
+    from api.internal_api import internal_api
+    app.register_blueprint(internal_api)
+    from api.keys_api import keys_api
+    app.register_blueprint(keys_api)
 
     return app
 
@@ -0,0 +1,84 @@
+"""
+Benchmark of the "has all of these amenities" filter on places:
+the join on place_amenities with a GROUP BY, against the bitwise
+test on the amenity masks in SQL and over a NumPy array.
+    python -m benchmarks.bench_amenities [places] [amenities per place]
+"""
+from benchmarks.common import bench_app, place_rows
+from config import db
+from models.amenity import Amenity
+from models.place import Place
+from models.place_amenity import place_amenities
+from persistence.amenity_bits import AmenityMaskIndex, amenity_mask
+from persistence.facets import place_filters
+from sqlalchemy import insert, select
+import random
+import sys
+import time
+import uuid
+
+AMENITIES = 40
+QUERIES = 50
+
+
+def timed(function, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main(count=200000, per_place=8):
+    random.seed(0)
+    app = bench_app()
+    with app.app_context():
+        db.session.add_all([Amenity(name=f"Amenity {i}")
+                            for i in range(AMENITIES)])
+        db.session.commit()
+        bits = dict(db.session.execute(select(Amenity.id, Amenity.bit)).all())
+
+        rows = place_rows(count)
+        links = []
+        for row in rows:
+            row["id"] = str(uuid.uuid4())
+            chosen = random.sample(sorted(bits), per_place)
+            row["amenity_mask"] = sum(1 << bits[id] for id in chosen)
+            links.extend({"place_id": row["id"], "amenity_id": id}
+                         for id in chosen)
+        db.session.execute(insert(Place), rows)
+        db.session.execute(insert(place_amenities), links)
+        db.session.commit()
+        del rows, links
+
+        session = db.session
+        queries = [{"amenities": ",".join(random.sample(sorted(bits), 2))}
+                   for _ in range(QUERIES)]
+
+        def ids(args, with_masks):
+            criteria = place_filters(args, session if with_masks else None)
+            return session.scalars(select(Place.id).where(*criteria)).all()
+
+        index = AmenityMaskIndex.load(session)
+
+        def in_memory(args):
+            mask = amenity_mask(session, args["amenities"].split(","))
+            return index.having_all(mask)
+
+        for args in queries[:5]:
+            assert (sorted(ids(args, False)) == sorted(ids(args, True))
+                    == sorted(in_memory(args)))
+
+        join = timed(lambda args: ids(args, False), queries)
+        masks = timed(lambda args: ids(args, True), queries)
+        numpy_masks = timed(in_memory, queries)
+        print(f"{count} places, {per_place} of {AMENITIES} amenities each, "
+              f"2 required")
+        print(f"join + GROUP BY   : {join:10.2f} ms/query")
+        print(f"SQL bitmask       : {masks:10.2f} ms/query")
+        print(f"numpy bitmask     : {numpy_masks:10.2f} ms/query")
+        print(f"speedup SQL/numpy : {join / masks:10.1f}x "
+              f"{join / numpy_masks:10.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
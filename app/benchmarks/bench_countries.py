@@ -0,0 +1,72 @@
+"""
+Benchmark of GET /countries and GET /countries/<code>: the list
+rebuilt from pycountry and serialized on every request, against the
+bodies encoded once by the country index.
+    python -m benchmarks.bench_countries [requests]
+"""
+from api.country_api import country_api
+from benchmarks.common import rate
+from flask import Flask, jsonify
+from flask_jwt_extended import (JWTManager, create_access_token,
+                                jwt_required)
+import pycountry
+import sys
+
+
+def countries_app():
+    """
+    Returns an app serving the country routes, and the former ones
+    under /before.
+    """
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "bench-secret-key-long-enough-for-hs256"
+    JWTManager(app)
+    app.register_blueprint(country_api)
+
+    @app.route("/before/countries")
+    @jwt_required()
+    def countries_before():
+        countries = [{"name": country.name, "code": country.alpha_2}
+                     for country in pycountry.countries]
+        return jsonify(countries), 200
+
+    @app.route("/before/countries/<country_code>")
+    @jwt_required()
+    def country_before(country_code):
+        country = pycountry.countries.get(alpha_2=country_code.upper())
+        if not country:
+            return jsonify({"Error": "Country not found."}), 404
+        return jsonify({"Country": {"name": country.name,
+                                    "code": country.alpha_2}}), 201
+    return app
+
+
+def requests_rate(client, url, headers, count):
+    def run():
+        for _ in range(count):
+            client.get(url, headers=headers)
+    return rate(run, count)
+
+
+def main(count=2000):
+    app = countries_app()
+    with app.app_context():
+        token = create_access_token(identity="bench")
+    headers = {"Authorization": f"Bearer {token}"}
+    client = app.test_client()
+    etag = client.get("/countries", headers=headers).headers["ETag"]
+    cases = (("list", "/before/countries", "/countries", {}),
+             ("detail", "/before/countries/fr", "/countries/fr", {}),
+             ("list 304", None, "/countries", {"If-None-Match": etag}))
+    print(f"{count} requests")
+    print(f"{'':>10} {'before req/s':>13} {'after req/s':>12}")
+    for name, before, after, extra in cases:
+        before_rate = (requests_rate(client, before, headers, count)
+                       if before else 0)
+        after_rate = requests_rate(client, after, {**headers, **extra},
+                                   count)
+        print(f"{name:>10} {before_rate:13.0f} {after_rate:12.0f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
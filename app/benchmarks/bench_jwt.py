@@ -0,0 +1,66 @@
+"""
+Benchmark of the verification of the access tokens: HS256 against
+EdDSA and RS256, with the key objects parsed once by the key ring and
+with the PEM parsed again for every token.
+    python -m benchmarks.bench_jwt [tokens]
+"""
+from benchmarks.common import rate
+from cryptography.hazmat.primitives import serialization
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, decode_token
+from persistence.jwt_keys import generate_key, init_jwt_keys
+import shutil
+import sys
+import tempfile
+
+
+def keys_app(directory=None, pem=False):
+    """
+    Returns an app signing with the key of directory, HS256 without it.
+    :param pem: True to hand the PEM of the public key to the decoder.
+    """
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "bench-secret-key-long-enough-for-hs256"
+    app.config["JWT_KEYS_DIR"] = directory
+    jwt = JWTManager(app)
+    ring = init_jwt_keys(app, jwt)
+    if ring and pem:
+        public_pem = ring.signing.public_key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo)
+
+        @jwt.decode_key_loader
+        def verifying_pem(jwt_header, jwt_data):
+            return public_pem
+    return app
+
+
+def verify_rate(app, count):
+    with app.app_context():
+        tokens = [create_access_token(identity=f"user {i}")
+                  for i in range(count)]
+
+        def verify():
+            for token in tokens:
+                decode_token(token)
+        return rate(verify, count)
+
+
+def main(count=2000):
+    print(f"{count} tokens verified")
+    print(f"{'':>18} {'tokens/s':>10}")
+    print(f"{'HS256':>18} {verify_rate(keys_app(), count):10.0f}")
+    for algorithm in ("EdDSA", "RS256"):
+        directory = tempfile.mkdtemp()
+        try:
+            generate_key(directory, algorithm)
+            for pem in (False, True):
+                name = f"{algorithm} {'PEM' if pem else 'cached'}"
+                print(f"{name:>18} "
+                      f"{verify_rate(keys_app(directory, pem), count):10.0f}")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
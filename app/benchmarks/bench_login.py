@@ -0,0 +1,146 @@
+"""
+Benchmark of POST /login under concurrent clients, served by gunicorn
+as it is deployed: sync workers hashing inline, gthread workers hashing
+inline, and gthread workers with the bounded pool. Latency percentiles
+of the logins and number of 503 answered by the full pools.
+    python -m benchmarks.bench_login [clients] [logins per client] [rounds]
+"""
+from api.login_api import login_api
+from benchmarks.common import bench_app
+from concurrent.futures import ThreadPoolExecutor
+from config import db
+from flask_jwt_extended import JWTManager
+from models.users import User
+from persistence.passwords import init_password_hasher, password_hasher
+import http.client
+import json
+import numpy
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Database file shared by the benchmark and the gunicorn workers
+DATABASE_ENV = 'BENCH_LOGIN_DATABASE'
+PORT = 5099
+WORKERS = 4
+THREADS = 8
+GTHREAD = ("--worker-class", "gthread", "--threads", str(THREADS))
+# (name, gunicorn options, bcrypt environment)
+CONFIGURATIONS = (
+    ("sync", (), {"BCRYPT_WORKERS": "0"}),
+    ("gthread", GTHREAD, {"BCRYPT_WORKERS": "0"}),
+    # The defaults: one bcrypt thread per CPU
+    ("gthread+pool", GTHREAD, {}),
+)
+
+
+def login_app():
+    """
+    Returns the app of the gunicorn workers, with the login route and
+    the bcrypt settings of the environment.
+    """
+    app = bench_app('sqlite:///' + os.environ[DATABASE_ENV])
+    app.config["JWT_SECRET_KEY"] = "bench-secret-key-long-enough-for-hs256"
+    for key in ("BCRYPT_LOG_ROUNDS", "BCRYPT_WORKERS", "BCRYPT_MAX_PENDING"):
+        if key in os.environ:
+            app.config[key] = int(os.environ[key])
+    if "BCRYPT_MAX_WAIT" in os.environ:
+        app.config["BCRYPT_MAX_WAIT"] = float(os.environ["BCRYPT_MAX_WAIT"])
+    JWTManager(app)
+    app.register_blueprint(login_api)
+    init_password_hasher(app)
+    return app
+
+
+def create_user(path, rounds):
+    app = bench_app('sqlite:///' + path)
+    with app.app_context():
+        password_hasher.configure(rounds, 0)
+        db.session.add(User(email="user@example.com", first_name="User",
+                            last_name="Doe",
+                            password_hash=User.set_password("secret")))
+        db.session.commit()
+
+
+def start_server(options, env):
+    """
+    Starts gunicorn serving login_app() and waits for it to listen.
+    """
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(WORKERS),
+         *options, "--bind", f"127.0.0.1:{PORT}", "--log-level", "warning",
+         "benchmarks.bench_login:login_app()"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", PORT), 1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("gunicorn did not start.")
+
+
+def client_logins(count):
+    """
+    Returns the list of (status, milliseconds) of count logins.
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=120)
+    body = json.dumps({"email": "user@example.com", "password": "secret"})
+    results = []
+    for _ in range(count):
+        start = time.perf_counter()
+        connection.request("POST", "/login", body,
+                           {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+        results.append((response.status,
+                        (time.perf_counter() - start) * 1000))
+    connection.close()
+    return results
+
+
+def run(clients, logins):
+    with ThreadPoolExecutor(clients) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(client_logins, logins)
+                   for _ in range(clients)]
+        results = [result for future in futures for result in future.result()]
+        elapsed = time.perf_counter() - start
+    latencies = numpy.array([ms for status, ms in results if status == 200])
+    rejected = sum(1 for status, _ in results if status == 503)
+    p50, p95, p99 = (numpy.percentile(latencies, [50, 95, 99])
+                     if len(latencies) else (0, 0, 0))
+    return len(latencies) / elapsed, p50, p95, p99, rejected
+
+
+def main(clients=64, logins=5, rounds=10):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "login.db")
+    create_user(path, rounds)
+    print(f"{clients} clients x {logins} logins, bcrypt cost {rounds}, "
+          f"{WORKERS} workers")
+    print(f"{'':>12} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'503':>5}")
+    for name, options, bcrypt_env in CONFIGURATIONS:
+        env = dict(os.environ, **bcrypt_env, BCRYPT_LOG_ROUNDS=str(rounds))
+        env[DATABASE_ENV] = path
+        server = start_server(options, env)
+        try:
+            rate, p50, p95, p99, rejected = run(clients, logins)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{name:>12} {rate:9.1f} {p50:8.1f} {p95:8.1f} "
+              f"{p99:8.1f} {rejected:5d}")
+    os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:4]))
@@ -0,0 +1,73 @@
+"""
+Benchmark of the nearby search on places spread over Europe:
+a scan of every place with the distances computed in numpy,
+against the geohash cells pruning the candidates on the index.
+    python -m benchmarks.bench_nearby [places] [radius_km]
+"""
+from benchmarks.common import bench_app, place_rows
+from config import db
+from models.place import Place
+from persistence.geohash import encode, haversine_km
+from persistence.nearby import nearby_places
+from sqlalchemy import insert, select
+import numpy
+import random
+import sys
+import time
+
+QUERIES = 200
+LIMIT = 20
+
+
+def scan_places(session, latitude, longitude, radius_km, limit):
+    rows = session.execute(select(Place.id, Place.latitude,
+                                  Place.longitude)).all()
+    ids, latitudes, longitudes = zip(*rows)
+    distances = haversine_km(latitude, longitude, numpy.array(latitudes),
+                             numpy.array(longitudes))
+    within = numpy.flatnonzero(distances <= radius_km)
+    return within[numpy.argsort(distances[within])][:limit]
+
+
+def timed(function, points):
+    start = time.perf_counter()
+    for latitude, longitude in points:
+        function(latitude, longitude)
+    return (time.perf_counter() - start) / len(points) * 1000
+
+
+def main(count=1000000, radius_km=5.0):
+    random.seed(0)
+    app = bench_app()
+    with app.app_context():
+        rows = place_rows(count)
+        for row in rows:
+            row["description"] = "A lovely place"
+            row["latitude"] = random.uniform(36.0, 60.0)
+            row["longitude"] = random.uniform(-10.0, 30.0)
+            row["geohash"] = encode(row["latitude"], row["longitude"])
+        db.session.execute(insert(Place), rows)
+        db.session.commit()
+        del rows
+
+        session = db.session
+        points = [(random.uniform(36.0, 60.0), random.uniform(-10.0, 30.0))
+                  for _ in range(QUERIES)]
+        found = [len(nearby_places(session, lat, lon, radius_km, LIMIT))
+                 for lat, lon in points[:20]]
+        assert found == [len(scan_places(session, lat, lon, radius_km,
+                                         LIMIT)) for lat, lon in points[:20]]
+
+        scan = timed(lambda lat, lon: scan_places(
+            session, lat, lon, radius_km, LIMIT), points[:5])
+        cells = timed(lambda lat, lon: nearby_places(
+            session, lat, lon, radius_km, LIMIT), points)
+        print(f"{count} places, radius {radius_km:g} km, limit {LIMIT}")
+        print(f"full scan + numpy     : {scan:10.2f} ms/query")
+        print(f"geohash cells + numpy : {cells:10.2f} ms/query")
+        print(f"speedup               : {scan / cells:10.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if i else int(arg)
+           for i, arg in enumerate(sys.argv[1:])))
@@ -0,0 +1,61 @@
+"""
+Benchmark of the search of places by word as the table grows:
+a LIKE scan of name, description and address against the FTS5 index.
+    python -m benchmarks.bench_search [places ...]
+"""
+from benchmarks.common import bench_app, place_rows
+from config import db
+from models.place import Place
+from persistence.search import search_places
+from sqlalchemy import insert, or_, select
+import random
+import sys
+import time
+
+QUERIES = 100
+LIMIT = 20
+
+
+def words(count):
+    random.seed(count)
+    return [''.join(random.choices('abcdefghijklmnopqrstuvwxyz', k=7))
+            for _ in range(count)]
+
+
+def like_places(session, word, limit):
+    pattern = f'%{word}%'
+    return session.scalars(select(Place).where(or_(
+        Place.name.like(pattern), Place.description.like(pattern),
+        Place.address.like(pattern))).limit(limit)).all()
+
+
+def timed(function, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main(*counts):
+    vocabulary = words(200000)
+    for count in counts or (10000, 100000):
+        app = bench_app()
+        with app.app_context():
+            rows = place_rows(count)
+            for row in rows:
+                row["description"] = ' '.join(random.choices(vocabulary,
+                                                             k=30))
+            db.session.execute(insert(Place), rows)
+            db.session.commit()
+            queries = random.choices(vocabulary, k=QUERIES)
+            session = db.session
+            like = timed(lambda q: like_places(session, q, LIMIT),
+                         queries[:10])
+            fts = timed(lambda q: search_places(session, q, LIMIT), queries)
+            print(f"{count:>8} places   LIKE scan {like:9.2f} ms/query"
+                  f"   FTS5 {fts:6.2f} ms/query")
+            db.drop_all()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,45 @@
+"""
+Microbenchmark of the serialization of places:
+the former DataManager.read (walk of entity.__dict__ + jsonify)
+against the compiled serializer and its compact JSON encoder.
+    python -m benchmarks.bench_serializer [rows]
+"""
+from benchmarks.common import bench_app, place_rows, rate
+from config import db
+from flask import jsonify
+from models.place import Place
+from persistence.serializer import serializer_for
+from sqlalchemy import insert
+import datetime
+import sys
+
+
+def legacy_read(entity):
+    result = {}
+    for key, value in entity.__dict__.items():
+        if key != '_sa_instance_state':
+            if isinstance(value, datetime.datetime):
+                result[key] = value.isoformat()
+            else:
+                result[key] = value
+    return result
+
+
+def main(count=20000):
+    app = bench_app()
+    with app.app_context():
+        db.session.execute(insert(Place), place_rows(count))
+        db.session.commit()
+        places = Place.query.all()
+        serializer = serializer_for(Place)
+
+        before = rate(lambda: jsonify([legacy_read(p) for p in places]), count)
+        after = rate(lambda: serializer.response(places), count)
+        print(f"{count} places")
+        print(f"DataManager.read + jsonify : {before:12,.0f} rows/sec")
+        print(f"serializer + encoder       : {after:12,.0f} rows/sec")
+        print(f"speedup                    : {after / before:12.2f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
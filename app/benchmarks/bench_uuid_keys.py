@@ -0,0 +1,112 @@
+"""
+Benchmark of the ids stored as 36 characters strings against the
+16 bytes of UUIDType, on SQLite: size of the tables and indexes
+(from the dbstat table), point lookups and a join on the keys.
+    python -m benchmarks.bench_uuid_keys [places] [reviews per place]
+"""
+from models.base_model import UUIDType
+from sqlalchemy import (Column, Float, ForeignKey, Index, Integer, MetaData,
+                        String, Table, create_engine, func, insert, select,
+                        text)
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+LOOKUPS = 2000
+
+
+def tables(id_type):
+    """
+    Returns the metadata of places and reviews keyed by id_type.
+    """
+    metadata = MetaData()
+    Table('places', metadata,
+          Column('id', id_type, primary_key=True),
+          Column('host_id', id_type, nullable=False),
+          Column('price_per_night', Float, nullable=False),
+          Index('ix_places_host_id', 'host_id'))
+    Table('reviews', metadata,
+          Column('id', id_type, primary_key=True),
+          Column('place_id', id_type, ForeignKey('places.id'),
+                 nullable=False),
+          Column('rating', Integer, nullable=False),
+          Index('ix_reviews_place_id', 'place_id'))
+    return metadata
+
+
+def sizes(connection):
+    """
+    Returns the dict {table or index name: size in KiB}.
+    """
+    rows = connection.execute(text(
+        "SELECT name, sum(pgsize) FROM dbstat GROUP BY name"))
+    return {name: size // 1024 for name, size in rows}
+
+
+def timed(function, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(id_type, places, reviews, directory):
+    name = id_type.__class__.__name__
+    engine = create_engine(f"sqlite:///{directory}/{name}.db")
+    metadata = tables(id_type)
+    metadata.create_all(engine)
+    place_table, review_table = (metadata.tables['places'],
+                                 metadata.tables['reviews'])
+    with engine.begin() as connection:
+        connection.execute(insert(place_table), places)
+        connection.execute(insert(review_table), reviews)
+    ids = random.sample([place["id"] for place in places], LOOKUPS)
+    lookup = select(place_table.c.price_per_night)
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE"))
+
+        def lookups():
+            for id in ids:
+                connection.execute(lookup.where(place_table.c.id == id)).one()
+
+        def join():
+            connection.execute(
+                select(func.count(), func.avg(review_table.c.rating))
+                .select_from(review_table.join(
+                    place_table, place_table.c.id == review_table.c.place_id))
+                .where(place_table.c.price_per_night < 250)).one()
+
+        return (sizes(connection), timed(lookups) / LOOKUPS * 1000,
+                timed(join))
+
+
+def main(count=100000, per_place=5):
+    random.seed(0)
+    places = [{"id": str(uuid.uuid4()), "host_id": str(uuid.uuid4()),
+               "price_per_night": float(i % 500)} for i in range(count)]
+    reviews = [{"id": str(uuid.uuid4()), "place_id": place["id"],
+                "rating": i % 5 + 1}
+               for place in places for i in range(per_place)]
+    with tempfile.TemporaryDirectory() as directory:
+        results = {name: run(id_type, places, reviews, directory)
+                   for name, id_type in (("String(36)", String(36)),
+                                         ("UUIDType", UUIDType()))}
+
+    print(f"{count} places, {count * per_place} reviews")
+    before, now = results["String(36)"], results["UUIDType"]
+    print(f"{'':34}{'String(36)':>12}{'UUIDType':>12}")
+    for name in sorted(before[0]):
+        print(f"{name + ' (KiB)':34}{before[0][name]:12}"
+              f"{now[0].get(name, 0):12}")
+    for label, position, unit in (("lookup by id", 1, "us"),
+                                  ("reviews join places", 2, "ms")):
+        print(f"{f'{label} ({unit})':34}{before[position]:12.1f}"
+              f"{now[position]:12.1f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,56 @@
+"""
+Python module with the helpers shared by the benchmarks.
+Run the benchmarks from the app directory, ex:
+    python -m benchmarks.bench_serializer
+"""
+from flask import Flask
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+import time
+
+
+def bench_app(uri="sqlite://"):
+    """
+    Returns a Flask app bound to a database with all the tables created.
+    """
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def place_rows(count, city_id="city", host_id="host"):
+    """
+    Returns count dicts of places ready for an executemany INSERT.
+    """
+    return [{"name": f"Place {i}",
+             "description": "A lovely place " * 20,
+             "address": f"{i} Main Street",
+             "latitude": (i % 180) - 90.0,
+             "longitude": (i % 360) - 180.0,
+             "num_rooms": i % 5 + 1,
+             "num_bathrooms": i % 3 + 1,
+             "price_per_night": float(i % 500),
+             "max_guests": i % 8 + 1,
+             "amenity_ids": "amenity",
+             "city_id": city_id,
+             "host_id": host_id} for i in range(count)]
+
+
+def rate(function, count, repeat=5):
+    """
+    Runs function repeat times and returns the best count/second.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return count / best
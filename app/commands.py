@@ -0,0 +1,129 @@
+"""
+Python module for the flask commands of the application.
+"""
+from config import db
+from flask.cli import AppGroup
+from flask import current_app
+from persistence import ratings
+from persistence.explain import check_plans
+from persistence.jwt_keys import generate_key
+from persistence.revocation import revocation_list
+from persistence.startup import (DEFAULT_BUDGET, import_breakdown,
+                                 import_times, startup_time)
+import click
+
+ratings_cli = AppGroup('ratings', help='Rating aggregates of the places.')
+
+
+@ratings_cli.command('backfill')
+@click.option('--batch-size', default=500, show_default=True,
+              help='Places updated per transaction.')
+def backfill_ratings(batch_size):
+    """
+    Recomputes the rating aggregates of every place from its reviews.
+    """
+    updated = ratings.backfill(db.session, batch_size)
+    click.echo(f'{updated} places updated.')
+
+
+@ratings_cli.command('check')
+@click.option('--batch-size', default=500, show_default=True,
+              help='Places compared per query.')
+def check_ratings(batch_size):
+    """
+    Fails if the rating aggregates of a place don't match its reviews.
+    """
+    mismatches = ratings.check(db.session, batch_size)
+    for place_id, stored, expected in mismatches:
+        click.echo(f'{place_id}: stored {stored}, expected {expected}')
+    if mismatches:
+        raise click.ClickException(
+            f'{len(mismatches)} places have wrong rating aggregates, '
+            'run flask ratings backfill.')
+    click.echo('Rating aggregates are consistent.')
+
+
+jwt_keys_cli = AppGroup('jwt-keys', help='Keys signing the tokens.')
+
+
+@jwt_keys_cli.command('generate')
+@click.option('--algorithm', type=click.Choice(['EdDSA', 'RS256']),
+              default='EdDSA', show_default=True)
+@click.option('--kid', help='Id of the key, the current time by default.')
+def generate_jwt_key(algorithm, kid):
+    """
+    Adds a private key to JWT_KEYS_DIR, signing after the restart.
+    """
+    directory = current_app.config.get('JWT_KEYS_DIR')
+    if not directory:
+        raise click.ClickException('JWT_KEYS_DIR is not set.')
+    kid = generate_key(directory, algorithm, kid)
+    click.echo(f'Key {kid} added to {directory}.')
+
+
+tokens_cli = AppGroup('tokens', help='Revoked tokens.')
+
+
+@tokens_cli.command('prune')
+def prune_revoked_tokens():
+    """
+    Deletes the revoked tokens which expired since.
+    """
+    deleted = revocation_list.prune(db.session)
+    click.echo(f'{deleted} expired revoked tokens deleted.')
+
+
+def init_commands(app):
+    """
+    Registers the flask commands of an app.
+    """
+    app.cli.add_command(ratings_cli)
+    app.cli.add_command(jwt_keys_cli)
+    app.cli.add_command(tokens_cli)
+
+    @app.cli.command('explain-check')
+    @click.option('--rows', default=1000, show_default=True,
+                  help='Rows seeded per table before the EXPLAINs.')
+    @click.option('--verbose', is_flag=True, help='Print every plan.')
+    def explain_check(rows, verbose):
+        """
+        Fails if an endpoint query reads a whole table.
+        """
+        report = check_plans(db.engine, rows)
+        failed = False
+        for name, (lines, scans) in report.items():
+            status = 'FULL SCAN' if scans else 'ok'
+            click.echo(f'{status:9} {name}')
+            if scans or verbose:
+                for line in lines:
+                    click.echo(f'          {line}')
+            failed = failed or bool(scans)
+        if failed:
+            raise click.ClickException('Some queries read a whole table.')
+
+    @app.cli.command('startup-report')
+    @click.option('--top', default=20, show_default=True,
+                  help='Dependencies and modules of the app listed.')
+    def startup_report(top):
+        """
+        Prints the import time of create_app() by dependency, fails if
+        it takes longer than STARTUP_TIME_BUDGET.
+        """
+        try:
+            seconds = startup_time()
+            imports = import_times()
+        except RuntimeError as error:
+            raise click.ClickException(str(error))
+        groups = import_breakdown(imports)
+        click.echo(f'{"self ms":>9} {"modules":>8}  import')
+        for group in groups[:top]:
+            click.echo(f'{group.self_ms:9.1f} {group.modules:8}  {group.name}')
+        click.echo(f'{sum(group.self_ms for group in groups):9.1f} '
+                   f'{len(imports):8}  total')
+        budget = current_app.config.get('STARTUP_TIME_BUDGET',
+                                        DEFAULT_BUDGET)
+        click.echo(f'create_app() in {seconds:.3f} s, budget {budget} s.')
+        if seconds > budget:
+            raise click.ClickException(
+                'create_app() is over STARTUP_TIME_BUDGET, '
+                'an import is probably not deferred anymore.')
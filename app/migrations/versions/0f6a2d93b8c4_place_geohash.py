@@ -0,0 +1,85 @@
+"""place geohash
+
+Revision ID: 0f6a2d93b8c4
+Revises: e5c8b1f47a92
+Create Date: 2026-10-17 18:05:42.771930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0f6a2d93b8c4'
+down_revision = 'e5c8b1f47a92'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+# persistence.geohash at this revision, copied so that the migration
+# does not change with the application
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_LENGTH = 12
+
+
+def encode(latitude, longitude):
+    """
+    Returns the geohash of a point.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit = 0
+    index = 0
+    even = True
+    while len(chars) < GEOHASH_LENGTH:
+        value, bounds = ((longitude, lon_range) if even
+                         else (latitude, lat_range))
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            index = index * 2 + 1
+            bounds[0] = middle
+        else:
+            index = index * 2
+            bounds[1] = middle
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[index])
+            bit = 0
+            index = 0
+    return ''.join(chars)
+
+
+def upgrade():
+    with op.batch_alter_table('places') as batch_op:
+        batch_op.add_column(sa.Column('geohash',
+                                      sa.String(length=GEOHASH_LENGTH),
+                                      nullable=True))
+        batch_op.create_index('ix_places_geohash', ['geohash'], unique=False)
+
+    places = sa.table('places', sa.column('id', sa.String),
+                      sa.column('latitude', sa.Float),
+                      sa.column('longitude', sa.Float),
+                      sa.column('geohash', sa.String))
+    connection = op.get_bind()
+    last_id = ''
+    while True:
+        rows = connection.execute(
+            sa.select(places.c.id, places.c.latitude, places.c.longitude)
+            .where(places.c.id > last_id)
+            .order_by(places.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        connection.execute(
+            places.update().where(places.c.id == sa.bindparam('place_id'))
+            .values(geohash=sa.bindparam('hash')),
+            [{'place_id': id, 'hash': encode(latitude, longitude)}
+             for id, latitude, longitude in rows])
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    with op.batch_alter_table('places') as batch_op:
+        batch_op.drop_index('ix_places_geohash')
+        batch_op.drop_column('geohash')
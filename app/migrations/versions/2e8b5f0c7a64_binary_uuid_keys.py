@@ -0,0 +1,159 @@
+"""binary uuid keys
+
+Revision ID: 2e8b5f0c7a64
+Revises: 9c27e4b1d058
+Create Date: 2026-10-17 22:04:17.662190
+
+Stores the ids and the foreign keys in 16 bytes: BLOB(16) on SQLite,
+uuid on Postgres. The ids which are not UUIDs become the UUID of their
+MD5, on both backends, so that the references still match.
+"""
+from alembic import op
+import hashlib
+import sqlalchemy as sa
+import uuid
+
+
+# revision identifiers, used by Alembic.
+revision = '2e8b5f0c7a64'
+down_revision = '9c27e4b1d058'
+branch_labels = None
+depends_on = None
+
+# Columns holding ids, by table, the referenced tables first
+ID_COLUMNS = {
+    'users': ('id',),
+    'amenities': ('id',),
+    'cities': ('id',),
+    'places': ('id', 'amenity_ids', 'host_id', 'city_id'),
+    'place_amenities': ('place_id', 'amenity_id'),
+    'reviews': ('id', 'place_id', 'user_id'),
+}
+FOREIGN_KEYS = (
+    ('places', 'amenity_ids', 'amenities'),
+    ('places', 'city_id', 'cities'),
+    ('places', 'host_id', 'users'),
+    ('place_amenities', 'amenity_id', 'amenities'),
+    ('place_amenities', 'place_id', 'places'),
+    ('reviews', 'place_id', 'places'),
+    ('reviews', 'user_id', 'users'),
+)
+POSTGRES_UUID = ("CASE WHEN {column} ~* '^[0-9a-f]{{8}}-[0-9a-f]{{4}}-"
+                 "[0-9a-f]{{4}}-[0-9a-f]{{4}}-[0-9a-f]{{12}}$' "
+                 "THEN {column}::uuid ELSE md5({column})::uuid END")
+# The full-text index of the places on SQLite (revision 5d1e7c3a9f28):
+# its triggers go with the copies of the batch mode, so it is rebuilt
+SQLITE_SEARCH_DROP = (
+    "DROP TRIGGER IF EXISTS places_search_insert",
+    "DROP TRIGGER IF EXISTS places_search_update",
+    "DROP TRIGGER IF EXISTS places_search_delete",
+    "DROP TABLE IF EXISTS places_fts",
+    "DROP TABLE IF EXISTS places_search_ids",
+)
+SQLITE_SEARCH_CREATE = (
+    """CREATE TABLE places_search_ids (
+        rowid INTEGER PRIMARY KEY,
+        place_id BLOB NOT NULL UNIQUE)""",
+    """CREATE VIRTUAL TABLE places_fts USING fts5(
+        name, description, address,
+        tokenize = 'unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER places_search_insert AFTER INSERT ON places BEGIN
+        INSERT INTO places_search_ids (place_id) VALUES (new.id);
+        INSERT INTO places_fts (rowid, name, description, address)
+        VALUES (last_insert_rowid(), new.name, new.description,
+                new.address);
+    END""",
+    """CREATE TRIGGER places_search_update
+    AFTER UPDATE OF name, description, address ON places BEGIN
+        UPDATE places_fts SET name = new.name,
+            description = new.description, address = new.address
+        WHERE rowid = (SELECT rowid FROM places_search_ids
+                       WHERE place_id = old.id);
+    END""",
+    """CREATE TRIGGER places_search_delete AFTER DELETE ON places BEGIN
+        DELETE FROM places_fts WHERE rowid = (
+            SELECT rowid FROM places_search_ids WHERE place_id = old.id);
+        DELETE FROM places_search_ids WHERE place_id = old.id;
+    END""",
+    "INSERT INTO places_search_ids (place_id) SELECT id FROM places",
+    """INSERT INTO places_fts (rowid, name, description, address)
+    SELECT places_search_ids.rowid, name, description, address
+    FROM places JOIN places_search_ids
+    ON places_search_ids.place_id = places.id""",
+)
+
+
+def uuid_bytes(value):
+    """
+    Returns the 16 bytes of a text id, those of its MD5 if it is
+    not a UUID (as md5(id)::uuid on Postgres).
+    """
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode()
+    try:
+        return uuid.UUID(value).bytes
+    except ValueError:
+        return hashlib.md5(value.encode()).digest()
+
+
+def uuid_text(value):
+    """
+    Returns the canonical string of a 16 bytes id.
+    """
+    return None if value is None else str(uuid.UUID(bytes=bytes(value)))
+
+
+def foreign_key(table, column):
+    # Names given by Postgres to the unnamed constraints
+    return f'{table}_{column}_fkey'
+
+
+def convert_sqlite(connection, type_, function):
+    """
+    Converts the values of the id columns with a Python function,
+    then changes their type (the batch mode copies the values as is).
+    """
+    connection.connection.dbapi_connection.create_function(
+        'convert_id', 1, function, deterministic=True)
+    for statement in SQLITE_SEARCH_DROP:
+        connection.exec_driver_sql(statement)
+    for table, columns in ID_COLUMNS.items():
+        assignments = ', '.join(f'{column} = convert_id({column})'
+                                for column in columns)
+        connection.exec_driver_sql(f'UPDATE {table} SET {assignments}')
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, type_=type_)
+    for statement in SQLITE_SEARCH_CREATE:
+        connection.exec_driver_sql(statement)
+
+
+def convert_postgres(type_, using):
+    for table, column, referred in FOREIGN_KEYS:
+        op.drop_constraint(foreign_key(table, column), table,
+                           type_='foreignkey')
+    for table, columns in ID_COLUMNS.items():
+        for column in columns:
+            op.alter_column(table, column, type_=type_,
+                            postgresql_using=using.format(column=column))
+    for table, column, referred in FOREIGN_KEYS:
+        op.create_foreign_key(foreign_key(table, column), table, referred,
+                              [column], ['id'])
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name == 'sqlite':
+        convert_sqlite(connection, sa.LargeBinary(16), uuid_bytes)
+    else:
+        convert_postgres(sa.Uuid(as_uuid=False), POSTGRES_UUID)
+
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name == 'sqlite':
+        convert_sqlite(connection, sa.String(36), uuid_text)
+    else:
+        convert_postgres(sa.String(36), '{column}::text')
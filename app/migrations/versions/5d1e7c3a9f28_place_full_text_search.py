@@ -0,0 +1,87 @@
+"""place full text search
+
+Revision ID: 5d1e7c3a9f28
+Revises: 0f6a2d93b8c4
+Create Date: 2026-10-17 19:12:06.318847
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1e7c3a9f28'
+down_revision = '0f6a2d93b8c4'
+branch_labels = None
+depends_on = None
+
+
+# The statements of persistence.search at this revision, copied so that
+# the migration does not change with the application
+SQLITE_UPGRADE = (
+    # FTS5 rowids are mapped to the place ids: the rowids of places
+    # have no INTEGER PRIMARY KEY and may change on VACUUM
+    """CREATE TABLE places_search_ids (
+        rowid INTEGER PRIMARY KEY,
+        place_id BLOB NOT NULL UNIQUE)""",
+    """CREATE VIRTUAL TABLE places_fts USING fts5(
+        name, description, address,
+        tokenize = 'unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER places_search_insert AFTER INSERT ON places BEGIN
+        INSERT INTO places_search_ids (place_id) VALUES (new.id);
+        INSERT INTO places_fts (rowid, name, description, address)
+        VALUES (last_insert_rowid(), new.name, new.description,
+                new.address);
+    END""",
+    """CREATE TRIGGER places_search_update
+    AFTER UPDATE OF name, description, address ON places BEGIN
+        UPDATE places_fts SET name = new.name,
+            description = new.description, address = new.address
+        WHERE rowid = (SELECT rowid FROM places_search_ids
+                       WHERE place_id = old.id);
+    END""",
+    """CREATE TRIGGER places_search_delete AFTER DELETE ON places BEGIN
+        DELETE FROM places_fts WHERE rowid = (
+            SELECT rowid FROM places_search_ids WHERE place_id = old.id);
+        DELETE FROM places_search_ids WHERE place_id = old.id;
+    END""",
+    "INSERT INTO places_search_ids (place_id) SELECT id FROM places",
+    """INSERT INTO places_fts (rowid, name, description, address)
+    SELECT places_search_ids.rowid, name, description, address
+    FROM places JOIN places_search_ids
+    ON places_search_ids.place_id = places.id""",
+)
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS places_search_insert",
+    "DROP TRIGGER IF EXISTS places_search_update",
+    "DROP TRIGGER IF EXISTS places_search_delete",
+    "DROP TABLE IF EXISTS places_fts",
+    "DROP TABLE IF EXISTS places_search_ids",
+)
+POSTGRES_UPGRADE = (
+    """ALTER TABLE places ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(address, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX ix_places_search_vector ON places USING GIN (search_vector)",
+)
+POSTGRES_DOWNGRADE = (
+    "DROP INDEX IF EXISTS ix_places_search_vector",
+    "ALTER TABLE places DROP COLUMN IF EXISTS search_vector",
+)
+
+
+def execute(statements):
+    connection = op.get_bind()
+    for statement in statements.get(connection.dialect.name, ()):
+        connection.exec_driver_sql(statement)
+
+
+def upgrade():
+    execute({'sqlite': SQLITE_UPGRADE, 'postgresql': POSTGRES_UPGRADE})
+
+
+def downgrade():
+    execute({'sqlite': SQLITE_DOWNGRADE, 'postgresql': POSTGRES_DOWNGRADE})
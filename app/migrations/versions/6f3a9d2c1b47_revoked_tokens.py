@@ -0,0 +1,41 @@
+"""revoked tokens
+
+Revision ID: 6f3a9d2c1b47
+Revises: 2e8b5f0c7a64
+Create Date: 2026-10-18 09:41:05.217364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '6f3a9d2c1b47'
+down_revision = '2e8b5f0c7a64'
+branch_labels = None
+depends_on = None
+
+# BLOB(16) on SQLite, uuid on Postgres, as models.base_model.UUIDType
+UUID = sa.LargeBinary(16).with_variant(postgresql.UUID(), 'postgresql')
+
+
+def upgrade():
+    op.create_table('revoked_tokens',
+    sa.Column('jti', UUID, nullable=False),
+    sa.Column('user_id', UUID, nullable=True),
+    sa.Column('token_type', sa.String(length=10), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('jti')
+    )
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens',
+                    ['expires_at'])
+    op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens',
+                    ['revoked_at'])
+
+
+def downgrade():
+    op.drop_index('ix_revoked_tokens_revoked_at', table_name='revoked_tokens')
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
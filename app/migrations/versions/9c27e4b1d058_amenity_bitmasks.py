@@ -0,0 +1,55 @@
+"""amenity bitmasks
+
+Revision ID: 9c27e4b1d058
+Revises: b83c4e2f6d15
+Create Date: 2026-10-17 21:12:40.518306
+
+Gives the existing amenities their bits in the order of creation,
+then computes the masks of the existing places.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c27e4b1d058'
+down_revision = 'b83c4e2f6d15'
+branch_labels = None
+depends_on = None
+
+# Bits held by the signed 64 bits masks
+MASK_BITS = 63
+
+
+def upgrade():
+    with op.batch_alter_table('amenities') as batch_op:
+        batch_op.add_column(sa.Column('bit', sa.Integer(), nullable=True))
+        batch_op.create_index('uq_amenities_bit', ['bit'], unique=True)
+    with op.batch_alter_table('places') as batch_op:
+        batch_op.add_column(sa.Column('amenity_mask', sa.BigInteger(),
+                                      server_default='0', nullable=False))
+
+    connection = op.get_bind()
+    amenities = sa.table('amenities', sa.column('id'), sa.column('bit'),
+                         sa.column('created_at'))
+    ids = connection.execute(sa.select(amenities.c.id).order_by(
+        amenities.c.created_at, amenities.c.id)).scalars().all()
+    for bit, amenity_id in enumerate(ids):
+        connection.execute(sa.update(amenities)
+                           .where(amenities.c.id == amenity_id)
+                           .values(bit=bit))
+    connection.execute(sa.text(
+        "UPDATE places SET amenity_mask = ("
+        " SELECT coalesce(sum(CAST(1 AS BIGINT) << amenities.bit), 0)"
+        " FROM place_amenities JOIN amenities"
+        " ON amenities.id = place_amenities.amenity_id"
+        " WHERE place_amenities.place_id = places.id"
+        " AND amenities.bit < :mask_bits)"), {'mask_bits': MASK_BITS})
+
+
+def downgrade():
+    with op.batch_alter_table('places') as batch_op:
+        batch_op.drop_column('amenity_mask')
+    with op.batch_alter_table('amenities') as batch_op:
+        batch_op.drop_index('uq_amenities_bit')
+        batch_op.drop_column('bit')
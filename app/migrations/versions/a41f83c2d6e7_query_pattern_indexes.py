@@ -0,0 +1,99 @@
+"""query pattern indexes
+
+Revision ID: a41f83c2d6e7
+Revises: 7b2d5e9a1c30
+Create Date: 2026-10-17 15:21:09.604417
+
+The amenities with the same name, the cities with the same name and
+country, are merged into the first one created: the places and their
+amenities reference it instead of the duplicates.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f83c2d6e7'
+down_revision = '7b2d5e9a1c30'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, unique), users.email is already indexed
+# by its unique constraint
+INDEXES = (
+    ('uq_amenities_name', 'amenities', ['name'], True),
+    ('uq_cities_city_name_country_code', 'cities',
+     ['city_name', 'country_code'], True),
+    ('ix_cities_country_code', 'cities', ['country_code'], False),
+    ('ix_places_city_id', 'places', ['city_id'], False),
+    ('ix_places_host_id', 'places', ['host_id'], False),
+    ('ix_reviews_user_id_place_id', 'reviews', ['user_id', 'place_id'], False),
+    ('ix_reviews_place_id', 'reviews', ['place_id'], False),
+    ('ix_place_amenities_amenity_id', 'place_amenities', ['amenity_id'],
+     False),
+)
+
+
+# Tables whose duplicates are merged before their unique index,
+# with the columns of the index and the columns referencing them
+DEDUPLICATED = (
+    ('amenities', ('name',),
+     (('place_amenities', 'amenity_id'), ('places', 'amenity_ids'))),
+    ('cities', ('city_name', 'country_code'), (('places', 'city_id'),)),
+)
+
+
+def duplicates(connection, table, columns):
+    """
+    Returns the ids of the duplicate rows of a table mapped to the id
+    of the row they duplicate, the first one created.
+    """
+    rows = connection.execute(sa.text(
+        f"SELECT id, {', '.join(columns)} FROM {table} "
+        "ORDER BY created_at, id"))
+    kept, merged = {}, {}
+    for row in rows:
+        key = tuple(row[1:])
+        if key in kept:
+            merged[row[0]] = kept[key]
+        else:
+            kept[key] = row[0]
+    return merged
+
+
+def merge(connection, table, references, merged):
+    """
+    Points the references of the duplicate rows to the rows they
+    duplicate, then deletes the duplicates.
+    """
+    for duplicate, original in merged.items():
+        ids = {'duplicate': duplicate, 'original': original}
+        for referencing, column in references:
+            if referencing == 'place_amenities':
+                # A place having both amenities would have the pair twice
+                connection.execute(sa.text(
+                    "DELETE FROM place_amenities "
+                    "WHERE amenity_id = :duplicate AND place_id IN "
+                    "(SELECT place_id FROM place_amenities "
+                    "WHERE amenity_id = :original)"), ids)
+            connection.execute(sa.text(
+                f"UPDATE {referencing} SET {column} = :original "
+                f"WHERE {column} = :duplicate"), ids)
+        connection.execute(
+            sa.text(f"DELETE FROM {table} WHERE id = :duplicate"), ids)
+
+
+def upgrade():
+    # The unique indexes fail if duplicates were created before the
+    # API checked for them: merge those rows into the first one first
+    connection = op.get_bind()
+    for table, columns, references in DEDUPLICATED:
+        merge(connection, table, references,
+              duplicates(connection, table, columns))
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name, table, columns, unique in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
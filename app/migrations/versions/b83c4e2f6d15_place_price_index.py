@@ -0,0 +1,25 @@
+"""place price index
+
+Revision ID: b83c4e2f6d15
+Revises: 5d1e7c3a9f28
+Create Date: 2026-10-17 20:27:51.046733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83c4e2f6d15'
+down_revision = '5d1e7c3a9f28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_places_price_per_night', 'places',
+                    ['price_per_night'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_places_price_per_night', table_name='places')
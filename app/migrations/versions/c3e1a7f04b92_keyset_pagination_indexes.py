@@ -0,0 +1,29 @@
+"""keyset pagination indexes
+
+Revision ID: c3e1a7f04b92
+Revises: 5484b8615fcf
+Create Date: 2026-10-17 10:12:41.208311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e1a7f04b92'
+down_revision = '5484b8615fcf'
+branch_labels = None
+depends_on = None
+
+TABLES = ('amenities', 'users', 'cities', 'places', 'reviews')
+
+
+def upgrade():
+    for table in TABLES:
+        op.create_index(f'ix_{table}_created_at_id', table,
+                        ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_index(f'ix_{table}_created_at_id', table_name=table)
@@ -0,0 +1,41 @@
+"""place rating aggregates
+
+Revision ID: e5c8b1f47a92
+Revises: a41f83c2d6e7
+Create Date: 2026-10-17 16:48:55.130276
+
+Fill the new columns of the existing places with
+flask ratings backfill once the upgrade is done.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c8b1f47a92'
+down_revision = 'a41f83c2d6e7'
+branch_labels = None
+depends_on = None
+
+COUNTERS = ('review_count', 'rating_sum', 'rating_1', 'rating_2',
+            'rating_3', 'rating_4', 'rating_5')
+
+
+def upgrade():
+    with op.batch_alter_table('places') as batch_op:
+        for name in COUNTERS:
+            batch_op.add_column(sa.Column(name, sa.Integer(),
+                                          server_default='0',
+                                          nullable=False))
+        batch_op.add_column(sa.Column('rating_avg', sa.Float(),
+                                      server_default='0', nullable=False))
+        batch_op.create_index('ix_places_rating_avg_id',
+                              ['rating_avg', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('places') as batch_op:
+        batch_op.drop_index('ix_places_rating_avg_id')
+        batch_op.drop_column('rating_avg')
+        for name in reversed(COUNTERS):
+            batch_op.drop_column(name)
@@ -11,9 +11,18 @@ class Amenity(BaseModel):
     Defines the Amenity class that inherits from BaseModel
     """
     __tablename__ = 'amenities'
+    __table_args__ = (
+        # Keyset pagination order
+        db.Index('ix_amenities_created_at_id', 'created_at', 'id'),
+        # Names are unique, checked at creation
+        db.Index('uq_amenities_name', 'name', unique=True),
+        db.Index('uq_amenities_bit', 'bit', unique=True),
+    )
     # Fields definition
     name = db.Column(db.String(128),
                      nullable=False)
+    # Position of the amenity in the masks of the places, set at flush
+    bit = db.Column(db.Integer)
 
     # Many to Many relationship with Place
     places = db.relationship('Place', secondary=place_amenities, back_populates='amenities')
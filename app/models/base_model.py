@@ -2,22 +2,127 @@
 Python module to define "main" class
 """
 from config import db
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.types import LargeBinary, TypeDecorator
 import uuid
 
+# SQLite stores current_timestamp without microseconds: bound datetimes
+# use the same format so that keyset cursors compare equal
+Timestamp = db.DateTime().with_variant(
+    sqlite.DATETIME(truncate_microseconds=True), 'sqlite')
+# Bound in place of the ids which are not UUIDs in the lookups:
+# no row has it. The writes of those ids raise InvalidIdError.
+NIL_UUID = uuid.UUID(int=0)
+
+
+class InvalidIdError(ValueError):
+    """
+    Raised on the write of an id (or a reference) which is not a UUID.
+    """
+
+
+def as_uuid(value):
+    """
+    Returns the UUID of an id, NIL_UUID if it is not one.
+    """
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(value)
+    except (ValueError, TypeError, AttributeError):
+        return NIL_UUID
+
+
+def check_ids(model, values):
+    """
+    Raises InvalidIdError if one of the values written to the UUID
+    columns of a model is not a UUID.
+    :param values: dict of the written values by attribute name.
+    """
+    for key, column in inspect(model).columns.items():
+        value = values.get(key)
+        if (isinstance(column.type, UUIDType) and value is not None
+                and as_uuid(value) is NIL_UUID):
+            raise InvalidIdError(f"{key} is not a valid id.")
+
+
+class UUIDType(TypeDecorator):
+    """
+    Ids stored in 16 bytes: BLOB(16) on SQLite, uuid on Postgres.
+    Python keeps the canonical string, the one sent in the API.
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            # Already imported by the engine, not by the SQLite workers
+            from sqlalchemy.dialects.postgresql import UUID
+            return dialect.type_descriptor(UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == 'postgresql':
+            return str(as_uuid(value))
+        return as_uuid(value).bytes
+
+    def literal_processor(self, dialect):
+        def process(value):
+            if value is None:
+                return 'NULL'
+            if dialect.name == 'postgresql':
+                return f"'{as_uuid(value)}'"
+            return f"X'{as_uuid(value).hex}'"
+        return process
+
+    def process_result_value(self, value, dialect):
+        # The uuid type of Postgres already returns the string
+        if value is None or dialect.name == 'postgresql':
+            return value
+        return str(uuid.UUID(bytes=bytes(value)))
+
+    @property
+    def python_type(self):
+        return str
+
+
+@event.listens_for(Session, 'before_flush')
+def _check_written_ids(session, flush_context, instances):
+    """
+    Checks the ids of the new entities and the changed ids of the others,
+    before their INSERT or UPDATE.
+    """
+    for entity in [*session.new, *session.dirty]:
+        if not isinstance(entity, BaseModel) or entity in session.deleted:
+            continue
+        attrs = inspect(entity).attrs
+        written = {}
+        for key in inspect(type(entity)).columns.keys():
+            added = attrs[key].history.added
+            if added:
+                written[key] = added[0]
+        check_ids(type(entity), written)
+
 
 class BaseModel(db.Model):
     """
     Class BaseModel inherit from db.model
     """
     __abstract__ = True
+    # Server defaults come back with RETURNING at flush, no refresh()
+    __mapper_args__ = {'eager_defaults': True}
 
-    id = db.Column(db.String(36),
+    id = db.Column(UUIDType,
                    primary_key=True,
                    default=lambda: str(uuid.uuid4()))
-    created_at = db.Column(db.DateTime,
+    created_at = db.Column(Timestamp,
                            default=db.func.current_timestamp(),
                            nullable=False)
-    updated_at = db.Column(db.DateTime,
+    updated_at = db.Column(Timestamp,
                            default=db.func.current_timestamp(),
                            onupdate=db.func.current_timestamp(),
                            nullable=False)
@@ -10,6 +10,14 @@ class City(BaseModel):
     Defines the City class that inherits from BaseModel
     """
     __tablename__ = 'cities'
+    __table_args__ = (
+        # Keyset pagination order
+        db.Index('ix_cities_created_at_id', 'created_at', 'id'),
+        # A city name is unique in its country, checked at creation
+        db.Index('uq_cities_city_name_country_code',
+                 'city_name', 'country_code', unique=True),
+        db.Index('ix_cities_country_code', 'country_code'),
+    )
     # Fields definition
     city_name = db.Column(db.String(128),
                      nullable=False)
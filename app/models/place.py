@@ -1,9 +1,11 @@
 """
 Python module for place class
 """
-from .base_model import BaseModel
+from .base_model import BaseModel, UUIDType
 from .place_amenity import place_amenities
 from config import db
+from persistence.geohash import GEOHASH_LENGTH, encode
+from sqlalchemy import event
 
 
 class Place(BaseModel):
@@ -11,6 +13,18 @@ class Place(BaseModel):
     Defines the Place class that inherits from BaseModel
     """
     __tablename__ = 'places'
+    __table_args__ = (
+        # Keyset pagination order
+        db.Index('ix_places_created_at_id', 'created_at', 'id'),
+        db.Index('ix_places_city_id', 'city_id'),
+        db.Index('ix_places_host_id', 'host_id'),
+        # Sort by rating, keyset on (rating_avg, id)
+        db.Index('ix_places_rating_avg_id', 'rating_avg', 'id'),
+        # Price range filter
+        db.Index('ix_places_price_per_night', 'price_per_night'),
+        # Nearby search, a cell is a range of geohashes
+        db.Index('ix_places_geohash', 'geohash'),
+    )
     # Fields definition
     name = db.Column(db.String(128),
                         nullable=False)
@@ -22,6 +36,8 @@ class Place(BaseModel):
                             nullable=False)
     longitude = db.Column(db.Float,
                             nullable=False)
+    # Set from latitude and longitude at each insert and update
+    geohash = db.Column(db.String(GEOHASH_LENGTH))
     num_rooms = db.Column(db.Integer,
                             nullable=False)
     num_bathrooms = db.Column(db.Integer,
@@ -30,14 +46,44 @@ class Place(BaseModel):
                                 nullable=False)
     max_guests = db.Column(db.Integer,
                             nullable=False)
+    # Rating aggregates of the reviews, updated at each flush
+    review_count = db.Column(db.Integer,
+                             default=0,
+                             server_default='0',
+                             nullable=False)
+    rating_sum = db.Column(db.Integer,
+                           default=0,
+                           server_default='0',
+                           nullable=False)
+    # 0 while the place has no review
+    rating_avg = db.Column(db.Float,
+                           default=0.0,
+                           server_default='0',
+                           nullable=False)
+    # Histogram: number of reviews rated 1, 2, 3, 4 and 5
+    rating_1 = db.Column(db.Integer, default=0, server_default='0',
+                         nullable=False)
+    rating_2 = db.Column(db.Integer, default=0, server_default='0',
+                         nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, server_default='0',
+                         nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, server_default='0',
+                         nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, server_default='0',
+                         nullable=False)
+    # OR of the bits of the amenities, updated at each flush
+    amenity_mask = db.Column(db.BigInteger,
+                             default=0,
+                             server_default='0',
+                             nullable=False)
     # Foreignkey definition
-    amenity_ids = db.Column(db.String(36),
+    amenity_ids = db.Column(UUIDType,
                         db.ForeignKey('amenities.id'),
                         nullable=False)
-    host_id = db.Column(db.String(36),
+    host_id = db.Column(UUIDType,
                         db.ForeignKey('users.id'),
                         nullable=False)
-    city_id = db.Column(db.String(36),
+    city_id = db.Column(UUIDType,
                         db.ForeignKey('cities.id'),
                         nullable=False)
     # 1 to 1 relationship with User
@@ -60,3 +106,13 @@ class Place(BaseModel):
 
     def __repr__(self):
         return f'<Place {self.name}>'
+
+
+@event.listens_for(Place, 'before_insert')
+@event.listens_for(Place, 'before_update')
+def set_geohash(mapper, connection, place):
+    """
+    Keeps the geohash of a place in line with its coordinates.
+    """
+    if place.latitude is not None and place.longitude is not None:
+        place.geohash = encode(place.latitude, place.longitude)
@@ -3,15 +3,18 @@ Module that makes a jonction between the classes Place and Amenity.
 Useful to handle 'many to many' relationship"""
 
 from config import db
+from .base_model import UUIDType
 
 place_amenities = db.Table('place_amenities',
     db.Column('place_id',
-    db.String(36),
+    UUIDType,
     db.ForeignKey('places.id'),
     primary_key=True),
 
     db.Column('amenity_id',
-    db.String(36),
+    UUIDType,
     db.ForeignKey('amenities.id'),
-    primary_key=True)
+    primary_key=True),
+    # Places of an amenity, the primary key serves those of a place
+    db.Index('ix_place_amenities_amenity_id', 'amenity_id')
 )
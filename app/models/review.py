@@ -1,7 +1,7 @@
 """
 Python module for review class
 """
-from .base_model import BaseModel
+from .base_model import BaseModel, UUIDType
 from config import db
 
 
@@ -10,16 +10,23 @@ class Review(BaseModel):
     Defines the Review class that inherits from BaseModel
     """
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # Keyset pagination order
+        db.Index('ix_reviews_created_at_id', 'created_at', 'id'),
+        # One review per user and place, checked at creation
+        db.Index('ix_reviews_user_id_place_id', 'user_id', 'place_id'),
+        db.Index('ix_reviews_place_id', 'place_id'),
+    )
     # Fields definition
     rating = db.Column(db.Integer,
                        nullable=False)
     comment = db.Column(db.String(1024),
                         nullable=False)
-    place_id = db.Column(db.String(36),
+    place_id = db.Column(UUIDType,
                         db.ForeignKey('places.id'),
                         nullable=False)
     # Foreignkey definition
-    user_id = db.Column(db.String(36),
+    user_id = db.Column(UUIDType,
                         db.ForeignKey('users.id'),
                         nullable=False)
 
@@ -0,0 +1,29 @@
+"""
+Python module for the revoked token class
+"""
+from .base_model import Timestamp, UUIDType
+from config import db
+
+
+class RevokedToken(db.Model):
+    """
+    JWT revoked before it expires, by logout.
+    """
+    __tablename__ = 'revoked_tokens'
+    # Fields definition
+    jti = db.Column(UUIDType,
+                    primary_key=True)
+    user_id = db.Column(UUIDType)
+    token_type = db.Column(db.String(10),
+                           nullable=False)
+    # The row is useless once the token expired
+    expires_at = db.Column(Timestamp,
+                           nullable=False,
+                           index=True)
+    revoked_at = db.Column(Timestamp,
+                           default=db.func.current_timestamp(),
+                           nullable=False,
+                           index=True)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
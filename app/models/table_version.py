@@ -0,0 +1,24 @@
+"""
+Python module for the table version class
+"""
+from .base_model import Timestamp
+from config import db
+
+
+class TableVersion(db.Model):
+    """
+    Version counter of a table, bumped by each write of its rows.
+    """
+    __tablename__ = 'table_versions'
+    # Fields definition
+    table_name = db.Column(db.String(64),
+                           primary_key=True)
+    version = db.Column(db.Integer,
+                        default=0,
+                        nullable=False)
+    updated_at = db.Column(Timestamp,
+                           default=db.func.current_timestamp(),
+                           nullable=False)
+
+    def __repr__(self):
+        return f'<TableVersion {self.table_name} {self.version}>'
@@ -3,9 +3,7 @@ Python module for User class
 """
 from .base_model import BaseModel
 from config import db
-from flask_bcrypt import Bcrypt
-
-bcrypt = Bcrypt(None)
+from persistence.passwords import password_hasher
 
 
 class User(BaseModel):
@@ -13,6 +11,10 @@ class User(BaseModel):
     Defines User class that inherits from BaseModel
     """
     __tablename__ = 'users'
+    __table_args__ = (
+        # Keyset pagination order
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
     # Fields definition
     email = db.Column(db.String(100),
                       unique=True,
@@ -37,16 +39,22 @@ class User(BaseModel):
 
     def set_password(password):
         """
-        Sets the password hash for the user
+        Sets the password hash for the user, hashed in the bcrypt pool
         """
-        password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        password_hash = password_hasher.hash(password)
         return password_hash
 
     def check_password(password_hash, password):
         """
-        Check the password hash for the user
+        Check the password hash for the user, in the bcrypt pool
+        """
+        return password_hasher.check(password_hash, password)
+
+    def needs_rehash(password_hash):
+        """
+        Check if the password hash has an outdated bcrypt cost
         """
-        return bcrypt.check_password_hash(password_hash, password)
+        return password_hasher.needs_rehash(password_hash)
 
     def __repr__(self):
         return f'<User {self.email}>'
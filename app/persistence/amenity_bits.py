@@ -0,0 +1,190 @@
+"""
+Python module for the amenity bitmasks of the places.
+Each amenity gets a stable bit position when it is first flushed,
+the lowest one no other amenity uses (the bits of the deleted
+amenities are given again), and each place stores the OR of the bits
+of its amenities, so that "has all / any of these amenities" is a
+bitwise test on one column instead of a join with a GROUP BY on
+place_amenities.
+A signed 64 bits column holds MASK_BITS amenities: the filters on an
+amenity without a bit below that fall back to the join.
+The amenities are created one transaction at a time: SQLite has a
+single writer, Postgres takes an advisory lock until the commit, so
+that two requests can't pick the same bit.
+The bulk updates and deletes of places and amenities go through the
+flush too (DataManager.maintained_by_flush), and so does the geohash
+of the places.
+"""
+from models.amenity import Amenity
+from models.base_model import as_uuid
+from models.place import Place
+from models.place_amenity import place_amenities
+from persistence.datamanager import maintained_by_flush
+from persistence.versions import bump
+from sqlalchemy import (BigInteger, case, cast, event, exists, func, select,
+                        update)
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import (INCLUDE_PENDING_MUTATIONS,
+                                       PASSIVE_NO_INITIALIZE, get_history)
+
+MASK_BITS = 63
+# Session.info key of the places whose amenities changed in the flush
+CHANGED_PLACES = 'amenity_places'
+# Key of the Postgres advisory lock held while new amenities get bits
+BITS_LOCK = 0x616D6E74
+
+places_table = Place.__table__
+maintained_by_flush(Place)
+maintained_by_flush(Amenity)
+
+
+def bit_mask(bits):
+    """
+    Returns the mask of bit positions, None if one can't be in a mask.
+    """
+    mask = 0
+    for bit in bits:
+        if bit is None or not 0 <= bit < MASK_BITS:
+            return None
+        mask |= 1 << bit
+    return mask
+
+
+def amenity_mask(session, amenity_ids):
+    """
+    Returns the mask of amenities, None if one of them is unknown
+    or has no bit in the masks.
+    """
+    # The same amenity may be sent in another case or form
+    amenity_ids = {str(as_uuid(id)) for id in amenity_ids}
+    bits = dict(session.execute(select(Amenity.id, Amenity.bit)
+                                .where(Amenity.id.in_(amenity_ids))).all())
+    if len(bits) < len(amenity_ids):
+        return None
+    return bit_mask(bits.values())
+
+
+def next_bit():
+    """
+    Returns the SQL expression of the lowest free bit,
+    computed by the INSERT of an amenity.
+    """
+    used = aliased(Amenity.__table__)
+    after = aliased(Amenity.__table__)
+    # A free bit is 0 or follows a used one
+    first_gap = (select(func.min(used.c.bit + 1))
+                 .where(~exists().where(after.c.bit == used.c.bit + 1))
+                 .scalar_subquery())
+    return select(case((exists().where(used.c.bit == 0), first_gap),
+                       else_=0)).scalar_subquery()
+
+
+def recomputed_mask():
+    """
+    Returns the mask of a place as a correlated subquery on its
+    amenities which have a bit.
+    """
+    amenities = Amenity.__table__
+    return (select(func.coalesce(func.sum(
+                cast(1, BigInteger).op('<<')(amenities.c.bit)), 0))
+            .select_from(place_amenities.join(
+                amenities, amenities.c.id == place_amenities.c.amenity_id))
+            .where(place_amenities.c.place_id == places_table.c.id,
+                   amenities.c.bit < MASK_BITS)
+            .scalar_subquery())
+
+
+@event.listens_for(Session, 'before_flush')
+def _assign_bits(session, flush_context, instances):
+    """
+    Gives the new amenities the lowest free bits, and keeps the places
+    whose amenities changed for after the flush.
+    """
+    new = [amenity for amenity in session.new
+           if isinstance(amenity, Amenity) and amenity.bit is None]
+    if new and session.get_bind().dialect.name == 'postgresql':
+        session.execute(select(func.pg_advisory_xact_lock(BITS_LOCK)))
+    for amenity in new:
+        amenity.bit = next_bit()
+
+    changed = session.info.setdefault(CHANGED_PLACES, set())
+    for place in [*session.new, *session.dirty]:
+        if not isinstance(place, Place):
+            continue
+        # Without loading the collection: the backref appends to an
+        # unloaded collection are pending mutations
+        if get_history(place, 'amenities',
+                       PASSIVE_NO_INITIALIZE
+                       | INCLUDE_PENDING_MUTATIONS).has_changes():
+            changed.add(place)
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_masks(session, flush_context):
+    """
+    Recomputes the masks of the places whose amenities changed,
+    and removes the bits of the deleted amenities from all the masks.
+    """
+    changed = session.info.setdefault(CHANGED_PLACES, set())
+    place_ids = [place.id for place in changed
+                 if place not in session.deleted]
+    bits = [amenity.bit for amenity in session.deleted
+            if isinstance(amenity, Amenity) and amenity.bit is not None
+            and amenity.bit < MASK_BITS]
+    if not place_ids and not bits:
+        return
+    connection = session.connection()
+    masks = places_table.c.amenity_mask
+    if place_ids:
+        connection.execute(update(places_table)
+                           .where(places_table.c.id.in_(place_ids))
+                           .values(amenity_mask=recomputed_mask()))
+    if bits:
+        mask = bit_mask(bits)
+        connection.execute(update(places_table)
+                           .where(masks.op('&')(mask) != 0)
+                           .values(amenity_mask=masks.op('&')(~mask)))
+        changed.update(
+            place for place in session.identity_map.values()
+            if isinstance(place, Place))
+    bump(session, [Place.__tablename__])
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_masks(session, flush_context):
+    """
+    Expires the masks of the places in the session,
+    they are read again from the database.
+    """
+    for place in session.info.pop(CHANGED_PLACES, ()):
+        if place not in session.deleted and place in session:
+            session.expire(place, ['amenity_mask'])
+
+
+class AmenityMaskIndex:
+    """
+    In-memory copy of the place ids and masks, the amenity filters
+    evaluated over a NumPy array.
+    """
+    def __init__(self, ids, masks):
+        # Only the workers filtering by amenities import numpy
+        import numpy
+        self.ids = numpy.asarray(ids, dtype=object)
+        self.masks = numpy.asarray(masks, dtype=numpy.int64)
+
+    @classmethod
+    def load(cls, session):
+        rows = session.execute(select(Place.id, Place.amenity_mask)).all()
+        return cls([row[0] for row in rows], [row[1] for row in rows])
+
+    def having_all(self, mask):
+        """
+        Returns the ids of the places having all the amenities of mask.
+        """
+        return self.ids[(self.masks & mask) == mask]
+
+    def having_any(self, mask):
+        """
+        Returns the ids of the places having one of the amenities of mask.
+        """
+        return self.ids[(self.masks & mask) != 0]
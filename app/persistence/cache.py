@@ -0,0 +1,210 @@
+"""
+Python module for the in-process caches.
+The entity cache keeps the column values of the rows read by id,
+one bounded LRU per model, each entry living at most ENTITY_CACHE_TTL
+seconds: another worker's writes are seen after that delay at worst.
+"""
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+import threading
+import time
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 60.0
+# Session.info key of the entities to invalidate again at commit
+INVALIDATED = 'invalidated_entities'
+
+
+class LRUCache:
+    """
+    Bounded LRU cache whose entries expire after ttl seconds,
+    with hit, miss, eviction and expiration counters.
+    """
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL,
+                 clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[1] if item else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._data),
+                    "maxsize": self.maxsize,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 4)
+                    if lookups else 0.0,
+                    "evictions": self.evictions,
+                    "expirations": self.expirations}
+
+
+class EntityCache:
+    """
+    Read-through cache of entities by (model, id), one LRU per model.
+    The column values are cached, not the instances: a hit builds
+    an instance attached to the session without any query.
+    """
+    def __init__(self, ttl=DEFAULT_CACHE_TTL, sizes=None,
+                 default_size=DEFAULT_CACHE_SIZE):
+        self._caches = {}
+        self._lock = threading.Lock()
+        self.configure(ttl, sizes, default_size)
+
+    def configure(self, ttl=DEFAULT_CACHE_TTL, sizes=None,
+                  default_size=DEFAULT_CACHE_SIZE):
+        """
+        Sets the TTL and the size limits, and empties the cache.
+        :param sizes: dict {table name: size limit}.
+        """
+        with self._lock:
+            self.ttl = ttl
+            self.sizes = dict(sizes or {})
+            self.default_size = default_size
+            self._caches = {}
+
+    def _cache_for(self, model):
+        cache = self._caches.get(model)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.get(model)
+                if cache is None:
+                    size = self.sizes.get(model.__tablename__,
+                                          self.default_size)
+                    cache = self._caches[model] = LRUCache(size, self.ttl)
+        return cache
+
+    def get(self, model, id, session):
+        """
+        Returns the entity of a model by id, None if it doesn't exist.
+        """
+        entity = session.identity_map.get(identity_key(model, id))
+        if entity is not None:
+            return entity
+        cache = self._cache_for(model)
+        values = cache.get(id)
+        if values is not None:
+            return _attach(model, values, session)
+        entity = session.get(model, id)
+        if entity is not None:
+            # Under the canonical id, the one invalidated on writes
+            cache.set(entity.id, _snapshot(entity))
+        return entity
+
+    def invalidate(self, model, ids, session=None):
+        """
+        Removes entities from the cache, and again when the session
+        commits, so a read racing with the write can't keep old values.
+        """
+        cache = self._cache_for(model)
+        for id in ids:
+            cache.pop(id)
+        if session is not None:
+            session.info.setdefault(INVALIDATED, set()).update(
+                (model, id) for id in ids)
+
+    def clear(self):
+        with self._lock:
+            for cache in self._caches.values():
+                cache.clear()
+
+    def stats(self):
+        """
+        Returns the counters of each model cache, by table name.
+        """
+        return {model.__tablename__: cache.stats()
+                for model, cache in list(self._caches.items())}
+
+
+def _snapshot(entity):
+    """
+    Returns the column values of a loaded entity.
+    """
+    return {attr.key: getattr(entity, attr.key)
+            for attr in inspect(type(entity)).column_attrs}
+
+
+def _attach(model, values, session):
+    """
+    Builds a persistent entity of the session from cached values.
+    """
+    entity = inspect(model).class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(entity, key, value)
+    make_transient_to_detached(entity)
+    return session.merge(entity, load=False)
+
+
+def cache_sizes(sizes):
+    """
+    Returns the dict {table name: size limit} of a string
+    such as 'places:2048,users:512'.
+    """
+    return {table.strip(): int(size) for table, size in
+            (item.split(':') for item in sizes.split(',') if item.strip())}
+
+
+entity_cache = EntityCache()
+
+
+def init_entity_cache(app):
+    """
+    Configures the entity cache from ENTITY_CACHE_TTL,
+    ENTITY_CACHE_SIZE and ENTITY_CACHE_SIZES of an app.
+    """
+    entity_cache.configure(app.config.get('ENTITY_CACHE_TTL',
+                                          DEFAULT_CACHE_TTL),
+                           app.config.get('ENTITY_CACHE_SIZES'),
+                           app.config.get('ENTITY_CACHE_SIZE',
+                                          DEFAULT_CACHE_SIZE))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    for model, id in session.info.pop(INVALIDATED, ()):
+        entity_cache._cache_for(model).pop(id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_invalidated(session, previous_transaction):
+    session.info.pop(INVALIDATED, None)
@@ -0,0 +1,84 @@
+"""
+Python module for the index of the pycountry countries.
+The index is built once per worker, on first use: the records by
+alpha_2 and alpha_3, and the JSON bodies of GET /countries and
+of each GET /countries/<code>, encoded once with their ETags. The data
+only changes with pycountry itself, so the responses are cached by the
+clients for COUNTRY_MAX_AGE and revalidated with their ETag after that.
+"""
+from collections import namedtuple
+from flask import Response, request
+from functools import lru_cache
+from hashlib import sha1
+from persistence.serializer import dumps
+from types import MappingProxyType
+
+# Seconds the clients may reuse a country response
+COUNTRY_MAX_AGE = 86400
+
+CountryRecord = namedtuple('CountryRecord', ['name', 'code', 'alpha_3'])
+# JSON body of a response and its ETag
+EncodedBody = namedtuple('EncodedBody', ['body', 'etag'])
+
+
+def _encoded(data):
+    body = dumps(data).encode('utf-8')
+    return EncodedBody(body, sha1(body).hexdigest())
+
+
+def _public(record):
+    return {"name": record.name, "code": record.code}
+
+
+class CountryIndex:
+    """
+    Read-only lookups of the countries, and their encoded responses.
+    """
+    def __init__(self, countries):
+        records = tuple(CountryRecord(country.name, country.alpha_2,
+                                      country.alpha_3)
+                        for country in countries)
+        self.records = records
+        self.by_alpha_2 = MappingProxyType(
+            {record.code: record for record in records})
+        self.by_alpha_3 = MappingProxyType(
+            {record.alpha_3: record for record in records})
+        self.list_body = _encoded([_public(record) for record in records])
+        self.detail_bodies = MappingProxyType(
+            {record.code: _encoded({"Country": _public(record)})
+             for record in records})
+
+    def get(self, code):
+        """
+        Returns the record of an alpha_2 or alpha_3 code, in any case,
+        None if there is none.
+        """
+        code = (code or '').upper()
+        return self.by_alpha_2.get(code) or self.by_alpha_3.get(code)
+
+
+@lru_cache(maxsize=1)
+def country_index():
+    """
+    Returns the index of the pycountry countries, built on first use.
+    """
+    # Its databases are only read for the first country request
+    import pycountry
+    return CountryIndex(pycountry.countries)
+
+
+def encoded_response(encoded, status=200):
+    """
+    Returns the response of an encoded body, with long-lived cache
+    headers, a 304 if the client already holds its ETag.
+    """
+    if request.if_none_match.contains(encoded.etag):
+        response = Response(status=304)
+    else:
+        response = Response(encoded.body, status=status,
+                            mimetype='application/json')
+    response.set_etag(encoded.etag)
+    # Behind the JWT: the browsers may cache them, not the shared caches
+    response.cache_control.private = True
+    response.cache_control.max_age = COUNTRY_MAX_AGE
+    return response
@@ -1,45 +1,210 @@
-from config import Config, db
-from sqlalchemy.orm import sessionmaker
-import datetime
+from config import db
+from models.base_model import as_uuid, check_ids
+from persistence.cache import entity_cache
+from persistence.serializer import projected_entity, serializer_for
+from persistence.unit_of_work import stage
+from persistence.versions import bump
+from sqlalchemy import update, delete, inspect, select
+
+# Number of rows sent per INSERT/UPDATE/DELETE batch
+BULK_CHUNK_SIZE = 500
+# Models whose flushes maintain other rows (rating aggregates, amenity
+# masks, geohash): their bulk writes go through the flush, not Core
+_flush_maintained = set()
+
+
+def maintained_by_flush(model):
+    """
+    Registers a model whose bulk updates and deletes must go through
+    the flush, for the listeners maintaining the rows derived from it.
+    """
+    _flush_maintained.add(model)
+
+
+def _deleted_by_flush(model):
+    """
+    Returns True if the deletes of a model must go through the flush:
+    maintained rows, or relationships cascading the deletes (ex: the
+    places of a city), which a Core DELETE would leave dangling.
+    """
+    return model in _flush_maintained or any(
+        relationship.cascade.delete
+        for relationship in inspect(model).relationships)
+
+
+def _chunks(items, chunk_size):
+    """
+    Yields (start index, chunk) pairs of at most chunk_size items.
+    """
+    for start in range(0, len(items), chunk_size):
+        yield start, items[start:start + chunk_size]
+
+
+def _error_message(error):
+    """
+    Returns the driver message of a database error, without the SQL.
+    """
+    return str(getattr(error, 'orig', None) or error)
+
+
+def _update_entities(model, rows, session):
+    """
+    Applies rows of updates to the entities of a model and flushes them.
+    """
+    by_id = {str(as_uuid(row['id'])): row for row in rows}
+    for entity in session.scalars(select(model)
+                                  .where(model.id.in_(list(by_id)))):
+        for key, value in by_id[entity.id].items():
+            if key != 'id':
+                setattr(entity, key, value)
+    session.flush()
 
-Session = sessionmaker(bind=Config.engine)
-session = Session()
 
 class DataManager:
+    def get(model, id, session):
+        """
+        Returns the entity of a model by id, through the entity cache.
+        :Returns: the entity, None if not found.
+        """
+        return entity_cache.get(model, id, session)
+
     def save(entity, session):
         try:
             session.add(entity)
-            session.commit()
+            stage(session)
         except Exception as e:
             session.rollback()
             raise e
 
+    def save_many(entities, session, chunk_size=BULK_CHUNK_SIZE):
+        """
+        Saves a list of new entities in the unit of work, one savepoint
+        per chunk. The flush of a chunk groups the INSERTs of each table
+        in a single executemany call.
+        If a chunk fails, its entities are saved one by one so that
+        a bad entity doesn't abort the rest of the batch.
+        :param entities: list of new entities.
+        :Returns: dict {index in entities: error message} of the failures.
+        """
+        errors = {}
+        for start, chunk in _chunks(entities, chunk_size):
+            try:
+                with session.begin_nested():
+                    session.add_all(chunk)
+            except Exception:
+                for offset, entity in enumerate(chunk):
+                    try:
+                        with session.begin_nested():
+                            session.add(entity)
+                    except Exception as e:
+                        errors[start + offset] = _error_message(e)
+        stage(session)
+        return errors
+
     def read(entity):
-        result = {}
-        for key, value in entity.__dict__.items():
-            if key != '_sa_instance_state':
-                if isinstance(value, datetime.datetime):
-                    result[key] = value.isoformat()
-                else:
-                    result[key] = value
-        return result
+        """
+        Returns a dict of the mapped columns of an entity,
+        through the serializer of its model class.
+        """
+        return serializer_for(type(entity)).serialize(entity)
+
+    def read_by_id(model, id, session, fields=None):
+        """
+        Returns the dict of the entity of a model by id, None if not
+        found: all its fields through the entity cache, or only fields,
+        selecting their columns.
+        """
+        if fields:
+            return projected_entity(model, id, session, fields)
+        entity = DataManager.get(model, id, session)
+        return None if entity is None else DataManager.read(entity)
 
     def update(entity, updates, session):
         try:
             entity = session.merge(entity)
+            entity_cache.invalidate(type(entity),
+                                    inspect(entity).identity, session)
             for key, value in updates.items():
                 if hasattr(entity, key):
                     setattr(entity, key, value)
 
-            session.commit()
+            stage(session)
+        except Exception as e:
+            session.rollback()
+            raise e
+
+    def update_many(model, updates, session, chunk_size=BULK_CHUNK_SIZE):
+        """
+        Updates rows of a model by primary key in the unit of work,
+        one executemany UPDATE per chunk. The models maintained by
+        flush are loaded and flushed instead, one SELECT per chunk.
+        Keys that are not columns of the model are ignored, and the ids
+        written are checked (InvalidIdError) before the first UPDATE.
+        :param model: mapped class of the rows.
+        :param updates: list of dicts, each one holding the 'id' of its row.
+        :Returns: number of rows sent to the database.
+        """
+        columns = set(model.__table__.columns.keys())
+        rows = [{key: value for key, value in row.items() if key in columns}
+                for row in updates]
+        for row in rows:
+            # The id of a row is its lookup, the others are written
+            check_ids(model, {key: value for key, value in row.items()
+                              if key != 'id'})
+        entity_cache.invalidate(model, [row['id'] for row in rows], session)
+        try:
+            for _, chunk in _chunks(rows, chunk_size):
+                if model in _flush_maintained:
+                    _update_entities(model, chunk, session)
+                else:
+                    session.execute(update(model), chunk)
+                    bump(session, [model.__tablename__])
+            stage(session)
         except Exception as e:
             session.rollback()
             raise e
+        return len(rows)
 
     def delete(entity, session):
         try:
+            entity_cache.invalidate(type(entity),
+                                    inspect(entity).identity, session)
             session.delete(entity)
-            session.commit()
+            stage(session)
+        except Exception as e:
+            session.rollback()
+            raise e
+
+    def delete_many(model, ids, session, chunk_size=BULK_CHUNK_SIZE):
+        """
+        Deletes rows of a model by id in the unit of work, one
+        DELETE ... WHERE id IN (...) per chunk. The models maintained by
+        flush or with cascading relationships are loaded and deleted by
+        the flush instead, with their cascades (ex: the places of a city).
+        :param model: mapped class of the rows.
+        :param ids: list of ids to delete.
+        :Returns: number of rows deleted.
+        """
+        ids = list(ids)
+        entity_cache.invalidate(model, ids, session)
+        deleted = 0
+        try:
+            for _, chunk in _chunks(ids, chunk_size):
+                if _deleted_by_flush(model):
+                    entities = session.scalars(
+                        select(model).where(model.id.in_(chunk))).all()
+                    for entity in entities:
+                        session.delete(entity)
+                    session.flush()
+                    deleted += len(entities)
+                else:
+                    result = session.execute(
+                        delete(model).where(model.id.in_(chunk)),
+                        execution_options={"synchronize_session": False})
+                    bump(session, [model.__tablename__])
+                    deleted += result.rowcount
+            stage(session)
         except Exception as e:
             session.rollback()
             raise e
+        return deleted
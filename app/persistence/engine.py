@@ -0,0 +1,118 @@
+"""
+Python module for the options of the single engine of the app
+and the metrics of its connection pool.
+Each gunicorn worker holds its own pool: the database sees up to
+workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+SQLite transactions are begun by SQLAlchemy instead of pysqlite, which
+doesn't begin them before a SAVEPOINT: releasing the first savepoint
+of a transaction would commit it.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+import os
+import sqlite3
+import threading
+import time
+
+
+def engine_options(uri):
+    """
+    Returns the SQLALCHEMY_ENGINE_OPTIONS of a database uri,
+    tuned by the DB_POOL_* environment variables.
+    In-memory SQLite keeps the single connection set by Flask-SQLAlchemy.
+    """
+    if uri in ('sqlite://', 'sqlite:///:memory:'):
+        return {}
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'True') == 'True',
+    }
+
+
+class PoolMetrics:
+    """
+    Counters of the checkouts of a pool and of their wait time.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def to_dict(self):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {"checkouts": self.checkouts,
+                    "timeouts": self.timeouts,
+                    "wait_avg_ms": round(1000 * self.wait_total / waits, 3)
+                    if waits else 0.0,
+                    "wait_max_ms": round(1000 * self.wait_max, 3)}
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool measuring how long each checkout waits for a connection.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+
+def pool_status(engine):
+    """
+    Returns the state of the pool of an engine: checked out and idle
+    connections, overflow and wait times.
+    """
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({"size": pool.size(),
+                       "checked_out": pool.checkedout(),
+                       "idle": pool.checkedin(),
+                       "overflow": max(pool.overflow(), 0)})
+    if isinstance(pool, TimedQueuePool):
+        status.update(pool.metrics.to_dict())
+    return status
+
+
+@event.listens_for(Pool, 'connect')
+def _sqlite_connect(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        # No implicit BEGIN nor COMMIT from pysqlite
+        dbapi_connection.isolation_level = None
+
+
+@event.listens_for(Engine, 'begin')
+def _sqlite_begin(connection):
+    if connection.dialect.name == 'sqlite':
+        driver_connection = connection.connection.driver_connection
+        # The in-memory databases share one connection between sessions
+        if not driver_connection.in_transaction:
+            driver_connection.execute('BEGIN')
+
@@ -0,0 +1,91 @@
+"""
+Python module for the expansion of the relationships of the entities.
+?expand=city,city.country,amenities names the relationships serialized
+inside each entity. They are loaded with the entities: one JOIN per
+many-to-one, one SELECT ... IN per collection, so a page costs the
+same number of queries whatever its size, instead of one lazy load
+per entity and relationship.
+"""
+from flask import request
+from models.city import City
+from models.place import Place
+from models.review import Review
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+# Relationships a client may expand, by model
+EXPANSIONS = {
+    Place: ('city', 'city.country', 'amenities', 'reviews', 'host'),
+    Review: ('place', 'place.city', 'user'),
+    City: ('country', 'places'),
+}
+
+
+class ExpandError(ValueError):
+    """
+    Raised on a relationship the client can't expand.
+    """
+
+
+def expand_paths(model, value=None):
+    """
+    Returns the sorted tuple of the relationships to expand of the
+    expand query parameter (or value), with the parents of the nested
+    ones: city.country also expands city.
+    """
+    if value is None:
+        value = request.args.get("expand", "")
+    allowed = EXPANSIONS.get(model, ())
+    paths = set()
+    for path in filter(None, (path.strip() for path in value.split(","))):
+        if path not in allowed:
+            raise ExpandError("expand must be among "
+                              f"{', '.join(allowed) or 'nothing'}.")
+        names = path.split(".")
+        paths.update(".".join(names[:i]) for i in range(1, len(names) + 1))
+    return tuple(sorted(paths))
+
+
+def expanded_tables(model, paths):
+    """
+    Returns the sorted list of the names of the tables read by the
+    relationships of paths, ex: ['cities', 'countries'] for city.country.
+    """
+    tables = set()
+    for path in paths:
+        current = model
+        for name in path.split("."):
+            current = getattr(current, name).property.mapper.class_
+        tables.add(current.__tablename__)
+    return sorted(tables)
+
+
+def expand_options(model, paths):
+    """
+    Returns the loader options of the relationships of paths:
+    joinedload for the many-to-one, selectinload for the collections.
+    """
+    options = []
+    for path in paths:
+        # The parents are loaded by the options of their children
+        if any(other.startswith(path + ".") for other in paths):
+            continue
+        option, current = None, model
+        for name in path.split("."):
+            attribute = getattr(current, name)
+            loader = (selectinload if attribute.property.uselist
+                      else joinedload)
+            option = (loader(attribute) if option is None
+                      else getattr(option, loader.__name__)(attribute))
+            current = attribute.property.mapper.class_
+        options.append(option)
+    return options
+
+
+def get_expanded(model, id, session, paths):
+    """
+    Returns the entity of a model by id with its relationships of
+    paths loaded, None if not found.
+    """
+    return session.scalars(select(model).where(model.id == id)
+                           .options(*expand_options(model, paths))).first()
@@ -0,0 +1,173 @@
+"""
+Python module checking the query plans of the endpoint queries.
+Each query runs under EXPLAIN (SQLite and Postgres) on a seeded
+dataset, inside a transaction rolled back at the end, and is reported
+if its plan reads a whole table instead of using an index.
+"""
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.amenity_bits import MASK_BITS
+from persistence.facets import place_filters
+from persistence.pagination import DEFAULT_PAGE_SIZE, after
+from sqlalchemy import insert, select
+import datetime
+import re
+import uuid
+
+# SQLite: "SCAN places" without "USING ... INDEX"; Postgres: "Seq Scan"
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?!CONSTANT ROW)[\w"]+'
+                              r'( AS \w+)?$')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on')
+
+
+def seed(connection, rows):
+    """
+    Inserts rows entities of each table, and returns the values
+    the endpoint queries are run with.
+    """
+    now = datetime.datetime(2024, 1, 1)
+    # Keeps the unique columns clear of the existing rows
+    run = uuid.uuid4().hex[:8]
+
+    def entity(index, **values):
+        return {"id": str(uuid.uuid4()),
+                "created_at": now + datetime.timedelta(seconds=index),
+                "updated_at": now, **values}
+
+    users = [entity(i, email=f"explain{i}.{run}@example.com", first_name="E",
+                    last_name="Xplain", is_admin=False) for i in range(rows)]
+    # The first amenities have bits: the amenity filters use the masks
+    amenities = [entity(i, name=f"Explain amenity {i} {run}",
+                        bit=i if i < MASK_BITS else None)
+                 for i in range(rows)]
+    cities = [entity(i, city_name=f"Explain city {i} {run}", country_code="ZZ")
+              for i in range(rows)]
+    places = [entity(i, name=f"Place {i}", description="Explain",
+                     address="Address", latitude=0.0, longitude=0.0,
+                     num_rooms=1, num_bathrooms=1, price_per_night=10.0,
+                     max_guests=2, amenity_ids=amenities[i]["id"],
+                     host_id=users[i]["id"], city_id=cities[i]["id"])
+              for i in range(rows)]
+    reviews = [entity(i, rating=5, comment="Explain",
+                      place_id=places[i]["id"],
+                      user_id=users[(i + 1) % rows]["id"])
+               for i in range(rows)]
+
+    connection.execute(insert(Country), [{"code": "ZZ",
+                                          "name": f"Explain country {run}"}])
+    for model, values in ((User, users), (Amenity, amenities),
+                          (City, cities), (Place, places),
+                          (Review, reviews)):
+        connection.execute(insert(model), values)
+    middle = rows // 2
+    return {"user": users[middle], "amenity": amenities[middle],
+            "masked_amenity": amenities[min(middle, MASK_BITS - 1)],
+            "city": cities[middle], "place": places[middle],
+            "review": reviews[middle]}
+
+
+def first_page(model, *criteria):
+    return (select(model).where(*criteria)
+            .order_by(model.created_at, model.id).limit(DEFAULT_PAGE_SIZE))
+
+
+def next_page(model, row, *criteria):
+    columns = [model.created_at, model.id]
+    return first_page(model, *criteria, after(
+        columns, [row["created_at"], row["id"]]))
+
+
+def endpoint_queries(sample, connection):
+    """
+    Returns the dict {endpoint: statement} of the queries to check.
+    :param connection: connection holding the seeded rows, which the
+    amenity filters read the bits from, as the endpoint does.
+    """
+    user, amenity, city = sample["user"], sample["amenity"], sample["city"]
+    place, review = sample["place"], sample["review"]
+    queries = {}
+    for path, model, key in (("/places", Place, "place"),
+                             ("/amenities", Amenity, "amenity"),
+                             ("/cities", City, "city"),
+                             ("/users", User, "user")):
+        queries[f"GET {path}"] = first_page(model)
+        queries[f"GET {path}?cursor"] = next_page(model, sample[key])
+        queries[f"GET {path}/<id>"] = select(model).where(
+            model.id == sample[key]["id"])
+    queries.update({
+        "POST /amenities (unique name)": select(Amenity.id).filter_by(
+            name=amenity["name"]),
+        "POST /cities (unique name)": select(City.id).filter_by(
+            city_name=city["city_name"], country_code="ZZ"),
+        "GET /places?country": first_page(Place, *place_filters(
+            {"country": "ZZ"})),
+        "GET /places?min_price&max_price": first_page(Place, *place_filters(
+            {"min_price": "10", "max_price": "20"})),
+        "GET /places?amenities": first_page(Place, *place_filters(
+            {"amenities": sample["masked_amenity"]["id"]}, connection)),
+        "GET /countries/<code>/cities": first_page(
+            City, City.country_code == "ZZ"),
+        "POST /login": select(User).filter_by(email=user["email"]),
+        "POST /places/<id>/reviews (one per user)": select(Review).filter_by(
+            user_id=review["user_id"], place_id=review["place_id"]),
+        "GET /users/<id>/reviews": first_page(
+            Review, Review.user_id == review["user_id"]),
+        "DELETE /places/<id> (reviews)": select(Review).where(
+            Review.place_id == place["id"]),
+        "DELETE /cities/<id> (places)": select(Place).where(
+            Place.city_id == city["id"]),
+        "DELETE /users/<id> (place)": select(Place).where(
+            Place.host_id == user["id"]),
+    })
+    return queries
+
+
+def plan(connection, statement):
+    """
+    Returns the lines of the query plan of a statement, its
+    parameters rendered inline.
+    """
+    sql = str(statement.compile(dialect=connection.dialect,
+                                compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql('EXPLAIN ' + sql)
+    return [row[0] for row in rows]
+
+
+def full_scans(dialect_name, lines):
+    """
+    Returns the lines of a query plan reading a whole table.
+    """
+    pattern = (SQLITE_FULL_SCAN if dialect_name == 'sqlite'
+               else POSTGRES_FULL_SCAN)
+    return [line for line in lines if pattern.search(line.strip())]
+
+
+def check_plans(engine, rows=1000):
+    """
+    Seeds a transaction of engine, explains the endpoint queries in it,
+    and rolls it back.
+    :Returns: dict {endpoint: (plan lines, full scan lines)}.
+    """
+    report = {}
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            if connection.dialect.name == 'postgresql':
+                # A seq scan is then only chosen when no index can serve
+                connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            sample = seed(connection, rows)
+            for name, statement in endpoint_queries(sample,
+                                                    connection).items():
+                lines = plan(connection, statement)
+                report[name] = (lines, full_scans(connection.dialect.name,
+                                                  lines))
+        finally:
+            transaction.rollback()
+    return report
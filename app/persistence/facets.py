@@ -0,0 +1,177 @@
+"""
+Python module for the filters of the places list and their facets.
+The filters of the query string become the criteria of one SQL query,
+and the facet counts (per city, per amenity, per price bucket) of the
+filtered places come from a single UNION ALL query over them.
+"""
+from models.amenity import Amenity
+from models.base_model import as_uuid
+from models.city import City
+from models.place import Place
+from models.place_amenity import place_amenities
+from persistence.amenity_bits import amenity_mask
+from sqlalchemy import (String, case, cast, func, literal, select,
+                        union_all)
+
+# Upper bounds of the price buckets, the last bucket has none
+PRICE_BUCKETS = (50, 100, 200, 500)
+# Most amenities a place can be filtered on
+MAX_AMENITIES = 20
+# Models read by the filters besides the places (see conditional):
+# the cities of a country, the bits of the amenities
+FILTER_MODELS = {"country": (City,), "amenities": (Amenity,),
+                 "any_amenities": (Amenity,)}
+
+
+class FilterError(ValueError):
+    """
+    Raised on an invalid filter sent by the client.
+    """
+
+
+def _number(args, name, kind=float, minimum=None, maximum=None):
+    """
+    Returns the number of a query parameter, None if it is missing.
+    """
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        value = kind(value)
+    except ValueError:
+        raise FilterError(f"{name} must be a number.")
+    if ((minimum is not None and value < minimum)
+            or (maximum is not None and value > maximum)):
+        raise FilterError(f"{name} must be included between "
+                          f"{minimum} and {maximum}." if maximum is not None
+                          else f"{name} must be at least {minimum}.")
+    return value
+
+
+def _ids(args, name):
+    """
+    Returns the set of the ids of a query parameter separated by commas,
+    in their canonical form: an id sent twice in two cases counts once.
+    """
+    ids = {id for id in args.get(name, "").split(",") if id}
+    if len(ids) > MAX_AMENITIES:
+        raise FilterError(f"At most {MAX_AMENITIES} {name}.")
+    return {str(as_uuid(id)) for id in ids}
+
+
+def _amenity_filter(session, amenity_ids, every):
+    """
+    Returns the criterion of the places having every (or any) amenity:
+    a bitwise test on the amenity masks when the amenities have bits,
+    a subquery on place_amenities otherwise.
+    """
+    mask = amenity_mask(session, amenity_ids) if session else None
+    if mask is not None:
+        tested = Place.amenity_mask.op('&')(mask)
+        return tested == mask if every else tested != 0
+    query = (select(place_amenities.c.place_id)
+             .where(place_amenities.c.amenity_id.in_(amenity_ids)))
+    if every:
+        query = (query.group_by(place_amenities.c.place_id)
+                 .having(func.count() == len(amenity_ids)))
+    return Place.id.in_(query)
+
+
+def place_filters(args, session=None):
+    """
+    Returns the criteria of the places matching the query parameters
+    country, city_id, min_price, max_price, guests, rooms, min_rating,
+    amenities (ids separated by commas, all required) and
+    any_amenities (at least one required).
+    :param session: session reading the bits of the amenities,
+    the amenity filters use the join without it.
+    """
+    criteria = []
+    country = args.get("country")
+    if country:
+        criteria.append(Place.city_id.in_(
+            select(City.id).where(City.country_code == country.upper())))
+    city_id = args.get("city_id")
+    if city_id:
+        criteria.append(Place.city_id == city_id)
+
+    min_price = _number(args, "min_price", minimum=0)
+    if min_price is not None:
+        criteria.append(Place.price_per_night >= min_price)
+    max_price = _number(args, "max_price", minimum=0)
+    if max_price is not None:
+        criteria.append(Place.price_per_night <= max_price)
+    guests = _number(args, "guests", int, minimum=1)
+    if guests is not None:
+        criteria.append(Place.max_guests >= guests)
+    rooms = _number(args, "rooms", int, minimum=1)
+    if rooms is not None:
+        criteria.append(Place.num_rooms >= rooms)
+    min_rating = _number(args, "min_rating", minimum=1, maximum=5)
+    if min_rating is not None:
+        criteria.append(Place.rating_avg >= min_rating)
+
+    amenities = _ids(args, "amenities")
+    if amenities:
+        criteria.append(_amenity_filter(session, amenities, every=True))
+    any_amenities = _ids(args, "any_amenities")
+    if any_amenities:
+        criteria.append(_amenity_filter(session, any_amenities, every=False))
+    return criteria
+
+
+def price_bucket(price):
+    """
+    Returns the expression of the price bucket of a price, ex: '50-100'.
+    """
+    bounds = (0, *PRICE_BUCKETS)
+    return case(*[(price < upper, f"{lower}-{upper}")
+                  for lower, upper in zip(bounds, bounds[1:])],
+                else_=f"{PRICE_BUCKETS[-1]}+")
+
+
+def id_text(column, dialect):
+    """
+    Returns the expression of the canonical string of an id column,
+    the type of the price buckets sharing a UNION with the ids.
+    """
+    if dialect != 'sqlite':
+        return cast(column, String)
+    # SQLite has no UUID type: the hex digits of the 16 bytes
+    digits = func.lower(func.hex(column), type_=String)
+    return (func.substr(digits, 1, 8, type_=String)
+            + '-' + func.substr(digits, 9, 4, type_=String)
+            + '-' + func.substr(digits, 13, 4, type_=String)
+            + '-' + func.substr(digits, 17, 4, type_=String)
+            + '-' + func.substr(digits, 21, 12, type_=String))
+
+
+def facet_counts(session, criteria):
+    """
+    Returns the number of places matching criteria per city,
+    per amenity and per price bucket, the largest counts first.
+    """
+    dialect = session.get_bind().dialect.name
+    filtered = (select(Place.id, Place.city_id, Place.price_per_night)
+                .where(*criteria).cte('filtered'))
+    bucket = price_bucket(filtered.c.price_per_night)
+    facets = union_all(
+        select(literal("city").label("facet"),
+               id_text(filtered.c.city_id, dialect).label("value"),
+               func.count())
+        .group_by(filtered.c.city_id),
+        select(literal("amenity"),
+               id_text(place_amenities.c.amenity_id, dialect),
+               func.count())
+        .select_from(filtered.join(
+            place_amenities, place_amenities.c.place_id == filtered.c.id))
+        .group_by(place_amenities.c.amenity_id),
+        select(literal("price"), cast(bucket, String), func.count())
+        .group_by(bucket))
+
+    counts = {"city": [], "amenity": [], "price": []}
+    for facet, value, count in session.execute(facets):
+        counts[facet].append({"value": value, "count": count})
+    for values in counts.values():
+        values.sort(key=lambda item: (-item["count"], item["value"]))
+    return counts
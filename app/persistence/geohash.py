@@ -0,0 +1,118 @@
+"""
+Python module for the geohashes of the places and the distances.
+A geohash cell is a prefix: the places of a cell are the range
+[prefix, next prefix) of the indexed geohash column.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Precision of the geohash stored on the places (cells of ~4 cm)
+GEOHASH_LENGTH = 12
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(latitude, longitude, precision=GEOHASH_LENGTH):
+    """
+    Returns the geohash of a point.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit = 0
+    index = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = ((longitude, lon_range) if even
+                         else (latitude, lat_range))
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            index = index * 2 + 1
+            bounds[0] = middle
+        else:
+            index = index * 2
+            bounds[1] = middle
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[index])
+            bit = 0
+            index = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """
+    Returns the (latitude, longitude) size in degrees of the cells.
+    """
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** (bits - bits // 2)
+
+
+def precision_for(latitude, radius_km):
+    """
+    Returns the longest precision whose cells are at least radius_km
+    wide and high at a latitude, so that a circle of that radius only
+    reaches the cells next to its center one. 0 if there is none.
+    """
+    # Longitudes shrink with the latitude, take the side nearest a pole
+    edge = min(90.0, abs(latitude) + radius_km / KM_PER_DEGREE)
+    shrink = math.cos(math.radians(edge))
+    for precision in range(GEOHASH_LENGTH, 0, -1):
+        lat_size, lon_size = cell_size(precision)
+        if (lat_size * KM_PER_DEGREE >= radius_km
+                and lon_size * KM_PER_DEGREE * shrink >= radius_km):
+            return precision
+    return 0
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """
+    Returns the geohash prefixes of the cells that may hold points
+    within radius_km of a point: its cell and the 8 around it.
+    [''] (every place) when the radius is too large for any cell.
+    """
+    precision = precision_for(latitude, radius_km)
+    if precision == 0:
+        return ['']
+    lat_size, lon_size = cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        lat = latitude + lat_step * lat_size
+        if not -90.0 <= lat <= 90.0:
+            continue
+        for lon_step in (-1, 0, 1):
+            lon = (longitude + lon_step * lon_size + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def next_prefix(prefix):
+    """
+    Returns the first geohash after all those starting with prefix,
+    None if there is none.
+    """
+    chars = list(prefix)
+    while chars:
+        position = BASE32.index(chars[-1])
+        if position + 1 < len(BASE32):
+            chars[-1] = BASE32[position + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """
+    Returns the numpy array of the distances in km between a point
+    and arrays of points, computed in one vectorized pass.
+    """
+    # Not at the top: models.place imports this module at boot
+    import numpy
+    lat1 = math.radians(latitude)
+    lat2 = numpy.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = numpy.radians(longitudes) - math.radians(longitude)
+    a = (numpy.sin(dlat / 2) ** 2
+         + math.cos(lat1) * numpy.cos(lat2) * numpy.sin(dlon / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1)))
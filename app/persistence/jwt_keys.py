@@ -0,0 +1,160 @@
+"""
+Python module for the asymmetric signing keys of the JWTs.
+JWT_KEYS_DIR holds one PEM file per key, named <kid>.pem: the private
+keys sign and verify, the public ones only verify (the retired keys
+kept until their tokens expire). JWT_SIGNING_KID picks the key that
+signs, the last kid in sorted order by default, so that rotating is
+adding a newer key file (flask jwt-keys generate) then deleting the
+old one once its tokens expired.
+The PEM files are parsed once into key objects, and the JWKS document
+of the public keys is rendered once, at startup.
+Without JWT_KEYS_DIR the tokens keep HS256 and JWT_SECRET_KEY.
+"""
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from datetime import datetime, timezone
+from jwt import InvalidTokenError
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+import json
+import os
+
+KEY_SUFFIX = '.pem'
+RSA_KEY_SIZE = 2048
+# Seconds the clients may cache the JWKS document
+JWKS_MAX_AGE = 300
+
+
+def _algorithm(key):
+    """
+    Returns the JWT algorithm of a key object.
+    """
+    if isinstance(key, (ed25519.Ed25519PrivateKey,
+                        ed25519.Ed25519PublicKey)):
+        return 'EdDSA'
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return 'RS256'
+    raise ValueError(f'Unsupported key type {type(key).__name__}.')
+
+
+class SigningKey:
+    """
+    A parsed key of the key ring, private_key is None for the keys
+    which only verify.
+    """
+    def __init__(self, kid, private_key=None, public_key=None):
+        self.kid = kid
+        self.private_key = private_key
+        self.public_key = public_key or private_key.public_key()
+        self.algorithm = _algorithm(self.public_key)
+
+    @classmethod
+    def from_pem(cls, kid, pem):
+        if b'PRIVATE KEY' in pem:
+            return cls(kid, serialization.load_pem_private_key(pem, None))
+        return cls(kid, public_key=serialization.load_pem_public_key(pem))
+
+    def jwk(self):
+        """
+        Returns the JWK dict of the public key.
+        """
+        algorithm = (OKPAlgorithm if self.algorithm == 'EdDSA'
+                     else RSAAlgorithm)
+        return {**algorithm.to_jwk(self.public_key, as_dict=True),
+                'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'}
+
+
+class KeyRing:
+    """
+    The signing key and the keys still accepted, by kid.
+    """
+    def __init__(self, keys, signing_kid=None):
+        self.keys = {key.kid: key for key in keys}
+        signers = sorted(kid for kid, key in self.keys.items()
+                         if key.private_key is not None)
+        if not signers:
+            raise ValueError('No private key to sign the tokens.')
+        signing_kid = signing_kid or signers[-1]
+        if signing_kid not in signers:
+            raise ValueError(f'No private key with kid {signing_kid}.')
+        self.signing = self.keys[signing_kid]
+        self.algorithms = sorted({key.algorithm
+                                  for key in self.keys.values()})
+        self.jwks = json.dumps(
+            {'keys': [self.keys[kid].jwk() for kid in sorted(self.keys)]},
+            separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def from_directory(cls, directory, signing_kid=None):
+        """
+        Returns the key ring of the PEM files of a directory.
+        """
+        keys = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(KEY_SUFFIX):
+                with open(os.path.join(directory, name), 'rb') as file:
+                    keys.append(SigningKey.from_pem(
+                        name[:-len(KEY_SUFFIX)], file.read()))
+        return cls(keys, signing_kid)
+
+    def verifying_key(self, kid):
+        """
+        Returns the public key object of a kid,
+        InvalidTokenError if there is none.
+        """
+        key = self.keys.get(kid)
+        if key is None:
+            raise InvalidTokenError('Unknown signing key.')
+        return key.public_key
+
+
+def generate_key(directory, algorithm='EdDSA', kid=None):
+    """
+    Writes a new private key in a directory, named after the current
+    time by default so that it signs after the existing ones.
+    :Returns: the kid of the key.
+    """
+    if algorithm == 'EdDSA':
+        key = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm == 'RS256':
+        key = rsa.generate_private_key(65537, RSA_KEY_SIZE)
+    else:
+        raise ValueError('algorithm must be EdDSA or RS256.')
+    kid = kid or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    pem = key.private_bytes(serialization.Encoding.PEM,
+                            serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption())
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, kid + KEY_SUFFIX)
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, 'wb') as file:
+        file.write(pem)
+    return kid
+
+
+def init_jwt_keys(app, jwt):
+    """
+    Signs and verifies the tokens of a JWTManager with the key ring of
+    JWT_KEYS_DIR of an app, when it is set.
+    :Returns: the key ring, None if the app keeps HS256.
+    """
+    directory = app.config.get('JWT_KEYS_DIR')
+    if not directory:
+        return None
+    ring = KeyRing.from_directory(directory,
+                                  app.config.get('JWT_SIGNING_KID'))
+    app.config['JWT_ALGORITHM'] = ring.signing.algorithm
+    app.config['JWT_DECODE_ALGORITHMS'] = ring.algorithms
+    app.extensions['jwt_keys'] = ring
+
+    @jwt.encode_key_loader
+    def signing_key(identity):
+        return ring.signing.private_key
+
+    @jwt.additional_headers_loader
+    def key_id_header(identity):
+        return {'kid': ring.signing.kid}
+
+    @jwt.decode_key_loader
+    def verifying_key(jwt_header, jwt_data):
+        return ring.verifying_key(jwt_header.get('kid'))
+    return ring
@@ -0,0 +1,78 @@
+"""
+Python module for the search of the places near a point.
+The geohash cells around the point select the candidates on the
+index, their exact distances are computed in one numpy pass, and
+only the nearest places are loaded.
+"""
+from models.place import Place
+from persistence.geohash import covering_cells, haversine_km, next_prefix
+from persistence.serializer import (expand_tree, projection_for,
+                                    serialize_expanded)
+from sqlalchemy import and_, or_, select
+
+
+def in_cells(cells):
+    """
+    Returns the condition 'the geohash is in one of cells',
+    one index range per cell.
+    """
+    ranges = []
+    for cell in cells:
+        if not cell:
+            return Place.geohash.is_not(None)
+        upper = next_prefix(cell)
+        ranges.append(and_(Place.geohash >= cell, Place.geohash < upper)
+                      if upper else Place.geohash >= cell)
+    return or_(*ranges)
+
+
+def nearby_places(session, latitude, longitude, radius_km, limit,
+                  options=(), fields=None):
+    """
+    Returns the list of (place, distance in km) of the places within
+    radius_km of a point, the nearest first, at most limit of them.
+    :param options: loader options of the places.
+    :param fields: fields to select, rows of their columns are
+    returned instead of the places.
+    """
+    import numpy
+    candidates = session.execute(
+        select(Place.id, Place.latitude, Place.longitude)
+        .where(in_cells(covering_cells(latitude, longitude, radius_km)))
+    ).all()
+    if not candidates:
+        return []
+    ids, latitudes, longitudes = zip(*candidates)
+    distances = haversine_km(latitude, longitude,
+                             numpy.fromiter(latitudes, float, len(ids)),
+                             numpy.fromiter(longitudes, float, len(ids)))
+    within = numpy.flatnonzero(distances <= radius_km)
+    if len(within) > limit:
+        within = within[numpy.argpartition(distances[within], limit)[:limit]]
+    within = within[numpy.argsort(distances[within], kind='stable')]
+
+    nearest = [ids[i] for i in within]
+    selected = (projection_for(Place, fields).select(Place.id) if fields
+                else (Place,))
+    rows = session.execute(select(*selected).where(Place.id.in_(nearest))
+                           .options(*options)).all()
+    places = {place.id: place
+              for place in (row if fields else row[0] for row in rows)}
+    return [(places[ids[i]], float(distances[i])) for i in within
+            if ids[i] in places]
+
+
+def nearby_response_data(results, expand=(), fields=None):
+    """
+    Returns the serialized places of nearby_places, with their distance
+    and their expanded relationships, or only some fields.
+    """
+    if fields:
+        serialize = projection_for(Place, fields).serialize
+    else:
+        tree = expand_tree(expand)
+
+        def serialize(place):
+            return serialize_expanded(place, tree)
+    return [{**serialize(place), "distance_km": round(distance, 3)}
+            for place, distance in results]
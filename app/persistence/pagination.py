@@ -0,0 +1,120 @@
+"""
+Python module for the keyset (cursor) pagination of the collections.
+A page is selected with WHERE (created_at, id) > (last seen values)
+on a matching index, so page N costs the same as page 1.
+"""
+from flask import current_app, request
+from sqlalchemy import DateTime, and_, or_
+import base64
+import datetime
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """
+    Raised on an invalid limit or cursor sent by the client.
+    """
+
+
+def encode_cursor(values):
+    """
+    Returns the opaque cursor of the ordering values of a row.
+    """
+    values = [value.isoformat() if isinstance(value, datetime.datetime)
+              else value for value in values]
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor, columns):
+    """
+    Returns the ordering values held by a cursor.
+    :param columns: ordering columns the cursor was built from.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [datetime.datetime.fromisoformat(value)
+                if isinstance(column.type, DateTime) else value
+                for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor.")
+
+
+def after(columns, values, descending=False):
+    """
+    Returns the condition (columns) > (values), or < when descending,
+    written without row values so that every backend can use the index.
+    """
+    clauses = []
+    for position, column in enumerate(columns):
+        equals = [columns[i] == values[i] for i in range(position)]
+        beyond = (column < values[position] if descending
+                  else column > values[position])
+        clauses.append(and_(*equals, beyond))
+    return or_(*clauses)
+
+
+def ordering(columns, descending=False):
+    """
+    Returns the ORDER BY clauses of columns.
+    """
+    return [column.desc() for column in columns] if descending else columns
+
+
+def default_page_size():
+    """
+    Returns the size of the pages requested without limit: the
+    DEFAULT_PAGE_SIZE of the app, up to MAX_PAGE_SIZE.
+    """
+    size = current_app.config.get('DEFAULT_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def paginate_by_default():
+    """
+    Returns False if the app streams the collections requested without
+    limit and cursor (PAGINATE_BY_DEFAULT), True by default.
+    """
+    return current_app.config.get('PAGINATE_BY_DEFAULT', True)
+
+
+def page_args():
+    """
+    Reads the limit and cursor query parameters.
+    :Returns: (limit, cursor), None if the client sent neither.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        return None
+    if limit is None:
+        return default_page_size(), cursor
+    if not limit.isdigit() or int(limit) < 1:
+        raise PaginationError("limit must be a positive integer.")
+    return min(int(limit), MAX_PAGE_SIZE), cursor
+
+
+def paginate(query, columns, limit, cursor=None, descending=False):
+    """
+    Returns one page of a query ordered by columns.
+    :param columns: ordering columns, the last one unique.
+    :param descending: True to order all the columns descending.
+    :Returns: (rows, next cursor or None on the last page).
+    """
+    if cursor:
+        query = query.filter(after(columns, decode_cursor(cursor, columns),
+                                   descending))
+    rows = query.order_by(*ordering(columns, descending)).limit(
+        limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key)
+                                     for column in columns])
+    return rows, next_cursor
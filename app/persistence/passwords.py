@@ -0,0 +1,139 @@
+"""
+Python module for the hashing and checking of the passwords.
+bcrypt runs in a bounded pool of threads (bcrypt releases the GIL while
+it hashes) instead of the request thread, and at most BCRYPT_MAX_PENDING
+hashes run or wait at once: past that the request fails right away with
+a 503 instead of queueing behind seconds of work. A hash which waited
+more than BCRYPT_MAX_WAIT seconds in the queue is not computed either:
+its request gets the 503, the clients it was for have likely given up.
+The pool has one thread per CPU by default, and BCRYPT_MAX_PENDING is
+above the --threads of the gthread workers of the Dockerfile: under a
+load the CPUs can hash in time, every login is served.
+BCRYPT_LOG_ROUNDS sets the cost of the new hashes, the hashes with a
+lower cost are rehashed on the next successful login.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from flask import jsonify
+from flask_bcrypt import Bcrypt
+import os
+import threading
+import time
+
+DEFAULT_LOG_ROUNDS = 12
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_MAX_PENDING = 16
+DEFAULT_MAX_WAIT = 5.0
+# Seconds the clients should wait before trying again on a 503
+RETRY_AFTER = 1
+
+bcrypt = Bcrypt(None)
+
+
+class HasherBusy(Exception):
+    """
+    Raised when the pool already holds BCRYPT_MAX_PENDING hashes,
+    or when a hash waited more than BCRYPT_MAX_WAIT seconds.
+    """
+
+
+def hash_rounds(password_hash):
+    """
+    Returns the cost of a bcrypt hash ($2b$12$...), None if it isn't one.
+    """
+    parts = (password_hash or '').split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing and checking in a bounded pool of threads,
+    inline in the calling thread when there are no workers.
+    """
+    def __init__(self, rounds=DEFAULT_LOG_ROUNDS, workers=DEFAULT_WORKERS,
+                 max_pending=DEFAULT_MAX_PENDING, max_wait=DEFAULT_MAX_WAIT):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.configure(rounds, workers, max_pending, max_wait)
+
+    def configure(self, rounds=DEFAULT_LOG_ROUNDS, workers=DEFAULT_WORKERS,
+                  max_pending=DEFAULT_MAX_PENDING, max_wait=DEFAULT_MAX_WAIT):
+        """
+        Sets the cost, the number of threads and the queue limits,
+        the hashes running in the previous pool finish in it.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self.rounds = rounds
+            self.workers = workers
+            self.max_pending = max_pending
+            self.max_wait = max_wait
+            self._slots = threading.BoundedSemaphore(max(max_pending, 1))
+            self._executor = (ThreadPoolExecutor(
+                workers, thread_name_prefix='bcrypt') if workers else None)
+
+    def run(self, function, *args):
+        """
+        Runs function in the pool and returns its result.
+        HasherBusy if max_pending calls are already running or waiting,
+        or if the call waited more than max_wait seconds for a thread.
+        """
+        executor, slots = self._executor, self._slots
+        if executor is None:
+            return function(*args)
+        if not slots.acquire(blocking=False):
+            raise HasherBusy("Too many password checks in progress.")
+        deadline = time.monotonic() + self.max_wait
+
+        def queued():
+            if time.monotonic() > deadline:
+                raise HasherBusy("Password checks are too slow right now.")
+            return function(*args)
+        try:
+            return executor.submit(queued).result()
+        finally:
+            slots.release()
+
+    def hash(self, password):
+        """
+        Returns the bcrypt hash of a password, with the current cost.
+        """
+        return self.run(bcrypt.generate_password_hash,
+                        password, self.rounds).decode('utf-8')
+
+    def check(self, password_hash, password):
+        """
+        Returns True if password matches the hash.
+        """
+        return self.run(bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        Returns True if the hash has a lower cost than the current one.
+        """
+        rounds = hash_rounds(password_hash)
+        return rounds is not None and rounds < self.rounds
+
+
+password_hasher = PasswordHasher()
+
+
+def init_password_hasher(app):
+    """
+    Configures the password hasher from BCRYPT_LOG_ROUNDS, BCRYPT_WORKERS,
+    BCRYPT_MAX_PENDING and BCRYPT_MAX_WAIT of an app, and answers
+    HasherBusy with a 503.
+    """
+    password_hasher.configure(
+        app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_LOG_ROUNDS),
+        app.config.get('BCRYPT_WORKERS', DEFAULT_WORKERS),
+        app.config.get('BCRYPT_MAX_PENDING', DEFAULT_MAX_PENDING),
+        app.config.get('BCRYPT_MAX_WAIT', DEFAULT_MAX_WAIT))
+
+    @app.errorhandler(HasherBusy)
+    def busy_response(error):
+        response = jsonify({"Error": str(error)})
+        response.headers['Retry-After'] = str(RETRY_AFTER)
+        return response, 503
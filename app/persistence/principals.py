@@ -0,0 +1,151 @@
+"""
+Python module for the principals of the JWT protected routes: the
+id, the admin flag and the owned place (the first one created) of the
+user of a token, loaded by the user_lookup_loader of flask_jwt_extended
+from a per-worker LRU cache instead of a query on every request.
+The flushes that change users or places invalidate the principals of
+their users, at the flush and again at commit, from the state already
+loaded in the session (the whole cache when it lacks the old host of a
+place). The other workers see the change after PRINCIPAL_CACHE_TTL
+seconds at worst, and so do the bulk Core paths
+(DataManager.update_many/delete_many).
+"""
+from collections import namedtuple
+from config import db
+from flask_jwt_extended import get_current_user
+from flask_jwt_extended.config import config
+from flask_jwt_extended.internal_utils import has_user_lookup
+from models.place import Place
+from models.users import User
+from persistence.cache import LRUCache
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+DEFAULT_PRINCIPAL_CACHE_SIZE = 1024
+DEFAULT_PRINCIPAL_CACHE_TTL = 30.0
+# Session.info key of the users whose principal changed
+STALE_PRINCIPALS = 'stale_principals'
+# Session.info key set when the users are unknown: all are stale
+ALL_PRINCIPALS_STALE = 'all_principals_stale'
+
+Principal = namedtuple('Principal', ['id', 'is_admin', 'place_id'])
+
+
+class PrincipalCache:
+    """
+    LRU cache of the principals by user id.
+    """
+    def __init__(self, maxsize=DEFAULT_PRINCIPAL_CACHE_SIZE,
+                 ttl=DEFAULT_PRINCIPAL_CACHE_TTL):
+        self.configure(maxsize, ttl)
+
+    def configure(self, maxsize=DEFAULT_PRINCIPAL_CACHE_SIZE,
+                  ttl=DEFAULT_PRINCIPAL_CACHE_TTL):
+        """
+        Sets the size limit and the TTL, and empties the cache.
+        """
+        self._cache = LRUCache(maxsize, ttl)
+
+    def get(self, user_id, session):
+        """
+        Returns the principal of a user, None if the user doesn't exist.
+        One query on a miss: the user and its first place together.
+        """
+        principal = self._cache.get(user_id)
+        if principal is not None:
+            return principal
+        place_id = (select(Place.id).where(Place.host_id == User.id)
+                    .order_by(Place.created_at, Place.id).limit(1)
+                    .correlate(User).scalar_subquery())
+        row = session.execute(
+            select(User.id, User.is_admin, place_id)
+            .where(User.id == user_id)).first()
+        if row is None:
+            return None
+        principal = Principal(row[0], bool(row[1]), row[2])
+        self._cache.set(user_id, principal)
+        return principal
+
+    def invalidate(self, user_ids):
+        for user_id in user_ids:
+            self._cache.pop(user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache()
+
+
+def current_principal():
+    """
+    Returns the principal of the token of the request,
+    None when the app has no user_lookup_loader.
+    """
+    if not has_user_lookup():
+        return None
+    return get_current_user()
+
+
+def init_principals(app, jwt):
+    """
+    Configures the principal cache from PRINCIPAL_CACHE_SIZE and
+    PRINCIPAL_CACHE_TTL of an app, and loads the principal of the
+    tokens of a JWTManager from it.
+    """
+    principal_cache.configure(
+        app.config.get('PRINCIPAL_CACHE_SIZE', DEFAULT_PRINCIPAL_CACHE_SIZE),
+        app.config.get('PRINCIPAL_CACHE_TTL', DEFAULT_PRINCIPAL_CACHE_TTL))
+
+    @jwt.user_lookup_loader
+    def load_principal(jwt_header, jwt_data):
+        return principal_cache.get(jwt_data[config.identity_claim_key],
+                                   db.session)
+
+
+@event.listens_for(Session, 'before_flush')
+def _changed_users(session, flush_context, instances):
+    """
+    Keeps the ids of the users whose principal the flush changes,
+    the old host of the places included, from the loaded state only:
+    no query in the middle of the flush. A place whose old host was
+    never loaded makes all the principals stale.
+    """
+    user_ids = set()
+    for entity in [*session.new, *session.dirty, *session.deleted]:
+        if isinstance(entity, User):
+            user_ids.add(entity.id)
+        elif isinstance(entity, Place):
+            history = inspect(entity).attrs.host_id.history
+            user_ids.update(history.sum())
+            old_host_unknown = not (entity in session.new or history.unchanged
+                                    or history.deleted)
+            if old_host_unknown and (history.added
+                                     or entity in session.deleted):
+                session.info[ALL_PRINCIPALS_STALE] = True
+    user_ids.discard(None)
+    if user_ids:
+        session.info.setdefault(STALE_PRINCIPALS, set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_flushed(session, flush_context):
+    if session.info.get(ALL_PRINCIPALS_STALE):
+        principal_cache.clear()
+    principal_cache.invalidate(session.info.get(STALE_PRINCIPALS, ()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    if session.info.pop(ALL_PRINCIPALS_STALE, False):
+        principal_cache.clear()
+    principal_cache.invalidate(session.info.pop(STALE_PRINCIPALS, ()))
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_stale(session, previous_transaction):
+    session.info.pop(STALE_PRINCIPALS, None)
+    session.info.pop(ALL_PRINCIPALS_STALE, None)
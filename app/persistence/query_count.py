@@ -0,0 +1,38 @@
+"""
+Python module counting the SQL statements run by each request,
+reported in the X-Query-Count header of the response.
+The header is added after the other after_request hooks, so that the
+commit of the unit of work counts. The rows of a streamed body are
+fetched after the header is sent: they do not count.
+"""
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context,
+                     executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def query_count():
+    """
+    Returns the number of statements run by the current request.
+    """
+    return g.get('query_count', 0)
+
+
+def init_query_count(app):
+    """
+    Adds the X-Query-Count header to the responses of an app.
+    """
+    def add_query_count(response):
+        response.headers[QUERY_COUNT_HEADER] = str(query_count())
+        return response
+    # The after_request hooks run in the reverse order of their
+    # registration: the first one runs last, whenever it is registered
+    app.after_request_funcs.setdefault(None, []).insert(0, add_query_count)
@@ -0,0 +1,245 @@
+"""
+Python module for the rating aggregates stored on the places:
+review_count, rating_sum, rating_avg and the histogram rating_1..5.
+Each flush that creates, changes or deletes reviews applies the
+differences to their places with one atomic UPDATE per place, in the
+same transaction: no read-modify-write, concurrent reviews can't
+lose a count.
+The bulk updates and deletes of reviews go through the flush too
+(DataManager.maintained_by_flush). The backfill repairs the aggregates
+after the writes made outside the app.
+"""
+from collections import defaultdict
+from models.place import Place
+from models.review import Review
+from persistence.cache import entity_cache
+from persistence.datamanager import maintained_by_flush
+from persistence.versions import bump
+from sqlalchemy import Float, case, cast, event, func, inspect, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+RATINGS = range(1, 6)
+HISTOGRAM_FIELDS = tuple(f'rating_{rating}' for rating in RATINGS)
+# Fields of Place computed from the reviews, never set by the clients
+RATING_FIELDS = ('review_count', 'rating_sum', 'rating_avg',
+                 *HISTOGRAM_FIELDS)
+# Session.info key of the places to expire after the flush
+RATED_PLACES = 'rated_places'
+
+places_table = Place.__table__
+maintained_by_flush(Review)
+
+
+def _add(deltas, place_id, rating, sign):
+    """
+    Adds (sign = 1) or removes (sign = -1) a rating to the deltas of a place.
+    """
+    if place_id is None or rating is None:
+        return
+    delta = deltas[place_id]
+    delta['review_count'] += sign
+    delta['rating_sum'] += sign * rating
+    if rating in RATINGS:
+        delta[f'rating_{rating}'] += sign
+
+
+def _old_value(review, key):
+    history = inspect(review).attrs[key].history
+    return history.deleted[0] if history.deleted else getattr(review, key)
+
+
+def review_deltas(session):
+    """
+    Returns the dict {place id: {field: difference}} of the reviews
+    written by the flush of a session.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for review in session.new:
+        if isinstance(review, Review):
+            _add(deltas, review.place_id, review.rating, 1)
+    for review in session.deleted:
+        if isinstance(review, Review):
+            _add(deltas, _old_value(review, 'place_id'),
+                 _old_value(review, 'rating'), -1)
+    for review in session.dirty:
+        if not isinstance(review, Review) or review in session.deleted:
+            continue
+        attrs = inspect(review).attrs
+        if not (attrs.rating.history.has_changes()
+                or attrs.place_id.history.has_changes()):
+            continue
+        _add(deltas, _old_value(review, 'place_id'),
+             _old_value(review, 'rating'), -1)
+        _add(deltas, review.place_id, review.rating, 1)
+    return {place_id: delta for place_id, delta in deltas.items()
+            if any(delta.values())}
+
+
+def apply_deltas(connection, deltas):
+    """
+    Applies the differences of the aggregates of places, each one
+    with a single UPDATE computed by the database.
+    """
+    c = places_table.c
+    for place_id, delta in deltas.items():
+        count = c.review_count + delta['review_count']
+        total = c.rating_sum + delta['rating_sum']
+        values = {'review_count': count, 'rating_sum': total,
+                  'rating_avg': case((count > 0,
+                                      cast(total, Float) / count),
+                                     else_=0.0)}
+        for field in HISTOGRAM_FIELDS:
+            if delta[field]:
+                values[field] = c[field] + delta[field]
+        connection.execute(update(places_table)
+                           .where(c.id == place_id).values(values))
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_deleted_reviews(session, flush_context, instances):
+    """
+    Loads the rating of the deleted reviews while their rows exist.
+    """
+    for review in session.deleted:
+        if isinstance(review, Review):
+            review.rating, review.place_id
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_aggregates(session, flush_context):
+    deltas = review_deltas(session)
+    if not deltas:
+        return
+    apply_deltas(session.connection(), deltas)
+    entity_cache.invalidate(Place, list(deltas), session)
+    bump(session, [Place.__tablename__])
+    session.info.setdefault(RATED_PLACES, set()).update(deltas)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_rated_places(session, flush_context):
+    """
+    Expires the aggregates of the places in the session,
+    they are read again from the database.
+    """
+    for place_id in session.info.pop(RATED_PLACES, ()):
+        place = session.identity_map.get(identity_key(Place, place_id))
+        if place is not None and place not in session.deleted:
+            session.expire(place, RATING_FIELDS)
+
+
+def expected_aggregates(session, place_ids):
+    """
+    Returns the dict {place id: aggregates} of places,
+    computed from their reviews.
+    """
+    aggregates = {place_id: dict.fromkeys(RATING_FIELDS, 0)
+                  for place_id in place_ids}
+    rows = session.execute(
+        select(Review.place_id, Review.rating, func.count())
+        .where(Review.place_id.in_(place_ids))
+        .group_by(Review.place_id, Review.rating))
+    for place_id, rating, count in rows:
+        values = aggregates[place_id]
+        values['review_count'] += count
+        values['rating_sum'] += rating * count
+        if rating in RATINGS:
+            values[f'rating_{rating}'] += count
+    for values in aggregates.values():
+        values['rating_avg'] = (values['rating_sum'] / values['review_count']
+                                if values['review_count'] else 0.0)
+    return aggregates
+
+
+def place_batches(session, batch_size):
+    """
+    Yields the ids of all the places, batch_size at a time,
+    in the order of the primary key.
+    """
+    last_id = None
+    while True:
+        query = select(Place.id).order_by(Place.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(Place.id > last_id)
+        ids = session.scalars(query).all()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def stored_aggregates(session, place_ids):
+    """
+    Returns the dict {place id: aggregates} stored on places.
+    """
+    columns = [getattr(Place, field) for field in RATING_FIELDS]
+    rows = session.execute(select(Place.id, *columns)
+                           .where(Place.id.in_(place_ids)))
+    return {row[0]: dict(zip(RATING_FIELDS, row[1:])) for row in rows}
+
+
+def recomputed_values():
+    """
+    Returns the values of the aggregates of a place as correlated
+    subqueries on its reviews.
+    """
+    reviews = Review.__table__
+    c = places_table.c
+
+    def aggregate(expression):
+        return (select(func.coalesce(expression, 0))
+                .where(reviews.c.place_id == c.id).scalar_subquery())
+
+    count = aggregate(func.count())
+    total = aggregate(func.sum(reviews.c.rating))
+    values = {'review_count': count, 'rating_sum': total,
+              'rating_avg': case((count > 0, cast(total, Float) / count),
+                                 else_=0.0)}
+    for rating, field in zip(RATINGS, HISTOGRAM_FIELDS):
+        values[field] = aggregate(func.sum(
+            case((reviews.c.rating == rating, 1), else_=0)))
+    return values
+
+
+def backfill(session, batch_size=500):
+    """
+    Recomputes the aggregates of every place from its reviews,
+    one UPDATE and one transaction per batch of places.
+    The database computes the values in the UPDATE itself, so the
+    reviews written meanwhile are not lost.
+    :Returns: number of places updated.
+    """
+    values = recomputed_values()
+    updated = 0
+    for ids in place_batches(session, batch_size):
+        try:
+            session.execute(update(places_table)
+                            .where(places_table.c.id.in_(ids))
+                            .values(values))
+            entity_cache.invalidate(Place, ids, session)
+            bump(session, [Place.__tablename__])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        updated += len(ids)
+    return updated
+
+
+def check(session, batch_size=500):
+    """
+    Compares the stored aggregates of every place with its reviews.
+    :Returns: list of (place id, stored aggregates, expected aggregates)
+    of the places that differ.
+    """
+    mismatches = []
+    for ids in place_batches(session, batch_size):
+        stored = stored_aggregates(session, ids)
+        for place_id, expected in expected_aggregates(session, ids).items():
+            values = stored[place_id]
+            if any(abs(values[field] - expected[field]) > 1e-9
+                   for field in RATING_FIELDS):
+                mismatches.append((place_id, values, expected))
+        session.rollback()
+    return mismatches
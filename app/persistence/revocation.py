@@ -0,0 +1,223 @@
+"""
+Python module for the revocation of the tokens.
+The jti of the revoked tokens are rows of revoked_tokens, and each
+worker keeps a Bloom filter of the unexpired ones: a token whose jti
+isn't in the filter is not revoked, without any query. Only the hits
+(the revoked tokens, and about REVOCATION_ERROR_RATE of the others)
+are checked against the table.
+Every REVOCATION_REFRESH seconds a worker adds the tokens the other
+workers revoked since, so a revocation takes effect there after that
+delay at worst. The filter is rebuilt from the table when it holds
+more jti than its capacity.
+"""
+from config import db
+from datetime import datetime, timedelta, timezone
+from models.revoked_token import RevokedToken
+from persistence.unit_of_work import stage
+from sqlalchemy import delete, select
+import hashlib
+import math
+import threading
+import time
+import uuid
+
+DEFAULT_CAPACITY = 10000
+DEFAULT_ERROR_RATE = 0.001
+DEFAULT_REFRESH = 5.0
+# Rows revoked up to this long before the last refresh are read again:
+# their transaction may have committed after it
+REFRESH_OVERLAP = timedelta(seconds=10)
+
+
+def utcnow():
+    """
+    Returns the naive UTC datetime of the timestamps columns.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class BloomFilter:
+    """
+    Bloom filter of strings, size bits and hashes probes per string.
+    """
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate)
+                                     / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(value))
+
+
+def canonical_jti(jti):
+    """
+    Returns the canonical text of a jti, None if it is not a UUID.
+    """
+    try:
+        return str(uuid.UUID(jti))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+class RevocationList:
+    """
+    Bloom filter of the revoked jti of this worker,
+    refreshed from revoked_tokens.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY,
+                 error_rate=DEFAULT_ERROR_RATE, refresh=DEFAULT_REFRESH,
+                 clock=time.monotonic):
+        self._lock = threading.Lock()
+        self.configure(capacity, error_rate, refresh, clock)
+
+    def configure(self, capacity=DEFAULT_CAPACITY,
+                  error_rate=DEFAULT_ERROR_RATE, refresh=DEFAULT_REFRESH,
+                  clock=time.monotonic):
+        """
+        Sets the size of the filter and the refresh delay,
+        the filter is built again on the next check.
+        """
+        with self._lock:
+            self.capacity = capacity
+            self.error_rate = error_rate
+            self.refresh = refresh
+            self._clock = clock
+            self._filter = None
+            self._refreshed_at = None
+            self._synced_to = None
+            self.checks = 0
+            self.lookups = 0
+            self.revoked = 0
+
+    def _rebuild(self, session):
+        now = utcnow()
+        jtis = session.scalars(select(RevokedToken.jti)
+                               .where(RevokedToken.expires_at > now)).all()
+        capacity = self.capacity
+        while capacity < 2 * len(jtis):
+            capacity *= 2
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self._filter = bloom
+        self._synced_to = now
+
+    def _sync(self, session):
+        """
+        Builds the filter, or adds the jti revoked since the last refresh.
+        """
+        now = self._clock()
+        if (self._filter is not None and self._refreshed_at is not None
+                and now - self._refreshed_at < self.refresh):
+            return
+        with self._lock:
+            if self._filter is None or self._filter.count > \
+                    self._filter.capacity:
+                self._rebuild(session)
+            else:
+                synced_to = utcnow()
+                jtis = session.scalars(
+                    select(RevokedToken.jti).where(
+                        RevokedToken.revoked_at
+                        >= self._synced_to - REFRESH_OVERLAP,
+                        RevokedToken.expires_at > synced_to)).all()
+                for jti in jtis:
+                    if jti not in self._filter:
+                        self._filter.add(jti)
+                self._synced_to = synced_to
+            self._refreshed_at = now
+
+    def is_revoked(self, jti, session):
+        """
+        Returns True if the token of jti is revoked,
+        querying revoked_tokens only when the filter holds jti.
+        """
+        jti = canonical_jti(jti)
+        if jti is None:
+            return True
+        self._sync(session)
+        self.checks += 1
+        if jti not in self._filter:
+            return False
+        self.lookups += 1
+        found = session.get(RevokedToken, jti) is not None
+        self.revoked += found
+        return found
+
+    def revoke(self, session, jwt_data):
+        """
+        Revokes the token of decoded claims, for every worker once the
+        unit of work is committed.
+        """
+        jti = canonical_jti(jwt_data['jti'])
+        if session.get(RevokedToken, jti) is None:
+            session.add(RevokedToken(
+                jti=jti, user_id=jwt_data.get('sub'),
+                token_type=jwt_data.get('type', 'access'),
+                expires_at=datetime.fromtimestamp(
+                    jwt_data['exp'], timezone.utc).replace(tzinfo=None),
+                # The clock the refreshes compare with, not the database's
+                revoked_at=utcnow()))
+            stage(session)
+        self._sync(session)
+        with self._lock:
+            if jti not in self._filter:
+                self._filter.add(jti)
+
+    def prune(self, session):
+        """
+        Deletes the rows of the expired tokens.
+        :Returns: number of rows deleted.
+        """
+        deleted = session.execute(delete(RevokedToken).where(
+            RevokedToken.expires_at <= utcnow())).rowcount
+        session.commit()
+        return deleted
+
+    def stats(self):
+        """
+        Returns the size of the filter and the checks counters:
+        lookups - revoked checks were false positives.
+        """
+        bloom = self._filter
+        return {"capacity": bloom.capacity if bloom else self.capacity,
+                "jtis": bloom.count if bloom else 0,
+                "bits": bloom.size if bloom else 0,
+                "checks": self.checks,
+                "lookups": self.lookups,
+                "revoked": self.revoked,
+                "false_positives": self.lookups - self.revoked}
+
+
+revocation_list = RevocationList()
+
+
+def init_revocation(app, jwt):
+    """
+    Configures the revocation list from REVOCATION_CAPACITY,
+    REVOCATION_ERROR_RATE and REVOCATION_REFRESH of an app,
+    and checks the tokens of a JWTManager against it.
+    """
+    revocation_list.configure(
+        app.config.get('REVOCATION_CAPACITY', DEFAULT_CAPACITY),
+        app.config.get('REVOCATION_ERROR_RATE', DEFAULT_ERROR_RATE),
+        app.config.get('REVOCATION_REFRESH', DEFAULT_REFRESH))
+
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_data):
+        return revocation_list.is_revoked(jwt_data.get('jti'), db.session)
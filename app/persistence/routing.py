@@ -0,0 +1,131 @@
+"""
+Python module for the routing of the reads to the read replicas
+listed in REPLICA_URIS.
+The queries of GET requests go to a replica, unless the request
+forced the primary or already wrote something: writes and
+read-after-write always stay on the primary.
+"""
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from functools import wraps
+from persistence.engine import engine_options
+from sqlalchemy import create_engine, event
+import itertools
+import threading
+
+READ_METHODS = ('GET', 'HEAD')
+# Header a client sends to read its own writes from the primary
+PRIMARY_HEADER = 'X-Read-Primary'
+
+
+def replica_uris(uris):
+    """
+    Returns the list of the replica uris of a comma separated string.
+    """
+    return [uri.strip() for uri in uris.split(',') if uri.strip()]
+
+
+class ReplicaRouter:
+    """
+    Holds the replica engines and chooses the one of a read,
+    round-robin or least-connections.
+    """
+    def __init__(self, engines, strategy='round_robin'):
+        if strategy not in ('round_robin', 'least_connections'):
+            raise ValueError(f"Unknown replica selection: {strategy}")
+        self.engines = list(engines)
+        self.strategy = strategy
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """
+        Returns one of the replica engines, None if there is none.
+        """
+        if not self.engines:
+            return None
+        if self.strategy == 'least_connections':
+            return min(self.engines, key=checked_out)
+        with self._lock:
+            return self.engines[next(self._counter) % len(self.engines)]
+
+
+def checked_out(engine):
+    """
+    Returns the number of connections of an engine in use.
+    """
+    checkedout = getattr(engine.pool, 'checkedout', None)
+    return checkedout() if checkedout else 0
+
+
+def init_replicas(app):
+    """
+    Creates the replica engines of an app, from its REPLICA_URIS,
+    and registers their router.
+    """
+    engines = [create_engine(uri, **engine_options(uri))
+               for uri in app.config.get('REPLICA_URIS', [])]
+    app.extensions['replica_router'] = ReplicaRouter(
+        engines, app.config.get('REPLICA_SELECTION', 'round_robin'))
+
+
+def replica_engines():
+    """
+    Returns the replica engines of the current app.
+    """
+    router = current_app.extensions.get('replica_router')
+    return router.engines if router else []
+
+
+def use_primary():
+    """
+    Forces the reads of the current request to the primary.
+    """
+    g.use_primary = True
+
+
+def primary(view):
+    """
+    Decorator forcing the reads of a route to the primary.
+    """
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        use_primary()
+        return view(*args, **kwargs)
+    return decorated
+
+
+def reads_from_replica(session):
+    """
+    Returns True if the reads of a session may go to a replica.
+    """
+    return (has_request_context()
+            and request.method in READ_METHODS
+            and not session.info.get('wrote')
+            and not g.get('use_primary')
+            and not request.headers.get(PRIMARY_HEADER))
+
+
+class RoutingSession(Session):
+    """
+    Flask-SQLAlchemy session sending the reads to a replica when allowed.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            if clause is not None and getattr(clause, 'is_dml', False):
+                self.info['wrote'] = True
+            elif reads_from_replica(self):
+                router = current_app.extensions.get('replica_router')
+                engine = router and router.choose()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind,
+                                **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    """
+    Keeps the next reads of a session that wrote on the primary.
+    """
+    session.info['wrote'] = True
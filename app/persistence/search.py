@@ -0,0 +1,179 @@
+"""
+Python module for the full-text search of the places, over their
+name, address and description, ranked in that order of weight.
+SQLite uses an FTS5 table kept in sync by triggers, Postgres a
+generated tsvector column with a GIN index: every write of the places
+updates the index, DataManager's bulk paths included.
+Each word of the query matches as a prefix, and all of them must match.
+"""
+from models.place import Place
+from persistence.pagination import after, decode_cursor, encode_cursor
+from persistence.serializer import projection_for
+from sqlalchemy import column, event, func, literal_column, select, table
+import re
+
+# Longest query, in words
+MAX_SEARCH_WORDS = 10
+
+SQLITE_CREATE = (
+    # FTS5 rowids are mapped to the place ids: the rowids of places
+    # have no INTEGER PRIMARY KEY and may change on VACUUM
+    """CREATE TABLE places_search_ids (
+        rowid INTEGER PRIMARY KEY,
+        place_id BLOB NOT NULL UNIQUE)""",
+    """CREATE VIRTUAL TABLE places_fts USING fts5(
+        name, description, address,
+        tokenize = 'unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER places_search_insert AFTER INSERT ON places BEGIN
+        INSERT INTO places_search_ids (place_id) VALUES (new.id);
+        INSERT INTO places_fts (rowid, name, description, address)
+        VALUES (last_insert_rowid(), new.name, new.description,
+                new.address);
+    END""",
+    """CREATE TRIGGER places_search_update
+    AFTER UPDATE OF name, description, address ON places BEGIN
+        UPDATE places_fts SET name = new.name,
+            description = new.description, address = new.address
+        WHERE rowid = (SELECT rowid FROM places_search_ids
+                       WHERE place_id = old.id);
+    END""",
+    """CREATE TRIGGER places_search_delete AFTER DELETE ON places BEGIN
+        DELETE FROM places_fts WHERE rowid = (
+            SELECT rowid FROM places_search_ids WHERE place_id = old.id);
+        DELETE FROM places_search_ids WHERE place_id = old.id;
+    END""",
+)
+SQLITE_FILL = (
+    "INSERT INTO places_search_ids (place_id) SELECT id FROM places",
+    """INSERT INTO places_fts (rowid, name, description, address)
+    SELECT places_search_ids.rowid, name, description, address
+    FROM places JOIN places_search_ids
+    ON places_search_ids.place_id = places.id""",
+)
+SQLITE_DROP = (
+    "DROP TRIGGER IF EXISTS places_search_insert",
+    "DROP TRIGGER IF EXISTS places_search_update",
+    "DROP TRIGGER IF EXISTS places_search_delete",
+    "DROP TABLE IF EXISTS places_fts",
+    "DROP TABLE IF EXISTS places_search_ids",
+)
+POSTGRES_CREATE = (
+    # 'simple' configuration: no stemming, the prefixes match any language
+    """ALTER TABLE places ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(address, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX ix_places_search_vector ON places USING GIN (search_vector)",
+)
+POSTGRES_DROP = (
+    "DROP INDEX IF EXISTS ix_places_search_vector",
+    "ALTER TABLE places DROP COLUMN IF EXISTS search_vector",
+)
+
+places_fts = table('places_fts', column('rowid'))
+search_ids = table('places_search_ids', column('rowid'), column('place_id'))
+search_vector = literal_column('places.search_vector')
+
+
+class SearchError(ValueError):
+    """
+    Raised on a query without any word to search.
+    """
+
+
+def create_search_index(connection, fill=False):
+    """
+    Creates the full-text index of the places.
+    :param fill: True to index the existing places (SQLite, Postgres
+    computes the generated column by itself).
+    """
+    dialect = connection.dialect.name
+    statements = {'sqlite': SQLITE_CREATE + (SQLITE_FILL if fill else ()),
+                  'postgresql': POSTGRES_CREATE}.get(dialect, ())
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def drop_search_index(connection):
+    """
+    Drops the full-text index of the places.
+    """
+    statements = {'sqlite': SQLITE_DROP,
+                  'postgresql': POSTGRES_DROP}.get(connection.dialect.name, ())
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Place.__table__, 'after_create')
+def _create_with_places(target, connection, **kwargs):
+    create_search_index(connection)
+
+
+@event.listens_for(Place.__table__, 'before_drop')
+def _drop_with_places(target, connection, **kwargs):
+    drop_search_index(connection)
+
+
+def search_words(query):
+    """
+    Returns the words of a search query, SearchError if there is none.
+    """
+    words = re.findall(r'\w+', query or '')[:MAX_SEARCH_WORDS]
+    if not words:
+        raise SearchError("q must hold at least one word.")
+    return [word.lower() for word in words]
+
+
+def ranked_ids(dialect, words):
+    """
+    Returns the subquery (place_id, rank) of the places matching all
+    the words, the best matches with the lowest rank.
+    """
+    if dialect == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        return (select(search_ids.c.place_id.label('place_id'),
+                       func.bm25(literal_column('places_fts'),
+                                 10.0, 1.0, 5.0).label('rank'))
+                .select_from(places_fts.join(
+                    search_ids, search_ids.c.rowid == places_fts.c.rowid))
+                .where(literal_column('places_fts').op('MATCH')(match))
+                .subquery())
+    tsquery = func.to_tsquery('simple',
+                              ' & '.join(f'{word}:*' for word in words))
+    return (select(Place.id.label('place_id'),
+                   (-func.ts_rank_cd(search_vector, tsquery)).label('rank'))
+            .where(search_vector.op('@@')(tsquery))
+            .subquery())
+
+
+def search_places(session, query, limit, cursor=None, options=(),
+                  fields=None):
+    """
+    Returns one page of the places matching a search query,
+    the best ranked first.
+    :param options: loader options of the places.
+    :param fields: fields to select, rows of their columns are
+    returned instead of the places.
+    :Returns: (places, next cursor or None on the last page).
+    """
+    dialect = session.get_bind().dialect.name
+    ranked = ranked_ids(dialect, search_words(query))
+    columns = [ranked.c.rank, Place.id]
+    selected = (projection_for(Place, fields).select(Place.id) if fields
+                else (Place,))
+    statement = (select(*selected, ranked.c.rank)
+                 .join(ranked, ranked.c.place_id == Place.id)
+                 .options(*options))
+    if cursor:
+        statement = statement.where(
+            after(columns, decode_cursor(cursor, columns)))
+    rows = session.execute(statement.order_by(*columns)
+                           .limit(limit + 1)).all()
+    places = [row if fields else row[0] for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor([rows[limit - 1].rank,
+                                     places[-1].id])
+    return places, next_cursor
@@ -0,0 +1,321 @@
+"""
+Python module for the serializers of the models.
+A serializer is built once per model class from its mapped columns,
+so reading a row doesn't walk its __dict__ anymore.
+"""
+from flask import Response, jsonify, request, stream_with_context
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter
+from persistence.pagination import (PaginationError, default_page_size,
+                                    ordering, page_args, paginate,
+                                    paginate_by_default)
+from sqlalchemy import Date, DateTime, inspect, select
+import json
+
+# Fields never sent to the clients
+EXCLUDED_FIELDS = frozenset({'password_hash', 'bit', 'amenity_mask'})
+# Only fields of the entities of a table embedded by ?expand: the
+# expanding routes are public, a user is only shown by its first name
+EXPANDED_FIELDS = {'users': ('id', 'first_name')}
+
+# Rows fetched from the database per round trip when streaming
+STREAM_CHUNK_SIZE = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# C accelerated encoder: no indent, no key sorting
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+_serializers = {}
+_expanded_serializers = {}
+
+
+class FieldsError(ValueError):
+    """
+    Raised on an invalid fields parameter sent by the client.
+    """
+
+
+class Serializer:
+    """
+    Serializer of a model class, with its field lists precomputed.
+    """
+    def __init__(self, model, exclude=EXCLUDED_FIELDS):
+        self.model = model
+        columns = [attr for attr in inspect(model).column_attrs
+                   if attr.key not in exclude]
+        self.fields = tuple(attr.key for attr in columns)
+        self.datetime_fields = tuple(
+            attr.key for attr in columns
+            if isinstance(attr.columns[0].type, (Date, DateTime)))
+        getter = attrgetter(*self.fields)
+        if len(self.fields) == 1:
+            self._load = lambda entity: (getter(entity),)
+        else:
+            self._load = getter
+
+    def serialize(self, entity):
+        """
+        Returns a dict of the fields of an entity, datetimes in isoformat.
+        Loaded values are read from the instance dict, the attributes
+        only go through the ORM when some of them are expired.
+        """
+        values = entity.__dict__
+        try:
+            result = {key: values[key] for key in self.fields}
+        except KeyError:
+            result = dict(zip(self.fields, self._load(entity)))
+        for key in self.datetime_fields:
+            value = result[key]
+            if value is not None:
+                result[key] = value.isoformat()
+        return result
+
+    def serialize_many(self, entities):
+        """
+        Returns the list of the serialized entities.
+        """
+        serialize = self.serialize
+        return [serialize(entity) for entity in entities]
+
+    def response(self, entities, status=200):
+        """
+        Returns a JSON response of the serialized entities.
+        """
+        return json_response(self.serialize_many(entities), status)
+
+    def stream(self, query, status=200, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Returns a response streaming the rows of a query, fetched and
+        encoded chunk_size rows at a time, so memory doesn't grow with
+        the table: a JSON array, or one JSON document per line when the
+        client accepts application/x-ndjson.
+        :Returns: the response, None if the query has no row.
+        """
+        rows = iter(query.yield_per(chunk_size))
+        first = next(rows, None)
+        if first is None:
+            return None
+        ndjson = wants_ndjson()
+        serialize = self.serialize
+        encode = _encoder.encode
+
+        def generate():
+            chunk = [first, *islice(rows, chunk_size - 1)]
+            separator = '\n' if ndjson else ','
+            yield '' if ndjson else '['
+            while chunk:
+                yield separator.join(encode(serialize(row)) for row in chunk)
+                chunk = list(islice(rows, chunk_size))
+                if chunk or ndjson:
+                    yield separator
+            if not ndjson:
+                yield ']'
+
+        mimetype = NDJSON_MIMETYPE if ndjson else 'application/json'
+        return Response(stream_with_context(generate()), status=status,
+                        mimetype=mimetype)
+
+
+class Projection(Serializer):
+    """
+    Serializer of some fields of a model, read from rows that only
+    hold their columns: no entity is built for them.
+    """
+    def __init__(self, model, fields):
+        super().__init__(model)
+        self.fields = tuple(fields)
+        self.datetime_fields = tuple(key for key in self.datetime_fields
+                                     if key in self.fields)
+        self.columns = tuple(getattr(model, key) for key in self.fields)
+
+    def serialize(self, row):
+        """
+        Returns a dict of the fields of a row, datetimes in isoformat.
+        """
+        values = row._mapping
+        result = {key: values[key] for key in self.fields}
+        for key in self.datetime_fields:
+            value = result[key]
+            if value is not None:
+                result[key] = value.isoformat()
+        return result
+
+    def select(self, *columns):
+        """
+        Returns the columns of the fields, and those of columns
+        the rows also need (ordering, ids) which are not fields.
+        """
+        return (*self.columns, *(column for column in columns
+                                 if column.key not in self.fields))
+
+
+def serializer_for(model):
+    """
+    Returns the serializer of a model class, built on first use.
+    """
+    serializer = _serializers.get(model)
+    if serializer is None:
+        serializer = _serializers[model] = Serializer(model)
+    return serializer
+
+
+def expanded_serializer_for(model):
+    """
+    Returns the serializer of a model class embedded by ?expand,
+    limited to its EXPANDED_FIELDS.
+    """
+    serializer = _expanded_serializers.get(model)
+    if serializer is None:
+        fields = EXPANDED_FIELDS.get(model.__tablename__)
+        if fields is None:
+            serializer = serializer_for(model)
+        else:
+            serializer = Serializer(model, exclude=EXCLUDED_FIELDS | {
+                attr.key for attr in inspect(model).column_attrs
+                if attr.key not in fields})
+        _expanded_serializers[model] = serializer
+    return serializer
+
+
+@lru_cache(maxsize=256)
+def projection_for(model, fields):
+    """
+    Returns the serializer of a tuple of fields of a model class.
+    """
+    return Projection(model, fields)
+
+
+def requested_fields(model, expand=()):
+    """
+    Reads the fields query parameter, names separated by commas.
+    :param expand: expanded relationships, which need whole entities.
+    :Returns: the tuple of the fields to send, None if the client
+    sent none.
+    """
+    value = request.args.get('fields')
+    if value is None:
+        return None
+    allowed = serializer_for(model).fields
+    fields = tuple(dict.fromkeys(
+        key for key in (key.strip() for key in value.split(',')) if key))
+    if not fields or any(key not in allowed for key in fields):
+        raise FieldsError(f"fields must be among {', '.join(allowed)}.")
+    if expand:
+        raise FieldsError("fields can't be combined with expand.")
+    return fields
+
+
+def projected_entity(model, id, session, fields):
+    """
+    Returns the dict of some fields of the entity of a model by id,
+    selecting only their columns, None if not found.
+    """
+    projection = projection_for(model, fields)
+    row = session.execute(select(*projection.columns)
+                          .where(model.id == id)).first()
+    return None if row is None else projection.serialize(row)
+
+
+def expand_tree(paths):
+    """
+    Returns the nested dict {relationship: {nested relationship: ...}}.
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        for name in path.split("."):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def serialize_expanded(entity, tree, serializer=None):
+    """
+    Returns the serialized entity, with its expanded relationships
+    serialized with their EXPANDED_FIELDS.
+    """
+    serializer = serializer or serializer_for(type(entity))
+    data = serializer.serialize(entity)
+    for name, nested in tree.items():
+        value = getattr(entity, name)
+        if value is None:
+            data[name] = None
+        elif isinstance(value, list):
+            data[name] = [serialize_expanded(
+                item, nested, expanded_serializer_for(type(item)))
+                for item in value]
+        else:
+            data[name] = serialize_expanded(
+                value, nested, expanded_serializer_for(type(value)))
+    return data
+
+
+def collection_response(query, model, status=200, columns=None,
+                        descending=False, extra=None, expand=()):
+    """
+    Returns the response of a collection endpoint, ordered by
+    (created_at, id) or columns: one page {"items", "next_cursor"} when
+    the client sends limit or cursor or by default, the whole
+    collection streamed when the app sets PAGINATE_BY_DEFAULT to False.
+    :param columns: ordering columns, the last one unique.
+    :param extra: dict of fields added to the page, the collection
+    is then always paginated.
+    :param expand: relationships serialized in each entity, loaded by
+    the options of the query (see persistence.expand): the collection
+    is then always paginated too.
+    The fields query parameter selects only the columns of some fields.
+    :Returns: the response, None if the collection is empty.
+    """
+    serializer = serializer_for(model)
+    serialize_many = serializer.serialize_many
+    if expand:
+        tree = expand_tree(expand)
+
+        def serialize_many(rows):
+            return [serialize_expanded(row, tree) for row in rows]
+    columns = columns or (model.created_at, model.id)
+    try:
+        fields = requested_fields(model, expand)
+        if fields:
+            serializer = projection_for(model, fields)
+            serialize_many = serializer.serialize_many
+            query = query.with_entities(*serializer.select(*columns))
+        page = page_args()
+        if page is None and (extra is not None or expand
+                             or paginate_by_default()):
+            page = default_page_size(), None
+        if page is None:
+            return serializer.stream(
+                query.order_by(*ordering(columns, descending)), status)
+        limit, cursor = page
+        rows, next_cursor = paginate(query, columns, limit, cursor,
+                                     descending)
+    except (FieldsError, PaginationError) as e:
+        return jsonify({"Error": str(e)}), 400
+    if not rows and not cursor:
+        return None
+    return json_response({"items": serialize_many(rows),
+                          "next_cursor": next_cursor, **(extra or {})},
+                         status)
+
+
+def wants_ndjson():
+    """
+    Returns True if the client prefers NDJSON over a JSON array.
+    """
+    return request.accept_mimetypes.best_match(
+        ['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def dumps(data):
+    """
+    Encodes data in compact JSON.
+    """
+    return _encoder.encode(data)
+
+
+def json_response(data, status=200):
+    """
+    Returns a JSON response without going through jsonify.
+    """
+    return Response(dumps(data), status=status, mimetype='application/json')
@@ -0,0 +1,99 @@
+"""
+Python module for the startup time of the application.
+A fresh interpreter imports app and runs create_app(), as a worker
+does at boot: once to time it against STARTUP_TIME_BUDGET, once under
+python -X importtime, which reports the time spent in each import.
+The heavy dependencies are imported on first use, not at boot, and
+this report is how a new eager import shows up.
+"""
+from collections import namedtuple
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET = 2.0
+# Directory of app.py, where the child interpreter runs
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Run by the child: prints the seconds of the imports and of create_app
+BOOT_SCRIPT = '''
+import time
+start = time.perf_counter()
+from app import create_app
+create_app()
+print(time.perf_counter() - start)
+'''
+
+# Times of an import, without (self) and with its own imports
+ImportTime = namedtuple('ImportTime',
+                        ['module', 'self_ms', 'cumulative_ms', 'depth'])
+# Self times of the modules of a package, or of a module of the app
+ImportGroup = namedtuple('ImportGroup', ['name', 'self_ms', 'modules'])
+
+
+def _boot(env=None, importtime=False):
+    options = ['-X', 'importtime'] if importtime else []
+    result = subprocess.run([sys.executable, *options, '-c', BOOT_SCRIPT],
+                            cwd=APP_DIR, env=env, capture_output=True,
+                            text=True)
+    if result.returncode:
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError('create_app() failed: '
+                           + (lines[-1] if lines else 'no output'))
+    return result
+
+
+def startup_time(env=None):
+    """
+    Returns the seconds a fresh interpreter takes to import app and
+    run create_app().
+    :param env: environment of the interpreter, this one by default.
+    """
+    return float(_boot(env).stdout.split()[-1])
+
+
+def parse_importtime(output):
+    """
+    Returns the list of ImportTime of the output of -X importtime,
+    in the order it reports them: the imports before their importer.
+    """
+    imports = []
+    for line in output.splitlines():
+        fields = line.partition('import time:')[2].split('|')
+        # Skips the header and the other lines of stderr
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        imports.append(ImportTime(
+            name.strip(), int(fields[0]) / 1000, int(fields[1]) / 1000,
+            (len(name) - len(name.lstrip()) - 1) // 2))
+    return imports
+
+
+def import_times(env=None):
+    """
+    Returns the list of ImportTime of the imports of a fresh
+    interpreter running create_app().
+    """
+    return parse_importtime(_boot(env, importtime=True).stderr)
+
+
+def _is_local(package):
+    return (os.path.isdir(os.path.join(APP_DIR, package))
+            or os.path.isfile(os.path.join(APP_DIR, package + '.py')))
+
+
+def import_breakdown(imports):
+    """
+    Returns the list of ImportGroup of imports, the slowest first:
+    one per module of the app, one per dependency with the self times
+    of all its modules.
+    """
+    groups = {}
+    for record in imports:
+        package = record.module.partition('.')[0]
+        name = record.module if _is_local(package) else package
+        self_ms, modules = groups.get(name, (0.0, 0))
+        groups[name] = (self_ms + record.self_ms, modules + 1)
+    return sorted((ImportGroup(name, self_ms, modules)
+                   for name, (self_ms, modules) in groups.items()),
+                  key=lambda group: group.self_ms, reverse=True)
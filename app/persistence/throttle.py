@@ -0,0 +1,208 @@
+"""
+Python module for the throttling of the logins: a token bucket per
+email and one per client IP, refilled continuously, one token taken
+by each attempt. The buckets live in a small SQLite file shared by
+all the gunicorn workers of a host, each check is one short
+BEGIN IMMEDIATE transaction on it: the workers can't both spend the
+last token of a bucket.
+A rejected attempt answers 429 before any query or bcrypt check.
+"""
+from flask import jsonify
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_EMAIL_BURST = 5
+DEFAULT_EMAIL_PER_MINUTE = 5
+DEFAULT_IP_BURST = 20
+DEFAULT_IP_PER_MINUTE = 60
+# Checks between two deletions of the full buckets, per process
+PRUNE_EVERY = 1000
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS buckets (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated REAL NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS rejections (
+        kind TEXT PRIMARY KEY,
+        count INTEGER NOT NULL)""",
+)
+
+
+class Limit:
+    """
+    A bucket of burst tokens, refilled with per_minute tokens a minute.
+    """
+    def __init__(self, kind, burst, per_minute):
+        self.kind = kind
+        self.burst = float(burst)
+        self.rate = per_minute / 60.0
+
+    def full_after(self):
+        """
+        Returns the seconds an empty bucket takes to be full again.
+        """
+        return self.burst / self.rate
+
+
+class BucketStore:
+    """
+    Token buckets stored in a SQLite file, one connection
+    per thread and per process.
+    """
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._local = threading.local()
+        self._checks = 0
+        connection = self._connect()
+        try:
+            for statement in SCHEMA:
+                connection.execute(statement)
+        finally:
+            connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5,
+                                     isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # Forked workers open their own connection
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def take(self, key, limit):
+        """
+        Takes a token from the bucket of key.
+        :Returns: 0 if there was one, else the seconds before the next
+        token, and the rejection is counted.
+        """
+        now = self._clock()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, updated FROM buckets WHERE key = ?',
+                (key,)).fetchone()
+            tokens = limit.burst
+            if row is not None:
+                tokens = min(limit.burst,
+                             row[0] + max(now - row[1], 0) * limit.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / limit.rate
+                connection.execute(
+                    'INSERT INTO rejections (kind, count) VALUES (?, 1) '
+                    'ON CONFLICT (kind) DO UPDATE SET count = count + 1',
+                    (limit.kind,))
+            connection.execute(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated) '
+                'VALUES (?, ?, ?)', (key, tokens, now))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._checks += 1
+        if self._checks % PRUNE_EVERY == 0:
+            self.prune(limit)
+        return wait
+
+    def prune(self, limit):
+        """
+        Deletes the buckets of a limit which are full again.
+        """
+        self._connection().execute(
+            'DELETE FROM buckets WHERE key LIKE ? AND updated < ?',
+            (f'{limit.kind}:%', self._clock() - limit.full_after()))
+
+    def rejections(self):
+        """
+        Returns the dict {kind: rejected attempts} of all the workers.
+        """
+        return dict(self._connection().execute(
+            'SELECT kind, count FROM rejections').fetchall())
+
+
+class LoginThrottle:
+    """
+    Per email and per IP buckets of the logins,
+    every attempt allowed until it is configured with a store.
+    """
+    def __init__(self):
+        self.store = None
+        self.email_limit = Limit('email', DEFAULT_EMAIL_BURST,
+                                 DEFAULT_EMAIL_PER_MINUTE)
+        self.ip_limit = Limit('ip', DEFAULT_IP_BURST, DEFAULT_IP_PER_MINUTE)
+
+    def configure(self, path, email_limit=None, ip_limit=None,
+                  clock=time.time):
+        """
+        Sets the SQLite file of the buckets, None to allow every attempt.
+        """
+        self.store = BucketStore(path, clock) if path else None
+        self.email_limit = email_limit or self.email_limit
+        self.ip_limit = ip_limit or self.ip_limit
+
+    def check(self, email, ip):
+        """
+        Takes a token of the IP, then of the email.
+        :Returns: 0 if the attempt is allowed, else the seconds
+        before trying again.
+        """
+        if self.store is None:
+            return 0
+        if ip:
+            wait = self.store.take(f'ip:{ip}', self.ip_limit)
+            if wait:
+                return wait
+        if isinstance(email, str) and email:
+            return self.store.take(f'email:{email.strip().lower()}',
+                                   self.email_limit)
+        return 0
+
+    def stats(self):
+        """
+        Returns the limits and the rejected attempts by kind.
+        """
+        rejected = self.store.rejections() if self.store else {}
+        return {limit.kind: {"burst": limit.burst,
+                             "per_minute": limit.rate * 60,
+                             "rejected": rejected.get(limit.kind, 0)}
+                for limit in (self.email_limit, self.ip_limit)}
+
+
+login_throttle = LoginThrottle()
+
+
+def throttled_response(wait):
+    """
+    Returns the 429 of a rejected attempt, with its Retry-After.
+    """
+    response = jsonify({"Error": "Too many login attempts."})
+    response.headers['Retry-After'] = str(max(int(wait + 0.999), 1))
+    return response, 429
+
+
+def init_login_throttle(app):
+    """
+    Configures the login throttle from LOGIN_THROTTLE_DB,
+    LOGIN_EMAIL_BURST, LOGIN_EMAIL_PER_MINUTE, LOGIN_IP_BURST and
+    LOGIN_IP_PER_MINUTE of an app.
+    """
+    config = app.config
+    login_throttle.configure(
+        config.get('LOGIN_THROTTLE_DB'),
+        Limit('email', config.get('LOGIN_EMAIL_BURST', DEFAULT_EMAIL_BURST),
+              config.get('LOGIN_EMAIL_PER_MINUTE', DEFAULT_EMAIL_PER_MINUTE)),
+        Limit('ip', config.get('LOGIN_IP_BURST', DEFAULT_IP_BURST),
+              config.get('LOGIN_IP_PER_MINUTE', DEFAULT_IP_PER_MINUTE)))
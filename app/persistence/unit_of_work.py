@@ -0,0 +1,93 @@
+"""
+Python module for the request-scoped unit of work.
+During a request, the writes (DataManager, revocations, rehashes) are
+only flushed: the view commits the changes of the whole request once
+with finish(), before it builds its success response, so that a failed
+commit is answered by the error handlers instead of following a
+success payload. A conflict with a unique constraint is answered with
+a 409, the other integrity errors and the writes of ids which are not
+UUIDs with a 400.
+The writes left uncommitted by a view are committed after it returned,
+or rolled back if the response is an error.
+"""
+from config import db
+from flask import jsonify
+from models.base_model import InvalidIdError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import scoped_session
+
+UNIT_OF_WORK = 'unit_of_work'
+UNCOMMITTED = 'uncommitted'
+
+
+def _is_unique_violation(error):
+    """
+    Returns True if an IntegrityError comes from a unique constraint.
+    """
+    orig = getattr(error, 'orig', None)
+    return (getattr(orig, 'pgcode', None) == '23505'
+            or 'UNIQUE constraint failed' in str(orig))
+
+
+def init_unit_of_work(app):
+    """
+    Registers the hooks opening and closing the unit of work
+    of each request of an app, and the answers to integrity errors
+    and invalid ids.
+    """
+    @app.before_request
+    def begin_unit_of_work():
+        db.session.info[UNIT_OF_WORK] = True
+
+    @app.after_request
+    def end_unit_of_work(response):
+        session = db.session
+        session.info.pop(UNIT_OF_WORK, None)
+        if session.info.pop(UNCOMMITTED, False):
+            if response.status_code < 400:
+                session.commit()
+            else:
+                session.rollback()
+        return response
+
+    @app.errorhandler(IntegrityError)
+    def integrity_error_response(error):
+        db.session.rollback()
+        db.session.info.pop(UNCOMMITTED, None)
+        if _is_unique_violation(error):
+            return jsonify({"Error": "Conflict with an existing entity."}), 409
+        return jsonify({"Error": "Invalid or missing reference."}), 400
+
+    @app.errorhandler(InvalidIdError)
+    def invalid_id_response(error):
+        db.session.rollback()
+        db.session.info.pop(UNCOMMITTED, None)
+        return jsonify({"Error": str(error)}), 400
+
+
+def stage(session):
+    """
+    Ends a write: flushes it inside a unit of work, commits it otherwise.
+    """
+    if session.info.get(UNIT_OF_WORK):
+        session.flush()
+        session.info[UNCOMMITTED] = True
+    else:
+        session.commit()
+
+
+def finish(session):
+    """
+    Commits the writes of the unit of work, before the response is built.
+    The entities keep their flushed state, which the response reads
+    without a SELECT per entity.
+    """
+    if isinstance(session, scoped_session):
+        session = session()
+    session.info.pop(UNCOMMITTED, None)
+    expire_on_commit = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = expire_on_commit
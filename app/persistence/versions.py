@@ -0,0 +1,172 @@
+"""
+Python module for the version counters of the tables and the
+conditional GET responses built from them.
+The flushes record the tables they wrote, and their counters are bumped
+in the same transaction right before it commits, with one upsert: the
+rows of table_versions are only locked for the end of the transaction,
+and a missing row can't race into a duplicate key. The counter of a
+table changes exactly when its rows do.
+A GET whose If-None-Match matches gets a 304 after reading the
+counters only: the query and the serialization of the view are skipped.
+"""
+from config import db
+from flask import make_response, request
+from functools import wraps
+from hashlib import sha1
+from models.table_version import TableVersion
+from persistence.expand import ExpandError, expand_paths, expanded_tables
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+versions_table = TableVersion.__table__
+# Session.info key of the tables written by the transaction
+WRITTEN_TABLES = 'written_tables'
+
+
+def bump(session, tables):
+    """
+    Increments the version counters of tables when the session
+    transaction commits.
+    :param tables: iterable of table names.
+    """
+    session.info.setdefault(WRITTEN_TABLES, set()).update(tables)
+
+
+def _upsert_versions(connection, tables):
+    """
+    Increments the version counters of tables, creating the missing ones,
+    in the order of their names.
+    """
+    now = versions_table.c.updated_at.default.arg
+    rows = [{'table_name': table, 'version': 1, 'updated_at': now}
+            for table in sorted(tables)]
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        for row in rows:
+            result = connection.execute(
+                update(versions_table)
+                .where(versions_table.c.table_name == row['table_name'])
+                .values(version=versions_table.c.version + 1,
+                        updated_at=now))
+            if not result.rowcount:
+                connection.execute(insert(versions_table).values(row))
+        return
+    statement = upsert(versions_table).values(rows)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[versions_table.c.table_name],
+        set_={'version': versions_table.c.version + 1,
+              'updated_at': statement.excluded.updated_at}))
+
+
+def read_versions(session, tables):
+    """
+    Returns the dict {table name: (version, updated_at)} of tables,
+    tables never written are missing.
+    """
+    rows = session.execute(
+        select(versions_table.c.table_name, versions_table.c.version,
+               versions_table.c.updated_at)
+        .where(versions_table.c.table_name.in_(tables)))
+    return {name: (version, updated_at) for name, version, updated_at in rows}
+
+
+def _written_tables(session):
+    """
+    Returns the names of the tables written by the flush of a session.
+    """
+    entities = [*session.new, *session.deleted,
+                *(entity for entity in session.dirty
+                  if session.is_modified(entity))]
+    return {entity.__table__.name for entity in entities
+            if hasattr(entity, '__table__')
+            and not isinstance(entity, TableVersion)}
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_written_tables(session, flush_context):
+    tables = _written_tables(session)
+    if tables:
+        bump(session, tables)
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_written_tables(session):
+    # Also called when a savepoint is released
+    if session.get_nested_transaction() is not None:
+        return
+    # The pending changes are flushed by the commit after this hook
+    session.flush()
+    tables = session.info.pop(WRITTEN_TABLES, None)
+    if tables:
+        _upsert_versions(session.connection(), tables)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_written_tables(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(WRITTEN_TABLES, None)
+
+
+def conditional(*models, filters=None):
+    """
+    Decorator adding an ETag and a Last-Modified header, derived from
+    the versions of the tables of models, to the responses of a GET
+    route, and answering 304 to the requests already holding them.
+    The ETag also covers the path, the query string and the Accept
+    header, so that each page and format has its own, and the tables
+    of the relationships the request expands (?expand) in the entities
+    of the first model.
+    :param filters: dict {query parameter: models} of the other tables
+    read by the filters of the view, versioned when the request sends
+    the parameter.
+    """
+    model_tables = [model.__tablename__ for model in models]
+    filter_tables = {name: [model.__tablename__ for model in filter_models]
+                     for name, filter_models in (filters or {}).items()}
+
+    def decorator(view):
+        @wraps(view)
+        def decorated(*args, **kwargs):
+            try:
+                paths = expand_paths(models[0])
+            except ExpandError:
+                # Answered with a 400 by the view
+                paths = ()
+            tables = sorted({*model_tables,
+                             *expanded_tables(models[0], paths),
+                             *(table for name, names in filter_tables.items()
+                               if request.args.get(name)
+                               for table in names)})
+            versions = read_versions(db.session, tables)
+            etag = sha1(repr((request.full_path,
+                              request.headers.get('Accept', ''),
+                              [versions.get(table, (0,))[0]
+                               for table in tables])).encode()).hexdigest()
+            modified = [updated_at for _, updated_at in versions.values()]
+            last_modified = max(modified) if modified else None
+
+            if request.if_none_match:
+                unchanged = request.if_none_match.contains_weak(etag)
+            else:
+                unchanged = (last_modified is not None
+                             and request.if_modified_since is not None
+                             and last_modified.replace(microsecond=0)
+                             <= request.if_modified_since.replace(
+                                 tzinfo=None))
+            if unchanged:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code >= 300:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.vary.add('Accept')
+            return response
+        return decorated
+    return decorator
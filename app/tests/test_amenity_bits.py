@@ -0,0 +1,193 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from api.place_api import place_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.amenity_bits import (AmenityMaskIndex, MASK_BITS,
+                                      amenity_mask, bit_mask)
+from persistence.facets import place_filters
+from sqlalchemy import event
+import uuid
+
+HOST_ID = str(uuid.uuid4())
+WIFI = str(uuid.uuid4())
+SPA = str(uuid.uuid4())
+POOL = str(uuid.uuid4())
+PLACE_IDS = {name: str(uuid.uuid4())
+             for name in ("loft", "house", "flat", "studio")}
+
+
+class AmenityBitsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        self.app.register_blueprint(place_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+        self.statements = []
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Country(code="FR", name="France"))
+            paris = City( city_name="Paris", country_code="FR")
+            wifi = Amenity(id=WIFI, name="Wifi")
+            pool = Amenity(id=POOL, name="Pool")
+            db.session.add_all([paris, wifi, pool])
+            for name, amenities in (("Loft", [wifi]),
+                                    ("House", [wifi, pool]),
+                                    ("Flat", [pool]),
+                                    ("Studio", [])):
+                db.session.add(Place(
+                    id=PLACE_IDS[name.lower()], name=name, description="A place",
+                    address="Street", latitude=1.0, longitude=2.0,
+                    num_rooms=1, num_bathrooms=1, price_per_night=50.0,
+                    max_guests=2, host_id=HOST_ID, city=paris,
+                    amenity_ids=WIFI, amenities=amenities))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def record_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def names(self, query):
+        response = self.client.get(f'/places?{query}')
+        if response.status_code == 404:
+            return []
+        self.assertEqual(response.status_code, 200)
+        return sorted(place["name"]
+                      for place in response.get_json()["items"])
+
+    def test_bits_are_stable(self):
+        with self.app.app_context():
+            # Assigned in the order of creation
+            self.assertEqual(db.session.get(Amenity, WIFI).bit, 0)
+            self.assertEqual(db.session.get(Amenity, POOL).bit, 1)
+            db.session.add(Amenity(id=SPA, name="Spa"))
+            db.session.commit()
+            self.assertEqual(db.session.get(Amenity, SPA).bit, 2)
+            self.assertEqual(db.session.get(Amenity, WIFI).bit, 0)
+
+    def test_masks_follow_the_amenities(self):
+        with self.app.app_context():
+            masks = dict(db.session.execute(
+                db.select(Place.name, Place.amenity_mask)).all())
+            self.assertEqual(masks, {"Loft": 1, "House": 3, "Flat": 2,
+                                     "Studio": 0})
+            wifi = db.session.get(Amenity, WIFI)
+            pool = db.session.get(Amenity, POOL)
+            studio = db.session.get(Place, PLACE_IDS["studio"])
+            studio.amenities.append(wifi)
+            house = db.session.get(Place, PLACE_IDS["house"])
+            house.amenities.remove(wifi)
+            db.session.commit()
+            self.assertEqual(studio.amenity_mask, 1)
+            self.assertEqual(house.amenity_mask, 2)
+
+            # Through the other side of the relationship
+            pool.places.append(studio)
+            db.session.commit()
+            self.assertEqual(studio.amenity_mask, 3)
+
+    def test_freed_bits_are_reused(self):
+        with self.app.app_context():
+            db.session.delete(db.session.get(Amenity, WIFI))
+            db.session.commit()
+            spa = Amenity(id=str(uuid.uuid4()), name="Spa")
+            sauna = Amenity(id=str(uuid.uuid4()), name="Sauna")
+            db.session.add_all([spa, sauna])
+            db.session.commit()
+            self.assertEqual((spa.bit, sauna.bit), (0, 2))
+
+    def test_unloaded_amenities(self):
+        with self.app.app_context():
+            studio = db.session.get(Place, PLACE_IDS["studio"])
+            engine = db.engine
+            event.listen(engine, 'before_cursor_execute',
+                         self.record_statement)
+            try:
+                studio.name = "Small studio"
+                db.session.commit()
+            finally:
+                event.remove(engine, 'before_cursor_execute',
+                             self.record_statement)
+            # The amenities of the place are not loaded
+            self.assertFalse([statement for statement in self.statements
+                              if 'place_amenities' in statement])
+
+            # A backref append to the unloaded collection
+            studio = db.session.get(Place, PLACE_IDS["studio"])
+            pool = db.session.get(Amenity, POOL)
+            pool.places.append(studio)
+            db.session.commit()
+            self.assertEqual(studio.amenity_mask, 2)
+
+    def test_deleted_amenity_clears_its_bit(self):
+        with self.app.app_context():
+            db.session.delete(db.session.get(Amenity, WIFI))
+            db.session.commit()
+            masks = dict(db.session.execute(
+                db.select(Place.name, Place.amenity_mask)).all())
+            self.assertEqual(masks, {"Loft": 0, "House": 2, "Flat": 2,
+                                     "Studio": 0})
+
+    def test_filters(self):
+        self.assertEqual(self.names(f"amenities={WIFI},{POOL}"), ["House"])
+        self.assertEqual(self.names(f"amenities={WIFI}"), ["House", "Loft"])
+        self.assertEqual(self.names(f"any_amenities={WIFI},{POOL}"),
+                         ["Flat", "House", "Loft"])
+        self.assertEqual(self.names(f"amenities={WIFI}&any_amenities={POOL}"),
+                         ["House"])
+        self.assertEqual(self.names(f"amenities={uuid.uuid4()}"), [])
+        # The same amenities in another case
+        self.assertEqual(self.names(f"amenities={WIFI},{WIFI.upper()},"
+                                    f"{POOL.upper()}"), ["House"])
+        with self.app.app_context():
+            self.assertEqual(amenity_mask(db.session, [WIFI, WIFI.upper()]),
+                             1)
+
+    def test_masks_and_join_agree(self):
+        with self.app.app_context():
+            for args in ({"amenities": f"{WIFI},{POOL}"}, {"amenities": POOL},
+                         {"any_amenities": f"{WIFI},{POOL}"}):
+                with_masks = db.session.scalars(db.select(Place.id).where(
+                    *place_filters(args, db.session))).all()
+                with_join = db.session.scalars(db.select(Place.id).where(
+                    *place_filters(args))).all()
+                self.assertEqual(sorted(with_masks), sorted(with_join))
+
+    def test_masks_limit(self):
+        self.assertIsNone(bit_mask([MASK_BITS]))
+        self.assertIsNone(bit_mask([None]))
+        self.assertEqual(bit_mask([0, 62]), 1 | 1 << 62)
+        with self.app.app_context():
+            # An amenity past the masks falls back to the join
+            wifi = db.session.get(Amenity, WIFI)
+            wifi.bit = MASK_BITS
+            db.session.commit()
+            self.assertIsNone(amenity_mask(db.session, [WIFI]))
+            self.assertIsNone(amenity_mask(db.session, [str(uuid.uuid4())]))
+        self.assertEqual(self.names(f"amenities={WIFI},{POOL}"), ["House"])
+
+    def test_mask_index(self):
+        with self.app.app_context():
+            index = AmenityMaskIndex.load(db.session)
+            mask = amenity_mask(db.session, [WIFI, POOL])
+            self.assertEqual(sorted(index.having_all(mask)),
+                             [PLACE_IDS["house"]])
+            self.assertEqual(sorted(index.having_any(mask)), sorted(
+                PLACE_IDS[name] for name in ("flat", "house", "loft")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager, create_access_token
+from api.amenities_api import amenities_api
+from api.place_api import place_api
+from api.review_api import review_api
+from config import db
+from models.amenity import Amenity
+from models.base_model import InvalidIdError
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.datamanager import DataManager
+from persistence.unit_of_work import init_unit_of_work
+from sqlalchemy import event
+import uuid
+
+HOST_ID = str(uuid.uuid4())
+CITY_ID = str(uuid.uuid4())
+AMENITY_ID = str(uuid.uuid4())
+USER_IDS = [str(uuid.uuid4()) for _ in range(2)]
+
+
+def place_data(name, **fields):
+    data = {
+        "name": name,
+        "description": "A beautiful place",
+        "address": "123 Test St",
+        "latitude": 12.34,
+        "longitude": 56.78,
+        "num_rooms": 3,
+        "num_bathrooms": 2,
+        "price_per_night": 100.0,
+        "max_guests": 4,
+        "host_id": HOST_ID,
+        "city_id": CITY_ID,
+        "amenity_ids": AMENITY_ID
+    }
+    data.update(fields)
+    return data
+
+
+class BulkApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["JWT_SECRET_KEY"] = "test-secret"
+        db.init_app(self.app)
+        JWTManager(self.app)
+        init_unit_of_work(self.app)
+        self.app.register_blueprint(amenities_api)
+        self.app.register_blueprint(place_api)
+        self.app.register_blueprint(review_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            host = User(id=HOST_ID, email="host@example.com",
+                        first_name="Host", last_name="Doe")
+            db.session.add(host)
+            db.session.commit()
+            token = create_access_token(identity=HOST_ID)
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_save_many_reports_failures(self):
+        with self.app.app_context():
+            places = [Place(**place_data("Good 1")),
+                      Place(**place_data("Bad", amenity_ids=None)),
+                      Place(**place_data("Good 2"))]
+            errors = DataManager.save_many(places, db.session, chunk_size=2)
+            self.assertEqual(list(errors), [1])
+            self.assertEqual(Place.query.count(), 2)
+
+    def test_update_and_delete_many(self):
+        with self.app.app_context():
+            places = [Place(**place_data(f"Place {i}")) for i in range(5)]
+            DataManager.save_many(places, db.session)
+            ids = [place.id for place in places]
+
+            DataManager.update_many(
+                Place, [{"id": id, "price_per_night": 50.0} for id in ids],
+                db.session, chunk_size=2)
+            prices = {price for (price,)
+                      in db.session.query(Place.price_per_night)}
+            self.assertEqual(prices, {50.0})
+
+            deleted = DataManager.delete_many(Place, ids[:3], db.session,
+                                              chunk_size=2)
+            self.assertEqual(deleted, 3)
+            self.assertEqual(Place.query.count(), 2)
+
+    def test_delete_many_cascades(self):
+        with self.app.app_context():
+            db.session.add_all([Country(code="FR", name="France"),
+                                City(id=CITY_ID, city_name="Paris",
+                                     country_code="FR")])
+            places = [Place(**place_data(f"Place {i}")) for i in range(2)]
+            DataManager.save_many(places, db.session)
+            db.session.add(Review(rating=5, comment="Nice",
+                                  user_id=HOST_ID, place_id=places[0].id))
+            db.session.commit()
+
+            self.assertEqual(DataManager.delete_many(City, [CITY_ID],
+                                                     db.session), 1)
+            self.assertEqual(Place.query.count(), 0)
+            self.assertEqual(Review.query.count(), 0)
+            self.assertEqual(DataManager.delete_many(User, [HOST_ID],
+                                                     db.session), 1)
+            self.assertEqual(User.query.count(), 0)
+
+    def test_bulk_places(self):
+        response = self.client.post('/places/bulk', headers=self.headers,
+                                    json=[place_data("Place 1"),
+                                          {"name": "Incomplete"},
+                                          place_data("Place 2")])
+
+        self.assertEqual(response.status_code, 201)
+        body = response.get_json()
+        self.assertEqual(len(body["Places"]), 2)
+        self.assertEqual(body["Errors"], [{"index": 1,
+                                           "Error": "Missing required field."}])
+
+    def test_ids_which_are_not_uuids(self):
+        response = self.client.post(
+            '/places', headers=self.headers,
+            json=place_data("Place 1", host_id="not-a-uuid"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(),
+                         {"Error": "host_id is not a valid id."})
+
+        response = self.client.post('/places/bulk', headers=self.headers,
+                                    json=[place_data("Place 2"),
+                                          place_data("Bad", city_id="paris")])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()["Errors"],
+                         [{"index": 1, "Error": "city_id is not a valid id."}])
+
+        with self.app.app_context():
+            place_id = Place.query.one().id
+            self.assertRaises(InvalidIdError, DataManager.update_many, Place,
+                              [{"id": place_id, "host_id": "nobody"}],
+                              db.session)
+            self.assertEqual(db.session.get(Place, place_id).host_id, HOST_ID)
+
+    def test_bulk_places_one_transaction(self):
+        with self.app.app_context():
+            engine = db.engine
+        commits = []
+        record = commits.append
+        event.listen(engine, 'commit', record)
+        try:
+            response = self.client.post(
+                '/places/bulk', headers=self.headers,
+                json=[place_data("Place 1"),
+                      place_data("Bad", amenity_ids=None),
+                      place_data("Place 2")])
+        finally:
+            event.remove(engine, 'commit', record)
+
+        self.assertEqual(response.status_code, 201)
+        body = response.get_json()
+        self.assertEqual([p["name"] for p in body["Places"]],
+                         ["Place 1", "Place 2"])
+        self.assertEqual([e["index"] for e in body["Errors"]], [1])
+        self.assertEqual(len(commits), 1)
+        with self.app.app_context():
+            self.assertEqual(Place.query.count(), 2)
+
+    def test_bulk_amenities_duplicates(self):
+        with self.app.app_context():
+            DataManager.save(Amenity(name="Pool"), db.session)
+
+        response = self.client.post('/amenities/bulk', headers=self.headers,
+                                    json=[{"name": "Pool"}, {"name": "Wifi"},
+                                          {"name": "Wifi"}, {}])
+
+        self.assertEqual(response.status_code, 201)
+        body = response.get_json()
+        self.assertEqual([a["name"] for a in body["Amenities"]], ["Wifi"])
+        self.assertEqual([e["index"] for e in body["Errors"]], [0, 2, 3])
+
+    def test_bulk_reviews(self):
+        with self.app.app_context():
+            place = Place(**place_data("Place"))
+            DataManager.save(place, db.session)
+            place_id = place.id
+
+        response = self.client.post(f'/places/{place_id}/reviews/bulk',
+                                    headers=self.headers,
+                                    json=[{"user_id": USER_IDS[0], "rating": 5,
+                                           "comment": "Great"},
+                                          {"user_id": USER_IDS[0].upper(),
+                                           "rating": 4, "comment": "Again"},
+                                          {"user_id": HOST_ID.replace("-", ""),
+                                           "rating": 5, "comment": "Mine"},
+                                          {"user_id": USER_IDS[1], "rating": 9,
+                                           "comment": "Out of range"}])
+
+        self.assertEqual(response.status_code, 201)
+        body = response.get_json()
+        self.assertEqual(len(body["Reviews"]), 1)
+        self.assertEqual([e["index"] for e in body["Errors"]], [1, 2, 3])
+        with self.app.app_context():
+            self.assertEqual(Review.query.count(), 1)
+
+        # Against the reviews already saved
+        response = self.client.post(f'/places/{place_id}/reviews/bulk',
+                                    headers=self.headers,
+                                    json=[{"user_id": USER_IDS[0].upper(),
+                                           "rating": 3, "comment": "Later"}])
+        self.assertEqual(response.get_json()["Errors"], [
+            {"index": 0, "Error": "You cannot review a place twice."}])
+
+    def test_bulk_reviews_place_not_found(self):
+        response = self.client.post('/places/unknown/reviews/bulk',
+                                    headers=self.headers, json=[{}])
+
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
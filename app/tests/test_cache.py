@@ -0,0 +1,137 @@
+import unittest
+from flask import Flask
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.cache import EntityCache, LRUCache, cache_sizes, entity_cache
+from persistence.datamanager import DataManager
+from sqlalchemy import event
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.75)
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        clock.now = 9
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 10
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_cache_sizes(self):
+        self.assertEqual(cache_sizes("places:2048, users:512,"),
+                         {"places": 2048, "users": 512})
+        self.assertEqual(cache_sizes(""), {})
+
+    def test_sizes_by_table(self):
+        cache = EntityCache(sizes={"places": 2}, default_size=5)
+        self.assertEqual(cache._cache_for(Place).maxsize, 2)
+        self.assertEqual(cache._cache_for(User).maxsize, 5)
+
+
+class EntityCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        entity_cache.configure()
+        self.statements = []
+        with self.app.app_context():
+            db.create_all()
+            amenity = Amenity(name="Pool")
+            DataManager.save(amenity, db.session)
+            self.amenity_id = amenity.id
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self.record_statement)
+        self.engine = engine
+
+    def tearDown(self):
+        event.remove(self.engine, 'before_cursor_execute',
+                     self.record_statement)
+        with self.app.app_context():
+            db.drop_all()
+        entity_cache.configure()
+
+    def record_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def selects(self):
+        return [s for s in self.statements
+                if s.lstrip().upper().startswith("SELECT")]
+
+    def test_hit_issues_no_query(self):
+        with self.app.app_context():
+            DataManager.get(Amenity, self.amenity_id, db.session)
+        self.assertEqual(len(self.selects()), 1)
+
+        with self.app.app_context():
+            amenity = DataManager.get(Amenity, self.amenity_id, db.session)
+            self.assertEqual(amenity.name, "Pool")
+            self.assertEqual(DataManager.read(amenity)["id"], self.amenity_id)
+        self.assertEqual(len(self.selects()), 1)
+        self.assertEqual(entity_cache.stats()["amenities"]["hits"], 1)
+
+    def test_missing_entity(self):
+        with self.app.app_context():
+            self.assertIsNone(DataManager.get(Amenity, "unknown", db.session))
+
+    def test_update_invalidates(self):
+        with self.app.app_context():
+            amenity = DataManager.get(Amenity, self.amenity_id, db.session)
+            DataManager.update(amenity, {"name": "Spa"}, db.session)
+
+        with self.app.app_context():
+            amenity = DataManager.get(Amenity, self.amenity_id, db.session)
+            self.assertEqual(amenity.name, "Spa")
+
+    def test_update_many_invalidates(self):
+        with self.app.app_context():
+            DataManager.get(Amenity, self.amenity_id, db.session)
+            DataManager.update_many(Amenity, [{"id": self.amenity_id,
+                                               "name": "Sauna"}], db.session)
+
+        with self.app.app_context():
+            amenity = DataManager.get(Amenity, self.amenity_id, db.session)
+            self.assertEqual(amenity.name, "Sauna")
+
+    def test_delete_invalidates(self):
+        with self.app.app_context():
+            amenity = DataManager.get(Amenity, self.amenity_id, db.session)
+            DataManager.delete(amenity, db.session)
+
+        with self.app.app_context():
+            self.assertIsNone(DataManager.get(Amenity, self.amenity_id,
+                                              db.session))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager, create_access_token
+from api.country_api import country_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.countries import COUNTRY_MAX_AGE, country_index
+import pycountry
+
+
+class CountryIndexTestCase(unittest.TestCase):
+    def test_lookups(self):
+        index = country_index()
+        self.assertIs(index, country_index())
+        self.assertEqual(len(index.records), len(pycountry.countries))
+        self.assertEqual(index.get("fr").name, "France")
+        self.assertEqual(index.get("FRA").code, "FR")
+        self.assertIsNone(index.get("ZZ"))
+        self.assertIsNone(index.get(None))
+        with self.assertRaises(TypeError):
+            index.by_alpha_2["ZZ"] = None
+
+
+class CountryResponsesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        db.init_app(self.app)
+        JWTManager(self.app)
+        self.app.register_blueprint(country_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+        with self.app.app_context():
+            db.create_all()
+            token = create_access_token(identity="admin",
+                                        additional_claims={"is_admin": True})
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_list(self):
+        response = self.client.get("/countries", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(),
+                         [{"name": country.name, "code": country.alpha_2}
+                          for country in pycountry.countries])
+        self.assertTrue(response.cache_control.private)
+        self.assertEqual(response.cache_control.max_age, COUNTRY_MAX_AGE)
+        etag = response.headers["ETag"]
+
+        response = self.client.get("/countries", headers={
+            **self.headers, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_detail(self):
+        for code in ("fr", "FRA"):
+            response = self.client.get(f"/countries/{code}",
+                                       headers=self.headers)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.get_json(),
+                             {"Country": {"name": "France", "code": "FR"}})
+            self.assertEqual(response.cache_control.max_age, COUNTRY_MAX_AGE)
+        response = self.client.get("/countries/ZZ", headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_create_country(self):
+        response = self.client.post("/countries", headers=self.headers,
+                                    json={"name": "France", "code": "FR"})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post("/countries", headers=self.headers,
+                                    json={"name": "France", "code": "FR"})
+        self.assertEqual(response.status_code, 409)
+        response = self.client.post("/countries", headers=self.headers,
+                                    json={"name": "Spain", "code": "FR"})
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("pycountry", response.get_json()["Error"])
+
+
+    def test_cities_envelope(self):
+        with self.app.app_context():
+            db.session.add_all([City(city_name=f"City {i}", country_code="FR")
+                                for i in range(3)])
+            db.session.commit()
+        response = self.client.get("/countries/fr/cities",
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(city["city_name"] for city in
+                                response.get_json()["Cities"]),
+                         ["City 0", "City 1", "City 2"])
+        self.assertNotIn("next_cursor", response.get_json())
+
+        response = self.client.get("/countries/fr/cities?limit=2",
+                                   headers=self.headers)
+        body = response.get_json()
+        self.assertEqual(len(body["Cities"]), 2)
+        response = self.client.get(
+            f"/countries/fr/cities?limit=2&cursor={body['next_cursor']}",
+            headers=self.headers)
+        self.assertEqual(len(response.get_json()["Cities"]), 1)
+        self.assertIsNone(response.get_json()["next_cursor"])
+        self.assertEqual(self.client.get("/countries/de/cities",
+                                         headers=self.headers).status_code,
+                         404)
+
+if __name__ == "__main__":
+    unittest.main()
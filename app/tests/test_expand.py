@@ -0,0 +1,155 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager, create_access_token
+from api.cities_api import cities_api
+from api.place_api import place_api
+from api.review_api import review_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.expand import ExpandError, expand_paths, expanded_tables
+from persistence.query_count import QUERY_COUNT_HEADER, init_query_count
+
+ALL = "city,city.country,amenities,reviews,host"
+
+
+class ExpandTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        db.init_app(self.app)
+        JWTManager(self.app)
+        init_query_count(self.app)
+        self.app.register_blueprint(cities_api)
+        self.app.register_blueprint(place_api)
+        self.app.register_blueprint(review_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            country = Country(code="FR", name="France")
+            cities = [City(city_name=name, country=country)
+                      for name in ("Paris", "Lyon")]
+            amenities = [Amenity(name=name) for name in ("Wifi", "Pool")]
+            users = [User(email=f"user{i}@example.com", first_name="User",
+                          last_name="Doe", password_hash="secret")
+                     for i in range(3)]
+            db.session.add_all([country, *cities, *amenities, *users])
+            db.session.flush()
+            for i in range(30):
+                place = Place(
+                    name=f"Place {i}", description="A place",
+                    address="Street", latitude=1.0, longitude=2.0,
+                    num_rooms=1, num_bathrooms=1, price_per_night=50.0,
+                    max_guests=2, host_id=users[i % 3].id,
+                    city_id=cities[i % 2].id,
+                    amenity_ids=amenities[0].id, amenities=amenities)
+                db.session.add(place)
+                db.session.add_all(
+                    Review(rating=5, comment="Nice", place=place,
+                           user=users[(i + j) % 3]) for j in (1, 2))
+            db.session.commit()
+            self.user_id = users[0].id
+            self.place_id = db.session.scalars(
+                db.select(Place.id).limit(1)).one()
+            token = create_access_token(identity=self.user_id)
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_expanded_places(self):
+        response = self.client.get(f'/places?expand={ALL}')
+        self.assertEqual(response.status_code, 200)
+        page = response.get_json()
+        self.assertEqual(len(page["items"]), 30)
+        place = page["items"][0]
+        self.assertEqual(place["city"]["country"]["code"], "FR")
+        self.assertEqual(place["city"]["id"], place["city_id"])
+        self.assertEqual(sorted(a["name"] for a in place["amenities"]),
+                         ["Pool", "Wifi"])
+        self.assertEqual(len(place["reviews"]), 2)
+        self.assertEqual(place["host"]["id"], place["host_id"])
+        self.assertNotIn("password_hash", place["host"])
+
+        response = self.client.get('/places?limit=5')
+        self.assertNotIn("city", response.get_json()["items"][0])
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        counts = [int(self.client.get(f'/places?expand={ALL}&limit={limit}')
+                      .headers[QUERY_COUNT_HEADER]) for limit in (2, 30)]
+        self.assertEqual(counts[0], counts[1])
+
+    def test_expanded_place(self):
+        response = self.client.get(
+            f'/places/{self.place_id}?expand=city.country,reviews')
+        self.assertEqual(response.status_code, 200)
+        place = response.get_json()[0]
+        self.assertEqual(place["city"]["country"]["name"], "France")
+        self.assertEqual(len(place["reviews"]), 2)
+        self.assertNotIn("amenities", place)
+
+    def test_expanded_reviews_and_cities(self):
+        response = self.client.get(
+            f'/users/{self.user_id}/reviews?expand=place.city,user',
+            headers=self.headers)
+        review = response.get_json()["items"][0]
+        self.assertEqual(review["user"]["id"], self.user_id)
+        self.assertIn(review["place"]["city"]["city_name"], ("Paris", "Lyon"))
+
+        response = self.client.get('/cities?expand=country,places')
+        cities = response.get_json()["items"]
+        self.assertEqual([len(city["places"]) for city in cities], [15, 15])
+        self.assertEqual(cities[0]["country"]["code"], "FR")
+
+    def test_expanded_users_are_public_fields(self):
+        # No Authorization header: the place routes are public
+        places = [
+            self.client.get('/places?expand=host,reviews').get_json()
+            ["items"][0],
+            self.client.get(f'/places/{self.place_id}?expand=host')
+            .get_json()[0]]
+        for place in places:
+            self.assertEqual(set(place["host"]), {"id", "first_name"})
+            self.assertNotIn("email", place["host"])
+            self.assertNotIn("is_admin", place["host"])
+        self.assertIn("comment", places[0]["reviews"][0])
+
+    def test_etag_follows_the_expanded_tables(self):
+        url = f'/places/{self.place_id}?expand=host'
+        etag = self.client.get(url).headers["ETag"]
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        # Writes the users table, not places
+        with self.app.app_context():
+            place = db.session.get(Place, self.place_id)
+            place.host.first_name = "Renamed"
+            db.session.commit()
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()[0]["host"]["first_name"],
+                         "Renamed")
+        self.assertEqual(expanded_tables(Place, ("city", "city.country")),
+                         ["cities", "countries"])
+
+    def test_invalid_expansions(self):
+        with self.app.test_request_context('/places?expand=city.country'):
+            self.assertEqual(expand_paths(Place), ("city", "city.country"))
+        self.assertRaises(ExpandError, expand_paths, Place, "owner")
+        self.assertRaises(ExpandError, expand_paths, Amenity, "places")
+        for url in ('/places?expand=password', '/cities?expand=city',
+                    f'/places/{self.place_id}?expand=reviews.user'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+
+if __name__ == '__main__':
+    unittest.main()
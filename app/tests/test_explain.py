@@ -0,0 +1,62 @@
+import unittest
+from flask import Flask
+from commands import init_commands
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.explain import check_plans, full_scans
+
+
+class ExplainTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        init_commands(self.app)
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_endpoint_queries_use_indexes(self):
+        with self.app.app_context():
+            report = check_plans(db.engine, rows=100)
+            self.assertEqual(Place.query.count(), 0)
+        self.assertIn("POST /login", report)
+        self.assertEqual({name: scans for name, (_, scans) in report.items()
+                          if scans}, {})
+
+    def test_full_scans(self):
+        self.assertEqual(full_scans('sqlite', ['SCAN places']),
+                         ['SCAN places'])
+        self.assertEqual(full_scans('sqlite', [
+            'SCAN places USING INDEX ix_places_created_at_id',
+            'SEARCH places USING INDEX ix_places_host_id (host_id=?)',
+            'SCAN CONSTANT ROW']), [])
+        self.assertEqual(len(full_scans('postgresql', [
+            'Seq Scan on places  (cost=0.00..1.01 rows=1 width=36)'])), 1)
+
+    def test_command(self):
+        result = self.app.test_cli_runner().invoke(
+            args=['explain-check', '--rows', '10'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("ok        GET /places", result.output)
+
+    def test_command_fails_on_missing_index(self):
+        with self.app.app_context():
+            db.session.execute(db.text("DROP INDEX ix_places_host_id"))
+            db.session.commit()
+        result = self.app.test_cli_runner().invoke(
+            args=['explain-check', '--rows', '10'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("FULL SCAN DELETE /users/<id> (place)", result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
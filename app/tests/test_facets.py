@@ -0,0 +1,106 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from api.place_api import place_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.facets import FilterError, place_filters
+
+HOST_ID = "0a9f4c2e-7b13-4d6a-8e5f-1c2b3d4e5f60"
+PARIS = "3c7e1f0a-4b52-4d8e-9f61-2a0b5c9d7e13"
+LYON = "8d2f6a91-0c3e-4b7a-a5d4-6e1f2b3c4d58"
+BERLIN = "e4b9c2d7-1a6f-4e35-8b0c-9d7a6f5e4c21"
+POOL = "51a0e6c3-9d2b-4f84-b7e1-0c6d3a2f9b47"
+WIFI = "b7d3f2e8-6c1a-4095-9e4b-3f8a1d0c5e62"
+
+
+class FacetsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        self.app.register_blueprint(place_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([Country(code="FR", name="France"),
+                                Country(code="DE", name="Germany")])
+            paris = City(id=PARIS, city_name="Paris", country_code="FR")
+            lyon = City(id=LYON, city_name="Lyon", country_code="FR")
+            berlin = City(id=BERLIN, city_name="Berlin", country_code="DE")
+            wifi = Amenity(id=WIFI, name="Wifi")
+            pool = Amenity(id=POOL, name="Pool")
+            db.session.add_all([paris, lyon, berlin, wifi, pool])
+            # (name, city, price, guests, rooms, amenities)
+            for name, city, price, guests, rooms, amenities in (
+                    ("Paris loft", paris, 120.0, 2, 1, [wifi]),
+                    ("Paris house", paris, 300.0, 6, 3, [wifi, pool]),
+                    ("Lyon flat", lyon, 45.0, 4, 2, [pool]),
+                    ("Berlin studio", berlin, 80.0, 2, 1, [wifi])):
+                db.session.add(Place(
+                    name=name, description="A place", address="Street",
+                    latitude=1.0, longitude=2.0, num_rooms=rooms,
+                    num_bathrooms=1, price_per_night=price,
+                    max_guests=guests, host_id=HOST_ID, city=city,
+                    amenity_ids=WIFI, amenities=amenities))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def names(self, query):
+        response = self.client.get(f'/places?{query}')
+        if response.status_code == 404:
+            return []
+        self.assertEqual(response.status_code, 200)
+        return sorted(place["name"]
+                      for place in response.get_json()["items"])
+
+    def test_filters(self):
+        self.assertEqual(self.names("country=fr"),
+                         ["Lyon flat", "Paris house", "Paris loft"])
+        self.assertEqual(self.names(f"city_id={PARIS}&max_price=200"),
+                         ["Paris loft"])
+        self.assertEqual(self.names("min_price=80&max_price=120"),
+                         ["Berlin studio", "Paris loft"])
+        self.assertEqual(self.names("guests=4&rooms=3"), ["Paris house"])
+        self.assertEqual(self.names(f"amenities={WIFI},{POOL}"), ["Paris house"])
+        self.assertEqual(self.names(f"amenities={WIFI}&country=DE"),
+                         ["Berlin studio"])
+        self.assertEqual(self.names("country=IT"), [])
+
+    def test_facets(self):
+        response = self.client.get('/places?country=FR&facets=1')
+        self.assertEqual(response.status_code, 200)
+        page = response.get_json()
+        self.assertEqual(len(page["items"]), 3)
+        self.assertEqual(page["facets"], {
+            "city": [{"value": PARIS, "count": 2},
+                     {"value": LYON, "count": 1}],
+            "amenity": [{"value": POOL, "count": 2},
+                        {"value": WIFI, "count": 2}],
+            "price": [{"value": "0-50", "count": 1},
+                      {"value": "100-200", "count": 1},
+                      {"value": "200-500", "count": 1}]})
+
+    def test_invalid_filters(self):
+        self.assertRaises(FilterError, place_filters, {"guests": "0"})
+        self.assertRaises(FilterError, place_filters,
+                          {"amenities": ",".join(map(str, range(21)))})
+        for query in ("min_price=cheap", "max_price=-1", "guests=two",
+                      "min_rating=6"):
+            response = self.client.get(f'/places?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+if __name__ == '__main__':
+    unittest.main()
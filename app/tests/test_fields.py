@@ -0,0 +1,174 @@
+import json
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager, create_access_token
+from sqlalchemy import event
+from api.place_api import place_api
+from api.review_api import review_api
+from api.user_api import user_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+import uuid
+
+AMENITY_ID = str(uuid.uuid4())
+
+FIELDS = "id,name,price_per_night"
+
+
+class FieldsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        db.init_app(self.app)
+        JWTManager(self.app)
+        self.app.register_blueprint(place_api)
+        self.app.register_blueprint(review_api)
+        self.app.register_blueprint(user_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            country = Country(code="FR", name="France")
+            city = City(city_name="Paris", country=country)
+            user = User(email="host@example.com", first_name="Host",
+                        last_name="Doe", password_hash="secret")
+            db.session.add_all([country, city, user])
+            db.session.flush()
+            places = [Place(name=f"Cottage {i}", description="A long text",
+                            address="Street", latitude=48.85,
+                            longitude=2.35, num_rooms=1, num_bathrooms=1,
+                            price_per_night=50.0 + i, max_guests=2,
+                            host_id=user.id, city_id=city.id,
+                            amenity_ids=AMENITY_ID)
+                      for i in range(5)]
+            db.session.add_all(places)
+            db.session.flush()
+            review = Review(rating=4, comment="Nice", place_id=places[0].id,
+                            user_id=user.id)
+            db.session.add(review)
+            db.session.commit()
+            self.place_id = places[0].id
+            self.review_id = review.id
+            self.user_id = user.id
+            token = create_access_token(identity=user.id)
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def statements(self, url):
+        """
+        Returns the response of a GET and the SQL statements it ran.
+        """
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        with self.app.app_context():
+            event.listen(db.engine, "before_cursor_execute", record)
+            try:
+                response = self.client.get(url)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record)
+        return response, statements
+
+    def test_list_selects_only_fields(self):
+        response, statements = self.statements(
+            f"/places?fields={FIELDS}&limit=2")
+        self.assertEqual(response.status_code, 200)
+        items = response.json["items"]
+        self.assertEqual(len(items), 2)
+        for item in items:
+            self.assertEqual(list(item), ["id", "name", "price_per_night"])
+        selects = [s for s in statements if "FROM places" in s]
+        self.assertTrue(selects)
+        for statement in selects:
+            self.assertNotIn("description", statement)
+            self.assertNotIn("places.address", statement)
+
+    def test_pagination_without_ordering_fields(self):
+        names = []
+        cursor = None
+        while True:
+            url = "/places?fields=name&limit=2"
+            if cursor:
+                url += f"&cursor={cursor}"
+            page = self.client.get(url).json
+            for item in page["items"]:
+                self.assertEqual(list(item), ["name"])
+                names.append(item["name"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(sorted(names), [f"Cottage {i}" for i in range(5)])
+
+    def test_stream(self):
+        self.app.config["PAGINATE_BY_DEFAULT"] = False
+        response = self.client.get("/places?fields=name,created_at")
+        self.assertEqual(response.status_code, 200)
+        items = json.loads(response.get_data(as_text=True))
+        self.assertEqual(len(items), 5)
+        self.assertEqual(set(items[0]), {"name", "created_at"})
+        self.assertIsInstance(items[0]["created_at"], str)
+
+    def test_detail(self):
+        response, statements = self.statements(
+            f"/places/{self.place_id}?fields={FIELDS}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{"id": self.place_id,
+                                          "name": "Cottage 0",
+                                          "price_per_night": 50.0}])
+        self.assertNotIn("description", " ".join(statements))
+        response = self.client.get(f"/reviews/{self.review_id}?fields=rating",
+                                   headers=self.headers)
+        self.assertEqual(response.json, [{"rating": 4}])
+        response = self.client.get(f"/users/{self.user_id}?fields=email",
+                                   headers=self.headers)
+        self.assertEqual(response.json, [{"email": "host@example.com"}])
+
+    def test_detail_not_found(self):
+        response = self.client.get(
+            "/places/00000000-0000-4000-8000-000000000000?fields=name")
+        self.assertEqual(response.status_code, 404)
+
+    def test_nearby_and_search(self):
+        response = self.client.get(
+            "/places/nearby?lat=48.85&lon=2.35&fields=name")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 5)
+        self.assertEqual(set(response.json[0]), {"name", "distance_km"})
+        response = self.client.get("/places/search?q=cottage&fields=name"
+                                   "&limit=3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json["items"]), 3)
+        self.assertEqual(list(response.json["items"][0]), ["name"])
+        cursor = response.json["next_cursor"]
+        response = self.client.get("/places/search?q=cottage&fields=name"
+                                   f"&limit=3&cursor={cursor}")
+        self.assertEqual(len(response.json["items"]), 2)
+
+    def test_invalid_fields(self):
+        for query in ("fields=name,nope", "fields=,", "fields=password_hash",
+                      "fields=amenity_mask", "fields=name&expand=city"):
+            response = self.client.get(f"/places?{query}")
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn("Error", response.json)
+        response = self.client.get(
+            f"/users/{self.user_id}?fields=password_hash",
+            headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager, create_access_token
+from api.internal_api import internal_api
+from config import db
+from persistence.engine import TimedQueuePool, engine_options
+
+
+class InternalApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        uri = 'sqlite:///' + os.path.join(self.directory.name, 'test.db')
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = uri
+        self.app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(uri)
+        self.app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        db.init_app(self.app)
+        JWTManager(self.app)
+        self.app.register_blueprint(internal_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+        with self.app.app_context():
+            self.admin_token = create_access_token(
+                identity="admin", additional_claims={"is_admin": True})
+            self.user_token = create_access_token(
+                identity="user", additional_claims={"is_admin": False})
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def test_memory_sqlite_keeps_default_pool(self):
+        self.assertEqual(engine_options('sqlite://'), {})
+
+    def test_pool_status(self):
+        with self.app.app_context():
+            self.assertIsInstance(db.engine.pool, TimedQueuePool)
+            db.session.execute(db.text("SELECT 1"))
+            db.session.remove()
+
+        response = self.client.get('/internal/pool', headers={
+            "Authorization": f"Bearer {self.admin_token}"})
+
+        self.assertEqual(response.status_code, 200)
+        status = response.get_json()
+        self.assertEqual(status["pool"], "TimedQueuePool")
+        self.assertEqual(status["size"], 5)
+        self.assertEqual(status["checked_out"], 0)
+        self.assertGreaterEqual(status["checkouts"], 1)
+        self.assertIn("wait_avg_ms", status)
+
+    def test_pool_status_admin_only(self):
+        response = self.client.get('/internal/pool', headers={
+            "Authorization": f"Bearer {self.user_token}"})
+
+        self.assertEqual(response.status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
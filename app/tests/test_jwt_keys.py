@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import unittest
+import jwt
+from cryptography.hazmat.primitives import serialization
+from flask import Flask, jsonify
+from flask.testing import FlaskClient
+from flask_jwt_extended import (JWTManager, create_access_token,
+                                get_jwt_identity, jwt_required)
+from api.keys_api import keys_api
+from persistence.jwt_keys import KeyRing, generate_key, init_jwt_keys
+
+
+class JwtKeysTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        generate_key(self.directory, "RS256", kid="2026-01")
+        generate_key(self.directory, "EdDSA", kid="2026-02")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_app(self, **config):
+        app = Flask(__name__)
+        app.config["JWT_KEYS_DIR"] = self.directory
+        app.config.update(config)
+        init_jwt_keys(app, JWTManager(app))
+        app.register_blueprint(keys_api)
+
+        @app.route("/me")
+        @jwt_required()
+        def me():
+            return jsonify(id=get_jwt_identity())
+        app.testing = True
+        return app
+
+    def token(self, app, identity="user"):
+        with app.app_context():
+            return create_access_token(identity=identity)
+
+    def get_me(self, app, token):
+        client: FlaskClient = app.test_client()
+        return client.get("/me", headers={"Authorization": f"Bearer {token}"})
+
+    def test_signs_with_last_key(self):
+        app = self.make_app()
+        token = self.token(app)
+        header = jwt.get_unverified_header(token)
+        self.assertEqual(header["kid"], "2026-02")
+        self.assertEqual(header["alg"], "EdDSA")
+        response = self.get_me(app, token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"id": "user"})
+
+    def test_jwks_verifies_tokens(self):
+        app = self.make_app()
+        response = app.test_client().get("/.well-known/jwks.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age", response.headers["Cache-Control"])
+        keys = {key["kid"]: key for key in response.json["keys"]}
+        self.assertEqual(set(keys), {"2026-01", "2026-02"})
+        self.assertEqual(keys["2026-01"]["kty"], "RSA")
+        self.assertEqual(keys["2026-02"]["crv"], "Ed25519")
+        for key in keys.values():
+            self.assertNotIn("d", key)
+
+        token = self.token(app)
+        public_key = jwt.PyJWK(keys["2026-02"])
+        claims = jwt.decode(token, public_key, algorithms=["EdDSA"])
+        self.assertEqual(claims["sub"], "user")
+
+    def test_rotation(self):
+        old_app = self.make_app(JWT_SIGNING_KID="2026-01")
+        old_token = self.token(old_app)
+        self.assertEqual(jwt.get_unverified_header(old_token)["alg"], "RS256")
+
+        app = self.make_app()
+        self.assertEqual(self.get_me(app, old_token).status_code, 200)
+
+        # The retired key only verifies once its private key is gone
+        ring = KeyRing.from_directory(self.directory)
+        public_pem = ring.keys["2026-01"].public_key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo)
+        with open(os.path.join(self.directory, "2026-01.pem"), "wb") as file:
+            file.write(public_pem)
+        app = self.make_app()
+        self.assertEqual(self.get_me(app, old_token).status_code, 200)
+        with self.assertRaises(ValueError):
+            self.make_app(JWT_SIGNING_KID="2026-01")
+
+    def test_unknown_or_forged_key(self):
+        app = self.make_app()
+        other = tempfile.mkdtemp()
+        try:
+            generate_key(other, kid="2026-02")
+            forged = self.token(self.make_app(JWT_KEYS_DIR=other))
+        finally:
+            shutil.rmtree(other)
+        self.assertEqual(self.get_me(app, forged).status_code, 422)
+
+        os.remove(os.path.join(self.directory, "2026-01.pem"))
+        token = self.token(self.make_app(JWT_SIGNING_KID="2026-02"))
+        generate_key(self.directory, kid="2026-03")
+        secret = "test-secret-key-long-enough-for-hs256"
+        for kid in ("nope", "2026-02"):
+            unknown = jwt.encode({"sub": "user"}, secret, algorithm="HS256",
+                                 headers={"kid": kid})
+            self.assertEqual(
+                self.get_me(self.make_app(), unknown).status_code, 422)
+        self.assertEqual(self.get_me(self.make_app(), token).status_code,
+                         200)
+
+    def test_hs256_without_keys(self):
+        app = Flask(__name__)
+        app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        self.assertIsNone(init_jwt_keys(app, JWTManager(app)))
+        app.register_blueprint(keys_api)
+        token = self.token(app)
+        self.assertEqual(jwt.get_unverified_header(token)["alg"], "HS256")
+        response = app.test_client().get("/.well-known/jwks.json")
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from api.place_api import place_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.datamanager import DataManager
+from persistence.geohash import (covering_cells, encode, haversine_km,
+                                 next_prefix, precision_for)
+import uuid
+
+HOST_ID = str(uuid.uuid4())
+CITY_ID = str(uuid.uuid4())
+AMENITY_ID = str(uuid.uuid4())
+
+# (name, latitude, longitude)
+PLACES = [("Louvre", 48.8606, 2.3376),
+          ("Eiffel Tower", 48.8584, 2.2945),
+          ("Versailles", 48.8049, 2.1204),
+          ("Lyon", 45.7640, 4.8357),
+          # Both sides of the antimeridian
+          ("Fiji east", -17.0, 179.99),
+          ("Fiji west", -17.0, -179.99)]
+
+
+class GeohashTestCase(unittest.TestCase):
+    def test_encode(self):
+        self.assertEqual(encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(len(encode(0, 0)), 12)
+
+    def test_next_prefix(self):
+        self.assertEqual(next_prefix("u4p"), "u4q")
+        self.assertEqual(next_prefix("bz"), "c")
+        self.assertIsNone(next_prefix("zz"))
+
+    def test_covering_cells(self):
+        cells = covering_cells(48.8606, 2.3376, 5)
+        self.assertEqual(len(cells), 9)
+        self.assertEqual(len(cells[0]), precision_for(48.8606, 5))
+        self.assertIn(encode(48.8584, 2.2945, len(cells[0])), cells)
+        self.assertEqual(covering_cells(89.9, 0, 50), [""])
+
+    def test_haversine(self):
+        distances = haversine_km(48.8606, 2.3376, [45.7640, 48.8606],
+                                 [4.8357, 2.3376])
+        self.assertAlmostEqual(distances[0], 392.0, delta=2)
+        self.assertEqual(distances[1], 0)
+
+
+class NearbyApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        self.app.register_blueprint(place_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            for name, latitude, longitude in PLACES:
+                DataManager.save(Place(
+                    name=name, description="A beautiful place",
+                    address="Somewhere", latitude=latitude,
+                    longitude=longitude, num_rooms=3, num_bathrooms=2,
+                    price_per_night=100.0, max_guests=4, host_id=HOST_ID,
+                    city_id=CITY_ID, amenity_ids=AMENITY_ID), db.session)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def nearby(self, query):
+        response = self.client.get(f'/places/nearby?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [(place["name"], place["distance_km"])
+                for place in response.get_json()]
+
+    def test_sorted_by_distance(self):
+        places = self.nearby("lat=48.8606&lon=2.3376&radius_km=25")
+        self.assertEqual([name for name, _ in places],
+                         ["Louvre", "Eiffel Tower", "Versailles"])
+        self.assertEqual(places[0][1], 0)
+        self.assertAlmostEqual(places[1][1], 3.2, delta=0.1)
+
+        places = self.nearby("lat=48.8606&lon=2.3376&radius_km=25&limit=1")
+        self.assertEqual([name for name, _ in places], ["Louvre"])
+
+        places = self.nearby("lat=48.8606&lon=2.3376&radius_km=500")
+        self.assertEqual(places[-1][0], "Lyon")
+
+    def test_antimeridian(self):
+        places = self.nearby("lat=-17&lon=179.995&radius_km=5")
+        self.assertEqual(sorted(name for name, _ in places),
+                         ["Fiji east", "Fiji west"])
+
+    def test_geohash_follows_updates(self):
+        with self.app.app_context():
+            place = Place.query.filter_by(name="Lyon").one()
+            DataManager.update(place, {"latitude": 48.86,
+                                       "longitude": 2.34}, db.session)
+        places = self.nearby("lat=48.8606&lon=2.3376&radius_km=1")
+        self.assertEqual([name for name, _ in places], ["Louvre", "Lyon"])
+
+    def test_invalid_parameters(self):
+        for query in ("lon=2", "lat=x&lon=2", "lat=91&lon=2",
+                      "lat=1&lon=2&radius_km=0", "lat=1&lon=2&radius_km=5000",
+                      "lat=1&lon=2&limit=0"):
+            response = self.client.get(f'/places/nearby?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+if __name__ == '__main__':
+    unittest.main()
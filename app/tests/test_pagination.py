@@ -0,0 +1,96 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from api.amenities_api import amenities_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.datamanager import DataManager
+from persistence.pagination import after, decode_cursor, encode_cursor
+from sqlalchemy import select
+import datetime
+
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        self.app.register_blueprint(amenities_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+        with self.app.app_context():
+            db.create_all()
+            # Same created_at second for all: the id breaks the ties
+            DataManager.save_many(
+                [Amenity(name=f"Amenity {i}") for i in range(7)], db.session)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_cursor_round_trip(self):
+        values = [datetime.datetime(2024, 7, 4, 23, 24, 30), "some-id"]
+        cursor = encode_cursor(values)
+        columns = (Amenity.created_at, Amenity.id)
+        self.assertEqual(decode_cursor(cursor, columns), values)
+
+    def test_pages_cover_the_collection(self):
+        names = []
+        cursor = None
+        pages = 0
+        while True:
+            query = '/amenities?limit=3' + (f'&cursor={cursor}'
+                                            if cursor else '')
+            response = self.client.get(query)
+            self.assertEqual(response.status_code, 201)
+            body = response.get_json()
+            names += [amenity["name"] for amenity in body["items"]]
+            pages += 1
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(names), [f"Amenity {i}" for i in range(7)])
+
+    def test_paginate_by_default(self):
+        body = self.client.get('/amenities').get_json()
+        self.assertEqual(len(body["items"]), 7)
+        self.assertIsNone(body["next_cursor"])
+        self.app.config["DEFAULT_PAGE_SIZE"] = 4
+        body = self.client.get('/amenities').get_json()
+        self.assertEqual(len(body["items"]), 4)
+        self.assertIsNotNone(body["next_cursor"])
+        self.app.config["PAGINATE_BY_DEFAULT"] = False
+        self.assertIsInstance(self.client.get('/amenities').get_json(), list)
+
+    def test_invalid_parameters(self):
+        response = self.client.get('/amenities?limit=zero')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/amenities?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_uses_index(self):
+        with self.app.app_context():
+            columns = (Amenity.created_at, Amenity.id)
+            query = select(Amenity).where(
+                after(columns, [datetime.datetime(2024, 1, 1), "id"])
+            ).order_by(*columns).limit(10)
+            sql = str(query.compile(db.engine,
+                                    compile_kwargs={"literal_binds": True}))
+            plan = db.session.execute(
+                db.text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        details = " ".join(row[-1] for row in plan)
+        self.assertIn("ix_amenities_created_at_id", details)
+        self.assertNotIn("TEMP B-TREE", details)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import threading
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager
+from api.login_api import login_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.passwords import (HasherBusy, PasswordHasher, bcrypt,
+                                   hash_rounds, init_password_hasher,
+                                   password_hasher)
+
+
+class PasswordHasherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+
+    def test_hash_and_check(self):
+        password_hash = self.hasher.hash("secret")
+        self.assertEqual(hash_rounds(password_hash), 4)
+        self.assertTrue(self.hasher.check(password_hash, "secret"))
+        self.assertFalse(self.hasher.check(password_hash, "wrong"))
+
+    def test_inline_without_workers(self):
+        hasher = PasswordHasher(rounds=4, workers=0)
+        self.assertEqual(hasher.run(threading.get_ident),
+                         threading.get_ident())
+        self.assertNotEqual(self.hasher.run(threading.get_ident),
+                            threading.get_ident())
+
+    def test_busy_when_full(self):
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+        thread = threading.Thread(target=self.hasher.run, args=(block,))
+        thread.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(HasherBusy):
+                self.hasher.hash("secret")
+        finally:
+            release.set()
+            thread.join()
+        self.assertTrue(self.hasher.hash("secret"))
+
+    def test_busy_after_max_wait(self):
+        hasher = PasswordHasher(rounds=4, workers=1, max_pending=2,
+                                max_wait=0.05)
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+        thread = threading.Thread(target=hasher.run, args=(block,))
+        thread.start()
+        started.wait(5)
+        # Queued behind block(), which holds the only thread
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        try:
+            with self.assertRaises(HasherBusy):
+                hasher.hash("secret")
+        finally:
+            release.set()
+            thread.join()
+        self.assertTrue(hasher.hash("secret"))
+
+    def test_needs_rehash(self):
+        old = bcrypt.generate_password_hash("secret", 4).decode('utf-8')
+        self.assertTrue(PasswordHasher(rounds=5).needs_rehash(old))
+        self.assertFalse(PasswordHasher(rounds=4).needs_rehash(old))
+        self.assertFalse(PasswordHasher(rounds=5).needs_rehash("plain"))
+
+
+class LoginTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        self.app.config["BCRYPT_LOG_ROUNDS"] = 5
+        self.app.config["BCRYPT_WORKERS"] = 1
+        self.app.config["BCRYPT_MAX_PENDING"] = 1
+        db.init_app(self.app)
+        JWTManager(self.app)
+        init_password_hasher(self.app)
+        self.app.register_blueprint(login_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            old_hash = bcrypt.generate_password_hash("secret", 4)
+            db.session.add(User(email="user@example.com", first_name="User",
+                                last_name="Doe",
+                                password_hash=old_hash.decode('utf-8')))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        password_hasher.configure()
+
+    def login(self, password="secret"):
+        return self.client.post("/login", json={"email": "user@example.com",
+                                                "password": password})
+
+    def stored_rounds(self):
+        with self.app.app_context():
+            user = User.query.filter_by(email="user@example.com").one()
+            return hash_rounds(user.password_hash)
+
+    def test_rehash_on_login(self):
+        self.assertEqual(self.login("wrong").status_code, 401)
+        self.assertEqual(self.stored_rounds(), 4)
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access_token", response.json)
+        self.assertEqual(self.stored_rounds(), 5)
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_busy_login(self):
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+        thread = threading.Thread(target=password_hasher.run, args=(block,))
+        thread.start()
+        started.wait(5)
+        try:
+            response = self.login()
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertIn("Error", response.json)
+        self.assertEqual(self.login().status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager, create_access_token
+from api.internal_api import internal_api
+from api.review_api import review_api
+from api.user_api import user_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.principals import (Principal, init_principals,
+                                    principal_cache)
+from sqlalchemy import event, select
+import datetime
+import uuid
+
+AMENITY_ID = str(uuid.uuid4())
+
+
+class PrincipalsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        db.init_app(self.app)
+        init_principals(self.app, JWTManager(self.app))
+        self.app.register_blueprint(internal_api)
+        self.app.register_blueprint(review_api)
+        self.app.register_blueprint(user_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            country = Country(code="FR", name="France")
+            city = City(city_name="Paris", country=country)
+            admin = User(email="admin@example.com", first_name="Admin",
+                         last_name="Doe", password_hash="secret",
+                         is_admin=True)
+            host = User(email="host@example.com", first_name="Host",
+                        last_name="Doe", password_hash="secret")
+            db.session.add_all([country, city, admin, host])
+            db.session.flush()
+            place = Place(name="Cottage", description="A place",
+                          address="Street", latitude=1.0, longitude=2.0,
+                          num_rooms=1, num_bathrooms=1, price_per_night=50.0,
+                          max_guests=2, host_id=host.id, city_id=city.id,
+                          amenity_ids=AMENITY_ID)
+            db.session.add(place)
+            db.session.commit()
+            self.admin_id, self.host_id = admin.id, host.id
+            self.place_id = place.id
+            self.admin = {"Authorization": "Bearer " + create_access_token(
+                identity=admin.id, additional_claims={"is_admin": True})}
+            self.host = {"Authorization": "Bearer " + create_access_token(
+                identity=host.id, additional_claims={"is_admin": False})}
+            self.engine = db.engine
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self.record)
+
+    def tearDown(self):
+        event.remove(self.engine, 'before_cursor_execute', self.record)
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_principal(self):
+        with self.app.app_context():
+            self.assertEqual(principal_cache.get(self.host_id, db.session),
+                             Principal(self.host_id, False, self.place_id))
+            self.assertIsNone(principal_cache.get(
+                "00000000-0000-4000-8000-000000000000", db.session))
+
+    def test_cached_without_queries(self):
+        response = self.client.get("/internal/principals",
+                                   headers=self.admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.statements), 1)
+        self.statements.clear()
+        response = self.client.get("/internal/principals",
+                                   headers=self.admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.statements, [])
+        self.assertEqual(response.json["hits"], 1)
+        self.assertEqual(response.json["misses"], 1)
+        self.assertEqual(response.json["hit_rate"], 0.5)
+
+    def test_admin_flag_from_database(self):
+        self.assertEqual(self.client.get("/internal/principals",
+                                         headers=self.host).status_code, 401)
+        with self.app.app_context():
+            db.session.get(User, self.admin_id).is_admin = False
+            db.session.commit()
+        self.assertEqual(self.client.get("/internal/principals",
+                                         headers=self.admin).status_code, 401)
+
+    def test_invalidated_by_update_and_delete(self):
+        self.client.get("/internal/principals", headers=self.admin)
+        response = self.client.put(
+            f"/users/{self.admin_id}", headers=self.admin,
+            json={"first_name": "Root", "last_name": "Doe",
+                  "password": "secret", "is_admin": False})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get("/internal/principals",
+                                         headers=self.admin).status_code, 401)
+        response = self.client.delete(f"/users/{self.admin_id}",
+                                      headers=self.admin)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get("/internal/principals",
+                                         headers=self.admin).status_code, 401)
+
+    def test_place_owner_changes(self):
+        with self.app.app_context():
+            self.assertEqual(principal_cache.get(self.host_id, db.session)
+                             .place_id, self.place_id)
+            db.session.delete(db.session.get(Place, self.place_id))
+            db.session.commit()
+            self.assertIsNone(principal_cache.get(self.host_id, db.session)
+                              .place_id)
+
+    def test_first_place_is_owned(self):
+        with self.app.app_context():
+            place = db.session.get(Place, self.place_id)
+            city_id, created_at = place.city_id, place.created_at
+            for days in (1, -1):
+                db.session.add(Place(
+                    name=f"Cottage {days}", description="A place",
+                    address="Street", latitude=1.0, longitude=2.0,
+                    num_rooms=1, num_bathrooms=1, price_per_night=50.0,
+                    max_guests=2, host_id=self.host_id, city_id=city_id,
+                    amenity_ids=AMENITY_ID,
+                    created_at=created_at + datetime.timedelta(days=days)))
+                db.session.commit()
+            first = db.session.execute(
+                select(Place.id).where(Place.name == "Cottage -1")).scalar()
+            self.assertEqual(principal_cache.get(self.host_id, db.session)
+                             .place_id, first)
+
+    def test_flush_without_queries(self):
+        with self.app.app_context():
+            principal_cache.get(self.host_id, db.session)
+            place = db.session.get(Place, self.place_id)
+            db.session.expire(place, ["host_id"])
+            self.statements.clear()
+            place.host_id = self.admin_id
+            db.session.commit()
+            self.assertFalse([s for s in self.statements
+                              if s.lstrip().upper().startswith("SELECT")])
+            # The old host was not loaded: the whole cache is stale
+            self.assertIsNone(principal_cache.get(self.host_id, db.session)
+                              .place_id)
+
+    def test_host_cannot_review_own_place(self):
+        response = self.client.post(
+            f"/places/{self.place_id}/reviews", headers=self.host,
+            json={"rating": 5, "comment": "Mine", "user_id": self.host_id})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            f"/places/{self.place_id}/reviews", headers=self.admin,
+            json={"rating": 5, "comment": "Nice", "user_id": self.admin_id})
+        self.assertEqual(response.status_code, 201)
+
+
+if __name__ == "__main__":
+    unittest.main()
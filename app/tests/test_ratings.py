@@ -0,0 +1,187 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager, create_access_token
+from api.place_api import place_api
+from api.review_api import review_api
+from commands import init_commands
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence import ratings
+from persistence.datamanager import DataManager
+from persistence.unit_of_work import init_unit_of_work
+import uuid
+
+HOST_ID = str(uuid.uuid4())
+CITY_ID = str(uuid.uuid4())
+AMENITY_ID = str(uuid.uuid4())
+USER_IDS = [str(uuid.uuid4()) for _ in range(4)]
+
+
+def new_place(name):
+    return Place(name=name, description="A beautiful place",
+                 address="123 Test St", latitude=12.34, longitude=56.78,
+                 num_rooms=3, num_bathrooms=2, price_per_night=100.0,
+                 max_guests=4, host_id=HOST_ID, city_id=CITY_ID,
+                 amenity_ids=AMENITY_ID)
+
+
+class RatingsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        db.init_app(self.app)
+        JWTManager(self.app)
+        init_unit_of_work(self.app)
+        init_commands(self.app)
+        self.app.register_blueprint(place_api)
+        self.app.register_blueprint(review_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            users = [User(id=USER_IDS[i], email=f"user{i}@example.com",
+                          first_name="User", last_name="Doe")
+                     for i in range(4)]
+            places = [new_place("Loft"), new_place("Cabin")]
+            db.session.add_all(users + places)
+            db.session.commit()
+            self.loft, self.cabin = places[0].id, places[1].id
+            token = create_access_token(identity=USER_IDS[0])
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def aggregates(self, place_id):
+        with self.app.app_context():
+            place = db.session.get(Place, place_id)
+            return {field: getattr(place, field)
+                    for field in ratings.RATING_FIELDS}
+
+    def review(self, place_id, user_id, rating):
+        return self.client.post(f'/places/{place_id}/reviews',
+                                headers=self.headers,
+                                json={"rating": rating, "comment": "Nice",
+                                      "user_id": user_id})
+
+    def test_create_update_delete(self):
+        self.assertEqual(self.review(self.loft, USER_IDS[1], 4).status_code, 201)
+        response = self.review(self.loft, USER_IDS[2], 5)
+        review_id = response.get_json()["review"]["id"]
+        self.assertEqual(self.aggregates(self.loft), {
+            "review_count": 2, "rating_sum": 9, "rating_avg": 4.5,
+            "rating_1": 0, "rating_2": 0, "rating_3": 0, "rating_4": 1,
+            "rating_5": 1})
+
+        response = self.client.put(f'/reviews/{review_id}',
+                                   headers=self.headers, json={"rating": 2})
+        self.assertEqual(response.status_code, 201)
+        aggregates = self.aggregates(self.loft)
+        self.assertEqual(aggregates["rating_sum"], 6)
+        self.assertEqual(aggregates["rating_2"], 1)
+        self.assertEqual(aggregates["rating_5"], 0)
+
+        response = self.client.put(f'/reviews/{review_id}',
+                                   headers=self.headers, json={"rating": 9})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.delete(f'/reviews/{review_id}',
+                                      headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        aggregates = self.aggregates(self.loft)
+        self.assertEqual(aggregates["review_count"], 1)
+        self.assertEqual(aggregates["rating_avg"], 4.0)
+        self.assertEqual(aggregates["rating_2"], 0)
+
+    def test_bulk_reviews(self):
+        response = self.client.post(
+            f'/places/{self.cabin}/reviews/bulk', headers=self.headers,
+            json=[{"rating": rating, "comment": "Ok", "user_id": USER_IDS[i]}
+                  for i, rating in enumerate([1, 3, 5])])
+        self.assertEqual(response.status_code, 201)
+        aggregates = self.aggregates(self.cabin)
+        self.assertEqual(aggregates["review_count"], 3)
+        self.assertEqual(aggregates["rating_avg"], 3.0)
+
+    def test_bulk_update_and_delete(self):
+        ids = [self.review(self.cabin, USER_IDS[i], 5).get_json()
+               ["review"]["id"] for i in range(1, 3)]
+        with self.app.app_context():
+            DataManager.update_many(Review, [{"id": ids[0], "rating": 1}],
+                                    db.session)
+        aggregates = self.aggregates(self.cabin)
+        self.assertEqual(aggregates["rating_sum"], 6)
+        self.assertEqual(aggregates["rating_1"], 1)
+        with self.app.app_context():
+            self.assertEqual(DataManager.delete_many(Review, ids, db.session),
+                             2)
+        self.assertEqual(self.aggregates(self.cabin)["review_count"], 0)
+
+    def test_clients_cannot_set_aggregates(self):
+        response = self.client.put(f'/places/{self.loft}',
+                                   headers=self.headers,
+                                   json={"review_count": 10,
+                                         "name": "Big loft"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.aggregates(self.loft)["review_count"], 0)
+
+    def test_filter_and_sort_by_rating(self):
+        self.review(self.loft, USER_IDS[1], 3)
+        self.review(self.cabin, USER_IDS[1], 5)
+
+        response = self.client.get('/places?sort=rating')
+        self.assertEqual([place["name"] for place in
+                          response.get_json()["items"]], ["Cabin", "Loft"])
+
+        response = self.client.get('/places?sort=rating&limit=1')
+        page = response.get_json()
+        self.assertEqual([place["name"] for place in page["items"]],
+                         ["Cabin"])
+        response = self.client.get(
+            f'/places?sort=rating&limit=1&cursor={page["next_cursor"]}')
+        self.assertEqual([place["name"] for place in
+                          response.get_json()["items"]], ["Loft"])
+
+        response = self.client.get('/places?min_rating=4')
+        self.assertEqual([place["name"] for place in
+                          response.get_json()["items"]], ["Cabin"])
+        self.assertEqual(self.client.get('/places?min_rating=6').status_code,
+                         400)
+        self.assertEqual(self.client.get('/places?sort=name').status_code,
+                         400)
+
+    def test_backfill_and_check(self):
+        self.review(self.loft, USER_IDS[1], 3)
+        self.review(self.loft, USER_IDS[2], 4)
+        with self.app.app_context():
+            DataManager.update_many(Place, [{"id": self.loft,
+                                             "review_count": 7}], db.session)
+
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['ratings', 'check'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn(self.loft, result.output)
+
+        result = runner.invoke(args=['ratings', 'backfill',
+                                     '--batch-size', '1'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("2 places updated.", result.output)
+        self.assertEqual(self.aggregates(self.loft)["review_count"], 2)
+        self.assertEqual(self.aggregates(self.loft)["rating_avg"], 3.5)
+
+        result = runner.invoke(args=['ratings', 'check'])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
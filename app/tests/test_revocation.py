@@ -0,0 +1,168 @@
+import unittest
+import uuid
+from datetime import timedelta
+from flask import Flask, jsonify
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager, decode_token, jwt_required
+from api.login_api import login_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.revoked_token import RevokedToken
+from models.users import User
+from persistence.passwords import password_hasher
+from persistence.principals import init_principals
+from persistence.revocation import (BloomFilter, init_revocation,
+                                    revocation_list, utcnow)
+from sqlalchemy import event
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BloomFilterTestCase(unittest.TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        values = [str(uuid.uuid4()) for _ in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(str(uuid.uuid4()) in bloom
+                              for _ in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class RevocationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        db.init_app(self.app)
+        jwt = JWTManager(self.app)
+        init_principals(self.app, jwt)
+        init_revocation(self.app, jwt)
+        self.clock = FakeClock()
+        revocation_list.configure(capacity=100, refresh=5, clock=self.clock)
+        password_hasher.configure(rounds=4)
+        self.app.register_blueprint(login_api)
+
+        @self.app.route("/protected")
+        @jwt_required()
+        def protected():
+            return jsonify(ok=True)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(User(email="user@example.com", first_name="User",
+                                last_name="Doe",
+                                password_hash=User.set_password("secret")))
+            db.session.commit()
+            self.engine = db.engine
+        tokens = self.client.post("/login", json={
+            "email": "user@example.com", "password": "secret"}).json
+        self.access = {"Authorization": f"Bearer {tokens['access_token']}"}
+        self.refresh = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self.record)
+
+    def tearDown(self):
+        event.remove(self.engine, 'before_cursor_execute', self.record)
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        revocation_list.configure()
+        password_hasher.configure()
+
+    def record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def revocation_queries(self):
+        return [s for s in self.statements if "revoked_tokens" in s]
+
+    def test_refresh(self):
+        response = self.client.post("/token/refresh", headers=self.refresh)
+        self.assertEqual(response.status_code, 200)
+        access = {"Authorization": f"Bearer {response.json['access_token']}"}
+        self.assertEqual(self.client.get("/protected",
+                                         headers=access).status_code, 200)
+        # Access tokens can't refresh, refresh tokens can't access
+        self.assertEqual(self.client.post("/token/refresh",
+                                          headers=self.access).status_code,
+                         422)
+        self.assertEqual(self.client.get("/protected",
+                                         headers=self.refresh).status_code,
+                         422)
+
+    def test_checks_without_queries(self):
+        for _ in range(20):
+            self.assertEqual(self.client.get(
+                "/protected", headers=self.access).status_code, 200)
+        # The filter is built once, then no query until the refresh
+        self.assertEqual(len(self.revocation_queries()), 1)
+        self.clock.now += 5
+        self.client.get("/protected", headers=self.access)
+        self.assertEqual(len(self.revocation_queries()), 2)
+        self.assertEqual(revocation_list.stats()["lookups"], 0)
+
+    def test_logout(self):
+        response = self.client.post("/logout", headers=self.access)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/protected",
+                                         headers=self.access).status_code,
+                         401)
+        self.assertEqual(self.client.post("/logout", headers=self.refresh)
+                         .status_code, 200)
+        self.assertEqual(self.client.post("/token/refresh",
+                                          headers=self.refresh).status_code,
+                         401)
+        with self.app.app_context():
+            rows = db.session.scalars(db.select(RevokedToken)).all()
+            self.assertEqual(sorted(row.token_type for row in rows),
+                             ["access", "refresh"])
+        stats = revocation_list.stats()
+        self.assertEqual(stats["jtis"], 2)
+        self.assertEqual(stats["revoked"], 2)
+
+    def test_revoked_by_another_worker(self):
+        self.client.get("/protected", headers=self.access)
+        with self.app.app_context():
+            # Revoked by another worker: only in the table
+            claims = decode_token(self.access["Authorization"][7:])
+            db.session.add(RevokedToken(
+                jti=claims["jti"], token_type="access",
+                expires_at=utcnow() + timedelta(minutes=15),
+                revoked_at=utcnow()))
+            db.session.commit()
+        self.assertEqual(self.client.get("/protected",
+                                         headers=self.access).status_code,
+                         200)
+        self.clock.now += 5
+        self.assertEqual(self.client.get("/protected",
+                                         headers=self.access).status_code,
+                         401)
+
+    def test_prune(self):
+        with self.app.app_context():
+            db.session.add_all([
+                RevokedToken(jti=str(uuid.uuid4()), token_type="access",
+                             expires_at=utcnow() - timedelta(minutes=1)),
+                RevokedToken(jti=str(uuid.uuid4()), token_type="access",
+                             expires_at=utcnow() + timedelta(minutes=1))])
+            db.session.commit()
+            self.assertEqual(revocation_list.prune(db.session), 1)
+            self.assertEqual(db.session.query(RevokedToken).count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
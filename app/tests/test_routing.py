@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from flask import Flask, jsonify, request
+from flask.testing import FlaskClient
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.datamanager import DataManager
+from persistence.engine import engine_options
+from persistence.routing import (PRIMARY_HEADER, ReplicaRouter,
+                                 init_replicas, primary, replica_engines,
+                                 replica_uris)
+
+
+class RoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        uri = 'sqlite:///' + os.path.join(self.directory.name, 'primary.db')
+        replica = 'sqlite:///' + os.path.join(self.directory.name,
+                                              'replica.db')
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = uri
+        self.app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(uri)
+        self.app.config["REPLICA_URIS"] = [replica]
+        db.init_app(self.app)
+        init_replicas(self.app)
+
+        @self.app.route('/amenities')
+        def amenities():
+            if request.args.get('write'):
+                DataManager.save(Amenity(name="Written"), db.session)
+            return jsonify(sorted(a.name for a in Amenity.query.all()))
+
+        @self.app.route('/primary/amenities')
+        @primary
+        def primary_amenities():
+            return jsonify(sorted(a.name for a in Amenity.query.all()))
+
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            replica_engine = replica_engines()[0]
+            db.metadata.create_all(replica_engine)
+            DataManager.save(Amenity(name="On primary"), db.session)
+            with replica_engine.begin() as connection:
+                connection.execute(Amenity.__table__.insert(),
+                                   {"id": "replica-row", "name": "On replica"})
+
+    def tearDown(self):
+        with self.app.app_context():
+            for engine in [db.engine, *replica_engines()]:
+                engine.dispose()
+        self.directory.cleanup()
+
+    def test_replica_uris(self):
+        self.assertEqual(replica_uris(" sqlite:///a.db, ,sqlite:///b.db"),
+                         ["sqlite:///a.db", "sqlite:///b.db"])
+
+    def test_get_reads_from_replica(self):
+        response = self.client.get('/amenities')
+        self.assertEqual(response.get_json(), ["On replica"])
+
+    def test_forced_primary(self):
+        response = self.client.get('/amenities',
+                                   headers={PRIMARY_HEADER: "1"})
+        self.assertEqual(response.get_json(), ["On primary"])
+
+        response = self.client.get('/primary/amenities')
+        self.assertEqual(response.get_json(), ["On primary"])
+
+    def test_writes_and_read_after_write_on_primary(self):
+        response = self.client.get('/amenities?write=1')
+        self.assertEqual(response.get_json(), ["On primary", "Written"])
+
+    def test_outside_requests_use_primary(self):
+        with self.app.app_context():
+            names = [amenity.name for amenity in Amenity.query.all()]
+        self.assertEqual(names, ["On primary"])
+
+    def test_round_robin(self):
+        router = ReplicaRouter(["r0", "r1"])
+        chosen = [router.choose() for _ in range(4)]
+        self.assertEqual(chosen, ["r0", "r1", "r0", "r1"])
+        self.assertIsNone(ReplicaRouter([]).choose())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from api.place_api import place_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.datamanager import DataManager
+from persistence.search import search_words, SearchError
+import uuid
+
+HOST_ID = str(uuid.uuid4())
+CITY_ID = str(uuid.uuid4())
+AMENITY_ID = str(uuid.uuid4())
+
+# (name, description, address)
+PLACES = [("Seaside loft", "Bright loft with a view on the harbour",
+           "1 Quai des Pêcheurs"),
+          ("Mountain cabin", "Wooden cabin near the ski slopes",
+           "Route du Col"),
+          ("City studio", "Small studio close to the harbour station",
+           "12 Rue de la Gare"),
+          ("Harbour house", "Family house", "3 Rue du Port")]
+
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        self.app.register_blueprint(place_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            for name, description, address in PLACES:
+                DataManager.save(Place(
+                    name=name, description=description, address=address,
+                    latitude=1.0, longitude=2.0, num_rooms=3,
+                    num_bathrooms=2, price_per_night=100.0, max_guests=4,
+                    host_id=HOST_ID, city_id=CITY_ID,
+                    amenity_ids=AMENITY_ID), db.session)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def search(self, query):
+        response = self.client.get(f'/places/search?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def names(self, query):
+        return [place["name"] for place in self.search(query)["items"]]
+
+    def test_ranked_prefix_search(self):
+        # A match in the name ranks above one in the description
+        names = self.names("q=harb")
+        self.assertEqual(names[0], "Harbour house")
+        self.assertEqual(sorted(names[1:]), ["City studio", "Seaside loft"])
+        self.assertEqual(self.names("q=harbour+station"), ["City studio"])
+        self.assertEqual(self.names("q=pecheurs"), ["Seaside loft"])
+        self.assertEqual(self.names("q=castle"), [])
+
+    def test_pagination(self):
+        names = self.names("q=harbour")
+        self.assertEqual(len(names), 3)
+        page = self.search("q=harbour&limit=2")
+        self.assertEqual([place["name"] for place in page["items"]],
+                         names[:2])
+        page = self.search(f"q=harbour&limit=2&cursor={page['next_cursor']}")
+        self.assertEqual([place["name"] for place in page["items"]],
+                         names[2:])
+        self.assertIsNone(page["next_cursor"])
+
+    def test_index_follows_writes(self):
+        with self.app.app_context():
+            cabin = Place.query.filter_by(name="Mountain cabin").one()
+            DataManager.update(cabin, {"name": "Harbour cabin"}, db.session)
+            loft = Place.query.filter_by(name="Seaside loft").one()
+            DataManager.delete(loft, db.session)
+            studio = Place.query.filter_by(name="City studio").one()
+            DataManager.delete_many(Place, [studio.id], db.session)
+        self.assertEqual(sorted(self.names("q=harbour")),
+                         ["Harbour cabin", "Harbour house"])
+        self.assertEqual(self.names("q=mountain"), [])
+
+    def test_invalid_query(self):
+        self.assertRaises(SearchError, search_words, " ;' ")
+        self.assertEqual(search_words('"Loft" OR x*'), ["loft", "or", "x"])
+        for query in ("", "q=%22%3B", "q=loft&limit=0"):
+            response = self.client.get(f'/places/search?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from flask import Flask
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.datamanager import DataManager
+from persistence.serializer import serializer_for
+import json
+
+
+class SerializerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.drop_all()
+        self.context.pop()
+
+    def test_serializer_is_built_once(self):
+        self.assertIs(serializer_for(User), serializer_for(User))
+
+    def test_password_hash_excluded(self):
+        user = User(email="test@example.com", first_name="John",
+                    last_name="Doe", password_hash="hash")
+        DataManager.save(user, db.session)
+
+        result = DataManager.read(user)
+        self.assertNotIn("password_hash", result)
+        self.assertEqual(result["email"], "test@example.com")
+
+    def test_fields_do_not_depend_on_loaded_attributes(self):
+        amenity = Amenity(name="Pool")
+        DataManager.save(amenity, db.session)
+        loaded = DataManager.read(amenity)
+
+        db.session.expire(amenity)
+        expired = DataManager.read(amenity)
+        self.assertEqual(loaded, expired)
+        self.assertEqual(set(expired), {"id", "name", "created_at",
+                                        "updated_at"})
+        self.assertIsInstance(expired["created_at"], str)
+
+    def test_response(self):
+        DataManager.save(Amenity(name="Pool"), db.session)
+
+        response = serializer_for(Amenity).response(Amenity.query.all(), 201)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(json.loads(response.get_data())[0]["name"], "Pool")
+
+    def test_stream_json_array(self):
+        DataManager.save_many([Amenity(name=f"Amenity {i}") for i in range(5)],
+                              db.session)
+
+        with self.app.test_request_context('/amenities'):
+            response = serializer_for(Amenity).stream(Amenity.query,
+                                                      chunk_size=2)
+            body = response.get_data(as_text=True)
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(sorted(a["name"] for a in json.loads(body)),
+                         [f"Amenity {i}" for i in range(5)])
+
+    def test_stream_ndjson(self):
+        DataManager.save_many([Amenity(name=f"Amenity {i}") for i in range(3)],
+                              db.session)
+
+        with self.app.test_request_context(
+                '/amenities', headers={"Accept": "application/x-ndjson"}):
+            response = serializer_for(Amenity).stream(Amenity.query,
+                                                      chunk_size=2)
+            lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])["name"][:8], "Amenity ")
+
+    def test_stream_empty(self):
+        with self.app.test_request_context('/amenities'):
+            self.assertIsNone(serializer_for(Amenity).stream(Amenity.query))
+
+
+if __name__ == '__main__':
+    unittest.main()
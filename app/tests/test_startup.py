@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+from config import Config
+from persistence.startup import (import_breakdown, import_times,
+                                 parse_importtime, startup_time)
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       300 |        300 |     numpy._core
+import time:       200 |        500 |   numpy
+import time:       100 |        100 |     sqlalchemy.orm
+import time:      1000 |       1100 |   sqlalchemy
+import time:        50 |       1650 | models.place
+"""
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    def test_parse(self):
+        imports = parse_importtime("some warning\n" + IMPORTTIME)
+        self.assertEqual([record.module for record in imports],
+                         ["numpy._core", "numpy", "sqlalchemy.orm",
+                          "sqlalchemy", "models.place"])
+        self.assertEqual(imports[1].self_ms, 0.2)
+        self.assertEqual(imports[4].cumulative_ms, 1.65)
+        self.assertEqual([record.depth for record in imports],
+                         [2, 1, 2, 1, 0])
+
+    def test_breakdown(self):
+        groups = import_breakdown(parse_importtime(IMPORTTIME))
+        self.assertEqual([(group.name, group.modules) for group in groups],
+                         [("sqlalchemy", 2), ("numpy", 2),
+                          ("models.place", 1)])
+        self.assertAlmostEqual(groups[0].self_ms, 1.1)
+
+
+class StartupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.env = dict(os.environ, FLASK_ENV="development",
+                        LOGIN_THROTTLE_DB=os.path.join(self.directory,
+                                                       "throttle.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_create_app_within_budget(self):
+        self.assertLess(startup_time(self.env), Config.STARTUP_TIME_BUDGET)
+
+    def test_heavy_imports_deferred(self):
+        modules = {record.module for record in import_times(self.env)}
+        self.assertIn("flask_sqlalchemy", modules)
+        for module in ("alembic", "numpy", "pycountry",
+                       "validate_email_address",
+                       "sqlalchemy.dialects.postgresql"):
+            self.assertNotIn(module, modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_jwt_extended import JWTManager
+from api.login_api import login_api
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.passwords import password_hasher
+from persistence.throttle import (BucketStore, Limit, init_login_throttle,
+                                  login_throttle)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class BucketStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "throttle.db")
+        self.clock = FakeClock()
+        self.limit = Limit("email", burst=2, per_minute=6)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_burst_then_refill(self):
+        store = BucketStore(self.path, self.clock)
+        self.assertEqual(store.take("email:a", self.limit), 0)
+        self.assertEqual(store.take("email:a", self.limit), 0)
+        self.assertAlmostEqual(store.take("email:a", self.limit), 10)
+        self.assertEqual(store.take("email:b", self.limit), 0)
+        self.clock.now += 10
+        self.assertEqual(store.take("email:a", self.limit), 0)
+        self.assertGreater(store.take("email:a", self.limit), 0)
+        self.assertEqual(store.rejections(), {"email": 2})
+
+    def test_shared_between_workers(self):
+        first = BucketStore(self.path, self.clock)
+        second = BucketStore(self.path, self.clock)
+        self.assertEqual(first.take("email:a", self.limit), 0)
+        self.assertEqual(second.take("email:a", self.limit), 0)
+        self.assertGreater(first.take("email:a", self.limit), 0)
+        self.assertEqual(second.rejections(), {"email": 1})
+
+    def test_prune_full_buckets(self):
+        store = BucketStore(self.path, self.clock)
+        store.take("email:a", self.limit)
+        self.clock.now += 5
+        store.take("email:b", self.limit)
+        self.clock.now += self.limit.full_after() - 1
+        store.prune(self.limit)
+        keys = [key for (key,) in store._connection().execute(
+            "SELECT key FROM buckets")]
+        self.assertEqual(keys, ["email:b"])
+
+
+class LoginThrottleTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["JWT_SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+        self.app.config["LOGIN_THROTTLE_DB"] = os.path.join(
+            self.directory, "throttle.db")
+        self.app.config["LOGIN_EMAIL_BURST"] = 2
+        self.app.config["LOGIN_IP_BURST"] = 3
+        db.init_app(self.app)
+        JWTManager(self.app)
+        init_login_throttle(self.app)
+        password_hasher.configure(rounds=4)
+        self.app.register_blueprint(login_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(User(email="user@example.com", first_name="User",
+                                last_name="Doe",
+                                password_hash=User.set_password("secret")))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        login_throttle.configure(None)
+        password_hasher.configure()
+        shutil.rmtree(self.directory)
+
+    def login(self, email="user@example.com", ip="10.0.0.1"):
+        return self.client.post("/login", json={"email": email,
+                                                "password": "secret"},
+                                environ_base={"REMOTE_ADDR": ip})
+
+    def test_email_limit(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login(ip="10.0.0.2").status_code, 200)
+        with patch.object(User, "check_password") as check_password:
+            response = self.login(email="USER@example.com", ip="10.0.0.3")
+            check_password.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+        self.assertIn("Error", response.json)
+
+    def test_ip_limit(self):
+        for i in range(3):
+            self.assertEqual(self.login(f"other{i}@example.com").status_code,
+                             401)
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login(ip="10.0.0.2").status_code, 200)
+        stats = login_throttle.stats()
+        self.assertEqual(stats["ip"]["rejected"], 1)
+        self.assertEqual(stats["email"]["rejected"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
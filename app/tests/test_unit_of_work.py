@@ -0,0 +1,125 @@
+import unittest
+from flask import Flask, jsonify
+from flask.testing import FlaskClient
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from persistence.datamanager import DataManager
+from persistence.query_count import QUERY_COUNT_HEADER, init_query_count
+from persistence.unit_of_work import finish, init_unit_of_work
+from sqlalchemy import event
+
+
+class UnitOfWorkTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        init_unit_of_work(self.app)
+        init_query_count(self.app)
+
+        @self.app.route('/amenities/<int:count>', methods=['POST'])
+        def add_amenities(count):
+            amenities = [Amenity(name=f"Amenity {i}") for i in range(count)]
+            for amenity in amenities:
+                DataManager.save(amenity, db.session)
+            return jsonify([DataManager.read(a) for a in amenities]), 201
+
+        @self.app.route('/finished/<name>', methods=['POST'])
+        def add_finished(name):
+            amenity = Amenity(name=name)
+            DataManager.save(amenity, db.session)
+            finish(db.session)
+            return jsonify(DataManager.read(amenity)), 201
+
+        @self.app.route('/failing', methods=['POST'])
+        def failing():
+            DataManager.save(Amenity(name="Not kept"), db.session)
+            return jsonify({"Error": "Something went wrong"}), 400
+
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        self.statements = []
+        self.commits = []
+        with self.app.app_context():
+            db.create_all()
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self.record_statement)
+        event.listen(engine, 'commit', self.record_commit)
+        self.engine = engine
+
+    def tearDown(self):
+        event.remove(self.engine, 'before_cursor_execute',
+                     self.record_statement)
+        event.remove(self.engine, 'commit', self.record_commit)
+        with self.app.app_context():
+            db.drop_all()
+
+    def record_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def record_commit(self, conn):
+        self.commits.append(conn)
+
+    def test_one_commit_per_request(self):
+        response = self.client.post('/amenities/3')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.commits), 1)
+        created = response.get_json()
+        self.assertTrue(all(amenity["created_at"] for amenity in created))
+        # Server defaults come back with RETURNING, not with a SELECT
+        self.assertFalse([s for s in self.statements
+                          if s.lstrip().upper().startswith("SELECT")])
+        with self.app.app_context():
+            self.assertEqual(Amenity.query.count(), 3)
+
+    def test_query_count_includes_commit(self):
+        response = self.client.post('/amenities/3')
+
+        self.assertEqual(int(response.headers[QUERY_COUNT_HEADER]),
+                         len(self.statements))
+        self.assertTrue([s for s in self.statements if "table_versions" in s])
+
+    def test_error_response_rolls_back(self):
+        response = self.client.post('/failing')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.commits, [])
+        with self.app.app_context():
+            self.assertEqual(Amenity.query.count(), 0)
+
+    def test_finish_before_response(self):
+        response = self.client.post('/finished/Pool')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.commits), 1)
+        self.assertTrue(response.get_json()["created_at"])
+        # The entities keep their state after the commit
+        self.assertFalse([s for s in self.statements
+                          if s.lstrip().upper().startswith("SELECT")])
+
+    def test_conflict_at_commit(self):
+        self.assertEqual(self.client.post('/finished/Pool').status_code, 201)
+        response = self.client.post('/finished/Pool')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("Error", response.get_json())
+        self.assertEqual(len(self.commits), 1)
+        with self.app.app_context():
+            self.assertEqual(Amenity.query.count(), 1)
+
+    def test_commit_outside_requests(self):
+        with self.app.app_context():
+            DataManager.save(Amenity(name="Pool"), db.session)
+        self.assertEqual(len(self.commits), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from flask import Flask
+from flask.testing import FlaskClient
+from api.amenities_api import amenities_api
+from config import db
+from models.amenity import Amenity
+from models.base_model import NIL_UUID, UUIDType, as_uuid
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.users import User
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+import uuid
+
+
+class UUIDKeysTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        self.app.register_blueprint(amenities_api)
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+
+        with self.app.app_context():
+            db.create_all()
+            amenity = Amenity(name="Wifi")
+            db.session.add(amenity)
+            db.session.commit()
+            self.amenity_id = amenity.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_stored_in_16_bytes(self):
+        with self.app.app_context():
+            stored = db.session.execute(db.text(
+                "SELECT id FROM amenities")).scalar()
+            self.assertEqual(stored, uuid.UUID(self.amenity_id).bytes)
+            amenity = db.session.scalars(select(Amenity)).one()
+            self.assertEqual(amenity.id, self.amenity_id)
+
+    def test_api_keeps_the_canonical_string(self):
+        response = self.client.get(f'/amenities/{self.amenity_id.upper()}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()[0]["id"], self.amenity_id)
+
+    def test_ids_which_are_not_uuids_match_nothing(self):
+        self.assertEqual(as_uuid("wifi"), NIL_UUID)
+        self.assertEqual(as_uuid(None), NIL_UUID)
+        self.assertEqual(self.client.get('/amenities/wifi').status_code, 404)
+
+    def test_literals(self):
+        query = select(Amenity.name).where(Amenity.id == self.amenity_id)
+        for dialect, literal in (
+                (sqlite.dialect(), f"X'{uuid.UUID(self.amenity_id).hex}'"),
+                (postgresql.dialect(), f"'{self.amenity_id}'")):
+            compiled = str(query.compile(
+                dialect=dialect, compile_kwargs={"literal_binds": True}))
+            self.assertIn(literal, compiled)
+        self.assertIs(UUIDType().python_type, str)
+
+
+if __name__ == '__main__':
+    unittest.main()
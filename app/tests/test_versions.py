@@ -0,0 +1,162 @@
+import unittest
+from flask import Flask, jsonify
+from flask.testing import FlaskClient
+from config import db
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.table_version import TableVersion
+from models.users import User
+from persistence.datamanager import DataManager
+from persistence.unit_of_work import init_unit_of_work
+from persistence.versions import conditional, read_versions
+from sqlalchemy import event
+
+
+class VersionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        init_unit_of_work(self.app)
+        self.calls = []
+
+        @self.app.route('/amenities')
+        @conditional(Amenity)
+        def amenities():
+            self.calls.append(1)
+            return jsonify(sorted(a.name for a in Amenity.query.all()))
+
+        @self.app.route('/amenities', methods=['POST'])
+        def add_amenity():
+            DataManager.save(Amenity(name="Spa"), db.session)
+            return jsonify({"Success": "Amenity added"}), 201
+
+        @self.app.route('/cities')
+        @conditional(Amenity, filters={"country": (City,)})
+        def cities():
+            return jsonify([])
+
+        @self.app.route('/missing')
+        @conditional(Amenity)
+        def missing():
+            return jsonify({"Error": "Amenity not found."}), 404
+
+        self.app.testing = True
+        self.client = self.app.test_client()
+        self.client: FlaskClient
+        with self.app.app_context():
+            db.create_all()
+            amenity = Amenity(name="Pool")
+            DataManager.save(amenity, db.session)
+            self.amenity_id = amenity.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def version(self):
+        with self.app.app_context():
+            return read_versions(db.session, ["amenities"])["amenities"][0]
+
+    def test_writes_bump_version(self):
+        self.assertEqual(self.version(), 1)
+        with self.app.app_context():
+            amenity = DataManager.get(Amenity, self.amenity_id, db.session)
+            DataManager.update(amenity, {"name": "Spa"}, db.session)
+        self.assertEqual(self.version(), 2)
+        with self.app.app_context():
+            DataManager.update_many(Amenity, [{"id": self.amenity_id,
+                                               "name": "Sauna"}], db.session)
+        self.assertEqual(self.version(), 3)
+        with self.app.app_context():
+            DataManager.delete_many(Amenity, [self.amenity_id], db.session)
+            self.assertEqual(TableVersion.query.filter_by(
+                table_name="amenities").count(), 1)
+        self.assertEqual(self.version(), 4)
+
+    def test_bump_before_commit(self):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        with self.app.app_context():
+            engine = db.engine
+            event.listen(engine, 'before_cursor_execute', record)
+            try:
+                db.session.add_all([Amenity(name="Gym"),
+                                    Country(name="France", code="FR")])
+                db.session.flush()
+                with db.session.begin_nested():
+                    db.session.add(Amenity(name="Spa"))
+                self.assertFalse([s for s in statements
+                                  if "table_versions" in s])
+                db.session.commit()
+            finally:
+                event.remove(engine, 'before_cursor_execute', record)
+            versions = read_versions(db.session, ["amenities", "countries"])
+        upserts = [s for s in statements if "table_versions" in s]
+        self.assertEqual(len(upserts), 1)
+        self.assertIn("ON CONFLICT", upserts[0])
+        self.assertEqual(versions["amenities"][0], 2)
+        self.assertEqual(versions["countries"][0], 1)
+
+    def test_not_modified(self):
+        response = self.client.get('/amenities')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIsNotNone(response.last_modified)
+        self.assertIn("Accept", response.vary)
+
+        response = self.client.get('/amenities',
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+        self.assertEqual(len(self.calls), 1)
+
+        response = self.client.get('/amenities', headers={
+            "If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get('/amenities').headers["ETag"]
+        self.client.post('/amenities')
+
+        response = self.client.get('/amenities',
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.get_json(), ["Pool", "Spa"])
+
+    def test_etag_by_query_and_format(self):
+        etag = self.client.get('/amenities').headers["ETag"]
+        self.assertNotEqual(
+            self.client.get('/amenities?limit=1').headers["ETag"], etag)
+        self.assertNotEqual(self.client.get('/amenities', headers={
+            "Accept": "application/x-ndjson"}).headers["ETag"], etag)
+
+    def test_filter_tables_in_etag(self):
+        etags = [self.client.get(path).headers["ETag"]
+                 for path in ('/cities', '/cities?country=FR')]
+        with self.app.app_context():
+            DataManager.save(Country(name="France", code="FR"), db.session)
+            DataManager.save(City(city_name="Paris", country_code="FR"),
+                             db.session)
+        self.assertEqual(self.client.get('/cities').headers["ETag"],
+                         etags[0])
+        self.assertNotEqual(
+            self.client.get('/cities?country=FR').headers["ETag"], etags[1])
+
+    def test_errors_have_no_etag(self):
+        response = self.client.get('/missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()